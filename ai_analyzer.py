@@ -0,0 +1,249 @@
+import asyncio
+import logging
+import re
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from mistralai.async_client import MistralAsyncClient
+
+from ai_cache import AnalysisCache, analysis_cache, analysis_cache_key
+from config import Config
+from metrics import metrics
+from rate_limit import RateLimiter
+
+logger = logging.getLogger(__name__)
+
+SYSTEM_PROMPT = "Ты эксперт по промышленным запчастям."
+FALLBACK_ANALYSIS = "AI анализ временно недоступен."
+SECTION_RE = re.compile(r'^#{2,3}\s*(\S+)\s*$', re.MULTILINE)
+
+
+def _part_block(result: Dict[str, Any]) -> str:
+    best = result['best_value']
+    prices = chr(10).join([
+        f"- {p.supplier_name}: {p.price} руб., {p.delivery} дней ({p.brand})"
+        for p in result['all_prices']
+    ])
+    return f"""
+            Каталожный номер: {result['part_number']}
+            Наименование: {result['name']}
+            Бренды: {', '.join(result['brands'])}
+
+            Цены от поставщиков:
+            {prices}
+
+            Минимальная цена: {result['min_price'].price} руб. ({result['min_price'].supplier_name})
+            Медианная цена: {result['stats']['median']:.0f} руб.
+            Лучшее соотношение цена/срок: {best.price} руб., {best.delivery} дней ({best.supplier_name})
+            """
+
+
+def build_prompt(result: Dict[str, Any]) -> str:
+    """Промпт для одной запчасти"""
+    return f"""
+            Проанализируй данные по промышленной запчасти:
+            {_part_block(result)}
+            Сделай краткий анализ (3-4 предложения) с рекомендацией по выбору оптимального варианта.
+            Учитывай соотношение цена/срок поставки/бренд.
+            """
+
+
+def build_batch_prompt(results: List[Dict[str, Any]]) -> str:
+    """Промпт для нескольких запчастей с ответом по разделам '### <номер>'"""
+    blocks = "\n".join(_part_block(result) for result in results)
+    return f"""
+            Проанализируй данные по промышленным запчастям ({len(results)} шт.):
+            {blocks}
+            Для КАЖДОЙ запчасти сделай краткий анализ (3-4 предложения) с рекомендацией
+            по выбору оптимального варианта. Учитывай соотношение цена/срок поставки/бренд.
+            Ответ оформи разделами, каждый раздел начинается строкой
+            "### <каталожный номер>" и содержит анализ только этой запчасти.
+            """
+
+
+def split_batch_response(text: str, part_numbers: List[str]) -> Dict[str, str]:
+    """Разбор ответа на пакетный промпт по запчастям; неизвестные разделы отбрасываются"""
+    wanted = {pn.upper(): pn for pn in part_numbers}
+    sections: Dict[str, str] = {}
+
+    matches = list(SECTION_RE.finditer(text))
+    for i, match in enumerate(matches):
+        part_number = wanted.get(match.group(1).strip('*:').upper())
+        if part_number is None:
+            continue
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(text)
+        body = text[match.end():end].strip()
+        if body:
+            sections[part_number] = body
+
+    return sections
+
+
+class AIAnalyzer:
+    """
+    Асинхронный AI-анализ: параллельные запросы к Mistral с ограничением
+    частоты, упаковка нескольких запчастей в один промпт и кэш ответов.
+    """
+
+    def __init__(self, client, model: str, cache: Optional[AnalysisCache],
+                 max_concurrency: int, rate_limit: float, batch_size: int,
+                 max_tokens_per_part: int = 300):
+        self.client = client
+        self.model = model
+        self.cache = cache
+        self.batch_size = max(1, batch_size)
+        self.max_tokens_per_part = max_tokens_per_part
+
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._rate_limiter = RateLimiter(rate_limit, burst=max_concurrency)
+
+    async def _chat(self, prompt: str, max_tokens: int) -> str:
+        async with self._semaphore:
+            await self._rate_limiter.acquire()
+            with metrics.timer('mistral_seconds'):
+                response = await self.client.chat(
+                    model=self.model,
+                    messages=[
+                        {"role": "system", "content": SYSTEM_PROMPT},
+                        {"role": "user", "content": prompt}
+                    ],
+                    max_tokens=max_tokens
+                )
+        return response.choices[0].message.content
+
+    async def _analyze_one(self, result: Dict[str, Any]) -> str:
+        try:
+            return await self._chat(build_prompt(result), self.max_tokens_per_part)
+        except Exception as e:
+            logger.error(f"Mistral AI error for {result['part_number']}: {e}")
+            return FALLBACK_ANALYSIS
+
+    async def _analyze_chunk(self, chunk: List[Dict[str, Any]]) -> Dict[str, str]:
+        """Анализ пачки; запчасти, пропавшие из ответа, запрашиваются по одной"""
+        if len(chunk) == 1:
+            return {chunk[0]['part_number']: await self._analyze_one(chunk[0])}
+
+        sections: Dict[str, str] = {}
+        try:
+            text = await self._chat(
+                build_batch_prompt(chunk),
+                self.max_tokens_per_part * len(chunk)
+            )
+            sections = split_batch_response(text, [r['part_number'] for r in chunk])
+        except Exception as e:
+            logger.error(f"Mistral AI batch error: {e}")
+
+        missing = [r for r in chunk if r['part_number'] not in sections]
+        if missing:
+            logger.warning(f"Batch response missed {len(missing)} parts, analysing separately")
+            texts = await asyncio.gather(*[self._analyze_one(r) for r in missing])
+            sections.update({r['part_number']: t for r, t in zip(missing, texts)})
+
+        return sections
+
+    async def analyze(self, analysis_results: List[Dict[str, Any]]) -> List[Dict[str, str]]:
+        """AI-анализ всех запчастей; результат в порядке analysis_results"""
+        if self.client is None or not analysis_results:
+            return []
+
+        texts: Dict[str, str] = {}
+        keys = {}
+        pending = []
+
+        for result in analysis_results:
+            part_number = result['part_number']
+            if part_number in keys:
+                continue
+            keys[part_number] = analysis_cache_key(result, self.model)
+
+            cached = await self.cache.aget(keys[part_number]) if self.cache else None
+            if cached is not None:
+                texts[part_number] = cached
+            else:
+                pending.append(result)
+
+        chunks = [
+            pending[start:start + self.batch_size]
+            for start in range(0, len(pending), self.batch_size)
+        ]
+        for sections in await asyncio.gather(*[self._analyze_chunk(c) for c in chunks]):
+            for part_number, text in sections.items():
+                texts[part_number] = text
+                if self.cache and text != FALLBACK_ANALYSIS:
+                    await self.cache.aput(keys[part_number], part_number, text)
+
+        if self.cache:
+            logger.info(f"AI analysis cache: {self.cache.stats()}")
+
+        return [
+            {
+                'part_number': result['part_number'],
+                'analysis': texts.get(result['part_number'], FALLBACK_ANALYSIS)
+            }
+            for result in analysis_results
+        ]
+
+    async def analyze_stream(self, results: AsyncIterator[Dict[str, Any]]
+                             ) -> AsyncIterator[List[Dict[str, str]]]:
+        """
+        AI-анализ по мере поступления результатов.
+
+        Пока пачка в работе, новые результаты копятся и уходят следующей
+        пачкой (до batch_size); полные пачки отправляются сразу. Ответы
+        выдаются по пачкам в порядке готовности. Вход читается до конца,
+        даже если AI отключен.
+        """
+        iterator = results.__aiter__()
+        next_result = asyncio.ensure_future(iterator.__anext__())
+        exhausted = False
+        batch: List[Dict[str, Any]] = []
+        in_flight = set()
+
+        try:
+            while not exhausted or in_flight or batch:
+                waiters = set(in_flight)
+                if not exhausted:
+                    waiters.add(next_result)
+                if waiters:
+                    done, _ = await asyncio.wait(waiters, return_when=asyncio.FIRST_COMPLETED)
+                else:
+                    done = set()
+
+                if next_result in done:
+                    try:
+                        batch.append(next_result.result())
+                        next_result = asyncio.ensure_future(iterator.__anext__())
+                    except StopAsyncIteration:
+                        exhausted = True
+
+                if batch and (len(batch) >= self.batch_size or exhausted or not in_flight):
+                    in_flight.add(asyncio.ensure_future(self.analyze(batch)))
+                    batch = []
+
+                for task in done & in_flight:
+                    in_flight.discard(task)
+                    analyses = task.result()
+                    if analyses:
+                        yield analyses
+        finally:
+            for task in in_flight:
+                task.cancel()
+            if not exhausted:
+                next_result.cancel()
+
+    async def close(self):
+        close = getattr(self.client, 'close', None)
+        if close is not None:
+            await close()
+
+
+ai_analyzer = AIAnalyzer(
+    client=(
+        MistralAsyncClient(api_key=Config.MISTRAL_API_KEY, timeout=Config.MISTRAL_TIMEOUT)
+        if Config.MISTRAL_API_KEY else None
+    ),
+    model=Config.MISTRAL_MODEL,
+    cache=analysis_cache,
+    max_concurrency=Config.MISTRAL_MAX_CONCURRENCY,
+    rate_limit=Config.MISTRAL_RATE_LIMIT,
+    batch_size=Config.MISTRAL_BATCH_SIZE
+)
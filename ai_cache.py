@@ -0,0 +1,144 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Увеличивается при изменении текста промпта, чтобы старые ответы не использовались
+PROMPT_VERSION = 2
+
+
+def analysis_cache_key(result: Dict[str, Any], model: str) -> str:
+    """Хэш входных данных промпта: запчасть, предложения, мин. и медианная цена"""
+    payload = {
+        "v": PROMPT_VERSION,
+        "model": model,
+        "part_number": result["part_number"],
+        "name": result["name"],
+        "brands": list(result["brands"]),
+        "quotes": sorted(
+            (p.supplier, p.brand, float(p.price), int(p.delivery))
+            for p in result["all_prices"]
+        ),
+        "min": [result["min_price"].supplier, float(result["min_price"].price)],
+        "median": [result["median_price"].supplier, float(result["median_price"].price)]
+    }
+    encoded = json.dumps(payload, ensure_ascii=False, sort_keys=True).encode()
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class AnalysisCache:
+    """
+    Постоянный кэш ответов Mistral в локальной SQLite-базе.
+
+    Записи живут ttl секунд; при превышении max_entries удаляются самые старые.
+    """
+
+    def __init__(self, path: str, ttl: int, max_entries: int):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+        self.hits = 0
+        self.misses = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS ai_analysis (
+                    cache_key TEXT PRIMARY KEY,
+                    part_number TEXT,
+                    analysis TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+            """)
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_created_at ON ai_analysis (created_at)"
+            )
+            self._conn.commit()
+        return self._conn
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT analysis, created_at FROM ai_analysis WHERE cache_key = ?",
+                (key,)
+            ).fetchone()
+
+        if row is None or row[1] < time.time() - self.ttl:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return row[0]
+
+    def put(self, key: str, part_number: str, analysis: str):
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO ai_analysis (cache_key, part_number, analysis, created_at) "
+                "VALUES (?, ?, ?, ?)",
+                (key, part_number, analysis, time.time())
+            )
+            conn.commit()
+
+    def purge(self) -> int:
+        """Удаление просроченных записей и записей сверх лимита"""
+        with self._lock:
+            conn = self._connection()
+            deleted = conn.execute(
+                "DELETE FROM ai_analysis WHERE created_at < ?",
+                (time.time() - self.ttl,)
+            ).rowcount
+            deleted += conn.execute(
+                "DELETE FROM ai_analysis WHERE cache_key IN ("
+                " SELECT cache_key FROM ai_analysis ORDER BY created_at DESC LIMIT -1 OFFSET ?"
+                ")",
+                (self.max_entries,)
+            ).rowcount
+            conn.commit()
+        if deleted:
+            logger.info(f"AI analysis cache purged {deleted} entries")
+        return deleted
+
+    async def aget(self, key: str) -> Optional[str]:
+        return await asyncio.to_thread(self.get, key)
+
+    async def aput(self, key: str, part_number: str, analysis: str):
+        await asyncio.to_thread(self.put, key, part_number, analysis)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+analysis_cache = AnalysisCache(
+    path=Config.AI_CACHE_PATH,
+    ttl=Config.AI_CACHE_TTL,
+    max_entries=Config.AI_CACHE_MAX_ENTRIES
+)
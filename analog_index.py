@@ -0,0 +1,92 @@
+import hashlib
+import logging
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+def stable_hash(value: str) -> int:
+    """Хэш, одинаковый во всех процессах (встроенный hash() рандомизирован)"""
+    return int(hashlib.md5(value.encode()).hexdigest(), 16)
+
+
+class AnalogIndex:
+    """
+    Граф аналогов в памяти.
+
+    Список смежности: для каждой запчасти - ее аналоги в порядке добавления.
+    Связь взаимная: если B - аналог A, то и A - аналог B. Поиск заменителей -
+    обход в ширину не дальше max_hops, стоимость пропорциональна числу
+    просмотренных связей, без разбора JSON.
+    """
+
+    def __init__(self, max_hops: int, max_results: int):
+        self.max_hops = max_hops
+        self.max_results = max_results
+        self._adjacency: Dict[str, Dict[str, None]] = {}
+        self.edges = 0
+
+    def _link(self, a: str, b: str) -> bool:
+        neighbors = self._adjacency.setdefault(a, {})
+        if b in neighbors:
+            return False
+        neighbors[b] = None
+        return True
+
+    def add(self, part_number: str, analogs: Iterable[str]) -> int:
+        """Добавление аналогов запчасти; возвращает число новых связей"""
+        added = 0
+        for analog in analogs:
+            if not analog or analog == part_number:
+                continue
+            if self._link(part_number, analog):
+                added += 1
+            self._link(analog, part_number)
+        self.edges += added
+        return added
+
+    def load(self, edges: Iterable[Tuple[str, str]]) -> int:
+        """Загрузка пар (запчасть, аналог), например из таблицы part_analogs"""
+        added = sum(self.add(part_number, (analog,)) for part_number, analog in edges)
+        logger.info(f"Analog index: {len(self._adjacency)} parts, {self.edges} links")
+        return added
+
+    def neighbors(self, part_number: str) -> List[str]:
+        return list(self._adjacency.get(part_number, ()))
+
+    def substitutes(self, part_number: str, max_hops: Optional[int] = None,
+                    limit: Optional[int] = None) -> List[Tuple[str, int]]:
+        """Заменители (номер, число шагов): сначала прямые аналоги, затем их аналоги и т.д."""
+        max_hops = self.max_hops if max_hops is None else max_hops
+        limit = self.max_results if limit is None else limit
+
+        found: List[Tuple[str, int]] = []
+        seen = {part_number}
+        queue = deque([(part_number, 0)])
+
+        while queue and len(found) < limit:
+            current, hops = queue.popleft()
+            if hops >= max_hops:
+                continue
+            for analog in self._adjacency.get(current, ()):
+                if analog in seen:
+                    continue
+                seen.add(analog)
+                found.append((analog, hops + 1))
+                if len(found) >= limit:
+                    break
+                queue.append((analog, hops + 1))
+
+        return found
+
+    def __len__(self) -> int:
+        return len(self._adjacency)
+
+
+analog_index = AnalogIndex(
+    max_hops=Config.ANALOG_MAX_HOPS,
+    max_results=Config.ANALOG_MAX_RESULTS
+)
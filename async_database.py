@@ -0,0 +1,70 @@
+import asyncio
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncDatabaseManager:
+    """
+    Асинхронный доступ к DatabaseManager.
+
+    Синхронные вызовы mysql-connector выполняются в отдельном пуле потоков,
+    размер которого равен размеру пула соединений: event loop не блокируется,
+    а пул соединений никогда не исчерпывается.
+    """
+
+    def __init__(self, manager, max_workers: int):
+        self.manager = manager
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix="db"
+        )
+
+    async def run(self, func, *args, **kwargs):
+        """Выполнение синхронной функции в пуле потоков БД"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor,
+            functools.partial(func, *args, **kwargs)
+        )
+
+    async def save_search_results(self, parts_data):
+        return await self.run(self.manager.save_search_results, parts_data)
+
+    async def save_part(self, part):
+        return await self.run(self.manager.save_part_data, part)
+
+    async def save_prices(self, part):
+        return await self.run(self.manager.save_prices, part)
+
+    async def load_part_numbers(self):
+        return await self.run(self.manager.load_part_numbers)
+
+    async def load_analog_edges(self):
+        return await self.run(self.manager.load_analog_edges)
+
+    async def get_part_history(self, part_number, days=30, limit=None, offset=0):
+        return await self.run(self.manager.get_part_history, part_number, days, limit, offset)
+
+    async def get_daily_stats(self, part_number, days=30, limit=None, offset=0):
+        return await self.run(self.manager.get_daily_stats, part_number, days, limit, offset)
+
+    async def log_search_request(self, user_id, username, part_numbers, suppliers, results_count):
+        return await self.run(
+            self.manager.log_search_request,
+            user_id, username, part_numbers, suppliers, results_count
+        )
+
+    async def save_search_requests(self, requests):
+        return await self.run(self.manager.save_search_requests, requests)
+
+    async def save_request_timings(self, timings):
+        return await self.run(self.manager.save_request_timings, timings)
+
+    def shutdown(self, wait: bool = True):
+        """Остановка пула потоков (дожидается завершения начатых запросов)"""
+        self._executor.shutdown(wait=wait)
+        logger.info("Database executor stopped")
@@ -0,0 +1,59 @@
+"""
+Показывает, что одновременные /history больше не выполняются последовательно.
+
+Медленный запрос имитируется синхронной задержкой, как у блокирующего
+mysql-connector. Запуск:
+    python -m benchmarks.history_concurrency --calls 10 --query-latency 0.2
+"""
+import argparse
+import asyncio
+import time
+
+from async_database import AsyncDatabaseManager
+
+
+class SlowHistoryManager:
+    """Заглушка DatabaseManager с блокирующим запросом истории"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def get_part_history(self, part_number, days=30):
+        time.sleep(self.latency)
+        return [{"part_number": part_number}]
+
+
+async def run(calls: int, latency: float, pool_size: int):
+    manager = SlowHistoryManager(latency)
+
+    # Как раньше: синхронный вызов прямо в обработчике
+    async def blocking_handler(part_number):
+        return manager.get_part_history(part_number)
+
+    started = time.perf_counter()
+    await asyncio.gather(*[blocking_handler(f"BP-{i}") for i in range(calls)])
+    blocking_time = time.perf_counter() - started
+
+    async_db = AsyncDatabaseManager(manager, max_workers=pool_size)
+    started = time.perf_counter()
+    await asyncio.gather(*[async_db.get_part_history(f"BP-{i}") for i in range(calls)])
+    async_time = time.perf_counter() - started
+    async_db.shutdown()
+
+    print(f"{calls} concurrent /history calls, {latency * 1000:.0f} ms per query, pool {pool_size}")
+    print(f"  blocking handlers: {blocking_time:.2f} s")
+    print(f"  AsyncDatabaseManager: {async_time:.2f} s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--calls', type=int, default=10)
+    parser.add_argument('--query-latency', type=float, default=0.2)
+    parser.add_argument('--pool-size', type=int, default=5)
+    args = parser.parse_args()
+
+    asyncio.run(run(args.calls, args.query_latency, args.pool_size))
+
+
+if __name__ == '__main__':
+    main()
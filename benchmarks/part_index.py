@@ -0,0 +1,98 @@
+"""
+Индекс каталожных номеров на синтетическом каталоге.
+
+Запуск:
+    python -m benchmarks.part_index --parts 1000000
+"""
+import argparse
+import gc
+import random
+import time
+
+from part_index import PartIndex
+
+PREFIXES = ["BP", "MC", "GR", "SH", "VL", "PM", "FL", "BR"]
+
+
+def synthetic_numbers(count: int, seed: int):
+    rng = random.Random(seed)
+    numbers = set()
+    while len(numbers) < count:
+        numbers.add(
+            f"{rng.choice(PREFIXES)}-{rng.randrange(100000):05d}-{rng.randrange(100000):05d}"
+        )
+    return list(numbers)
+
+
+def typo(part_number: str, rng: random.Random, edits: int) -> str:
+    chars = list(part_number)
+    for _ in range(edits):
+        position = rng.randrange(len(chars))
+        kind = rng.choice(("delete", "replace", "insert", "swap"))
+        if kind == "delete" and len(chars) > 1:
+            del chars[position]
+        elif kind == "insert":
+            chars.insert(position, rng.choice("0123456789"))
+        elif kind == "swap" and position + 1 < len(chars):
+            chars[position], chars[position + 1] = chars[position + 1], chars[position]
+        else:
+            chars[position] = rng.choice("0123456789")
+    return "".join(chars)
+
+
+def timed(label, func, queries):
+    started = time.perf_counter()
+    results = [func(query) for query in queries]
+    per_query = (time.perf_counter() - started) / len(queries)
+    print(f"  {label:<28} {per_query * 1e6:8.1f} µs/query")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--parts', type=int, default=1000000)
+    parser.add_argument('--queries', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    numbers = synthetic_numbers(args.parts, args.seed)
+
+    index = PartIndex()
+    started = time.perf_counter()
+    index.add_many(numbers)
+    print(f"{len(index)} part numbers, bulk load {time.perf_counter() - started:.2f} s")
+
+    # Загруженный индекс живет до конца процесса: убираем его из обходов сборщика мусора,
+    # иначе полные сборки случайно попадают в замеры отдельных запросов
+    gc.collect()
+    gc.freeze()
+
+    # Больше размера буфера SortedStrings: в замер входят и слияния с основным списком
+    new_numbers = [f"ZZ-{i:05d}-00000" for i in range(20000)]
+    started = time.perf_counter()
+    for part_number in new_numbers:
+        index.add(part_number)
+    per_part = (time.perf_counter() - started) / len(new_numbers)
+    print(f"  {'incremental add':<28} {per_part * 1e6:8.1f} µs/part")
+
+    sample = rng.sample(numbers, args.queries)
+    timed("exact lookup", index.__contains__, sample)
+    timed("prefix (first 7 chars)", lambda pn: index.prefix(pn[:7]), sample)
+
+    for edits in (1, 2):
+        originals = sample
+        queries = [typo(pn, rng, edits) for pn in originals]
+        results = timed(f"suggest, {edits} typo(s)", index.suggest, queries)
+        recovered = sum(
+            1 for original, query, found in zip(originals, queries, results)
+            if query == original or original in found
+        )
+        print(f"    original among suggestions: {recovered / len(queries):.1%}")
+
+    unknown = [f"QQ-{rng.randrange(100000):05d}-{rng.randrange(100000):05d}" for _ in sample]
+    timed("suggest, unknown number", index.suggest, unknown)
+
+
+if __name__ == '__main__':
+    main()
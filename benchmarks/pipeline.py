@@ -0,0 +1,586 @@
+"""
+Нагрузочный бенчмарк конвейера бота на локальных заглушках.
+
+handle_message и history_command получают синтетические Update через
+поддельные объекты Telegram; MySQL заменяется SQLite (stubs.database),
+Mistral - FakeMistralClient (stubs.mistral), API поставщиков - стенд
+stubs.supplier_server в отдельном потоке. Задержки всех заглушек задаются
+параметрами. Каждый пользователь шлет следующее сообщение после ответа
+на предыдущее. Результаты пишутся в JSON для сравнения между коммитами:
+    python -m benchmarks.pipeline --output before.json
+    python -m benchmarks.pipeline --output after.json --compare before.json
+    python -m benchmarks.pipeline --scenarios parts-100 users-100 --supplier-latency 0.1
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import socket
+import subprocess
+import tempfile
+import threading
+import time
+from collections import Counter
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from itertools import count
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+from aiohttp import web
+
+# Модули бота, читающие Config, импортируются только после configure_environment
+from models import SUPPLIER_NAMES, Part, Quote
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Ответы бота, после которых запрос считается завершенным (кроме отчета)
+TERMINAL_REPLIES = {
+    '❌': 'not_found',
+    '⚠️': 'error',
+    '⏳': 'rejected',
+    '🔎': 'corrections',
+}
+
+BRANDS = ["SKF", "FAG", "NSK", "Generic", "Standard"]
+
+
+@dataclass
+class Scenario:
+    name: str
+    kind: str  # message, history, db, analyze, report
+    users: int = 1
+    messages: int = 1
+    parts: int = 1
+
+
+SCENARIOS = {
+    'parts-1': Scenario('parts-1', 'message', users=1, messages=50, parts=1),
+    'parts-10': Scenario('parts-10', 'message', users=1, messages=20, parts=10),
+    'parts-100': Scenario('parts-100', 'message', users=1, messages=5, parts=100),
+    'parts-1000': Scenario('parts-1000', 'message', users=1, messages=1, parts=1000),
+    'users-100': Scenario('users-100', 'message', users=100, messages=10, parts=5),
+    'history': Scenario('history', 'history', users=50, messages=40),
+    'db-write': Scenario('db-write', 'db', parts=5000),
+    'analyze-prices': Scenario('analyze-prices', 'analyze', messages=20, parts=1000),
+    'generate-report': Scenario('generate-report', 'report', messages=5, parts=100),
+}
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    """q-й перцентиль по ближайшему рангу"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, min(len(ordered) - 1, int(round(q / 100 * len(ordered))) - 1))]
+
+
+def summarize(seconds: List[float]) -> Dict[str, Any]:
+    """Распределение задержек в миллисекундах"""
+    if not seconds:
+        return {"count": 0}
+    return {
+        "count": len(seconds),
+        "mean": round(sum(seconds) / len(seconds) * 1000, 2),
+        "p50": round(percentile(seconds, 50) * 1000, 2),
+        "p95": round(percentile(seconds, 95) * 1000, 2),
+        "p99": round(percentile(seconds, 99) * 1000, 2),
+        "max": round(max(seconds) * 1000, 2),
+    }
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class SupplierStubThread(threading.Thread):
+    """Стенд API поставщиков в своем потоке и event loop, чтобы не делить loop с ботом"""
+
+    def __init__(self, port: int, latency: float, error_rate: float, seed: int):
+        super().__init__(name="supplier-stub", daemon=True)
+        self.port = port
+        self.latency = latency
+        self.error_rate = error_rate
+        self.seed = seed
+        self.ready = threading.Event()
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def run(self):
+        from stubs.supplier_server import FaultProfile, create_app
+
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        faults = {code: FaultProfile(error_rate=self.error_rate) for code in SUPPLIER_NAMES}
+        runner = web.AppRunner(create_app(self.latency, faults, self.seed), access_log=None)
+        self.loop.run_until_complete(runner.setup())
+        self.loop.run_until_complete(web.TCPSite(runner, '127.0.0.1', self.port).start())
+        self.ready.set()
+        self.loop.run_forever()
+        self.loop.run_until_complete(runner.cleanup())
+        self.loop.close()
+
+    def stop(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.join()
+
+
+def configure_environment(args, supplier_port: int, workdir: str):
+    """Настройки бота для прогона; Config читает окружение при импорте"""
+    base_url = f"http://127.0.0.1:{supplier_port}"
+    os.environ.update({
+        'SUPPLIER_MODE': 'http',
+        'INDUSTRIALSUPPLY_API_URL': f"{base_url}/industrialsupply/v1",
+        'MACHINEPARTS_API_URL': f"{base_url}/machineparts/v1",
+        'FACTORYSTOCK_API_URL': f"{base_url}/factorystock/v1",
+        'AI_CACHE_PATH': os.path.join(workdir, 'ai_analysis.sqlite3'),
+        'MISTRAL_RATE_LIMIT': str(args.mistral_rate),
+        'REPORTS_ARCHIVE_ENABLED': '0',
+        'METRICS_SAMPLE_RATE': '1',
+    })
+    # Лимит частоты на пользователя мешает замерам пропускной способности
+    os.environ.setdefault('USER_PARTS_PER_MINUTE', '0')
+    if args.report_workers is not None:
+        os.environ['REPORT_WORKERS'] = str(args.report_workers)
+
+
+class FakeTelegram:
+    """Счетчик вызовов Bot API с искусственной задержкой каждого"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.calls = 0
+
+    async def call(self):
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+
+class FakeStatusMessage:
+    def __init__(self, message: 'FakeMessage'):
+        self.message = message
+
+    async def edit_text(self, text, **kwargs):
+        await self.message.telegram.call()
+        self.message.observe_reply(text)
+
+    async def delete(self):
+        await self.message.telegram.call()
+
+
+class FakeMessage:
+    """Сообщение пользователя: ответы бота не отправляются, а отмечаются по времени"""
+
+    def __init__(self, telegram: FakeTelegram, text: str = ''):
+        self.telegram = telegram
+        self.text = text
+        self.caption = None
+        self.document = None
+        self.chat = SimpleNamespace(send_action=self.send_action)
+
+        self.sent_at = time.perf_counter()
+        self.finished_at: Optional[float] = None
+        self.first_ai_at: Optional[float] = None
+        self.outcome: Optional[str] = None
+        self.report_bytes = 0
+        self.done = asyncio.Event()
+
+    def finish(self, outcome: str):
+        if self.outcome is None:
+            self.outcome = outcome
+            self.finished_at = time.perf_counter()
+            self.done.set()
+
+    def observe_reply(self, text: str):
+        if text.startswith('🤖') and self.first_ai_at is None:
+            self.first_ai_at = time.perf_counter()
+        for prefix, outcome in TERMINAL_REPLIES.items():
+            if text.startswith(prefix):
+                self.finish(outcome)
+
+    async def send_action(self, **kwargs):
+        await self.telegram.call()
+
+    async def reply_text(self, text, **kwargs):
+        await self.telegram.call()
+        self.observe_reply(text)
+        return FakeStatusMessage(self)
+
+    async def reply_document(self, document, filename=None, caption=None, **kwargs):
+        await self.telegram.call()
+        self.report_bytes = len(document) if isinstance(document, bytes) else 0
+        self.finish('ok')
+
+
+def make_update(user_id: int, message: FakeMessage):
+    user = SimpleNamespace(id=user_id, username=f"bench{user_id}", full_name=f"Bench User {user_id}")
+    return SimpleNamespace(effective_user=user, message=message)
+
+
+def part_number(seq: int, idx: int) -> str:
+    return f"BP-{seq:05d}-{idx:05d}"
+
+
+def synthetic_parts(count_: int, quotes_per_supplier: int = 2) -> List[Part]:
+    return [
+        Part(
+            part_number=part_number(90000, i),
+            name=f"Промышленная запчасть {i}",
+            description="",
+            brands=BRANDS[:2],
+            analogs=[part_number(90001, i)],
+            prices={
+                supplier: [
+                    Quote(supplier, BRANDS[(i + j) % len(BRANDS)],
+                          10000 + (i * 7 + j * 13) % 40000, 1 + (i + j) % 14)
+                    for j in range(quotes_per_supplier)
+                ]
+                for supplier in SUPPLIER_NAMES
+            },
+            supplier_status={}
+        )
+        for i in range(count_)
+    ]
+
+
+class PipelineBenchmark:
+    def __init__(self, args):
+        self.args = args
+        self.sequence = count(1)
+
+        # Модули бота импортируются только после подмены database и настройки окружения
+        from stubs.database import install
+        from stubs.mistral import FakeMistralClient
+
+        self.database = install(latency=args.db_latency)
+        import bot
+        from ai_analyzer import ai_analyzer
+        from bot_core import analyzer
+        from excel_generator import report_generator
+        from metrics import metrics
+        from scheduler import scheduler
+        from write_behind import write_behind
+
+        self.bot = bot
+        self.analyzer = analyzer
+        self.report_generator = report_generator
+        self.metrics = metrics
+        self.scheduler = scheduler
+        self.write_behind = write_behind
+        self.mistral = FakeMistralClient(latency=args.mistral_latency,
+                                         per_part_latency=args.mistral_part_latency)
+        ai_analyzer.client = self.mistral
+        self.telegram = FakeTelegram(args.telegram_latency)
+
+        logging.getLogger().setLevel(args.log_level)
+
+    async def start(self):
+        await self.write_behind.start()
+        await self.bot.report_pool.warm_up()
+
+    async def stop(self):
+        await self.bot.on_shutdown(None)
+
+    async def drain(self):
+        """Ожидание, пока планировщик и отложенная запись в БД опустеют"""
+        while self.scheduler.running or self.scheduler.queued or self.write_behind.qsize():
+            await asyncio.sleep(0.01)
+
+    def _message_text(self, parts: int) -> str:
+        seq = next(self.sequence)
+        text = ", ".join(part_number(seq, i) for i in range(parts))
+        # Уникальные номера не похожи на опечатки только при пустом индексе
+        return text if self.args.typo_check else text + " !exact"
+
+    def _stage_summary(self, name: str, label: str) -> Dict[str, Any]:
+        return {
+            dict(key).get(label, 'all'): {
+                q: round(value * 1000, 2) if q.startswith('p') else value
+                for q, value in summary.items()
+            }
+            for key, summary in self.metrics.percentiles(name).items()
+        }
+
+    async def run_messages(self, scenario: Scenario) -> Dict[str, Any]:
+        latencies, first_ai = [], []
+        outcomes = Counter()
+        report_bytes = []
+
+        async def user_session(user_id: int):
+            for _ in range(scenario.messages):
+                message = FakeMessage(self.telegram, self._message_text(scenario.parts))
+                await self.bot.handle_message(make_update(user_id, message), None)
+                try:
+                    await asyncio.wait_for(message.done.wait(), self.args.request_timeout)
+                except asyncio.TimeoutError:
+                    message.finish('timeout')
+
+                outcomes[message.outcome] += 1
+                latencies.append(message.finished_at - message.sent_at)
+                if message.first_ai_at is not None:
+                    first_ai.append(message.first_ai_at - message.sent_at)
+                if message.report_bytes:
+                    report_bytes.append(message.report_bytes)
+
+        mistral_calls = self.mistral.calls
+        telegram_calls = self.telegram.calls
+        round_trips = self.database.db_manager.round_trips
+
+        started = time.perf_counter()
+        await asyncio.gather(*(user_session(1000 + u) for u in range(scenario.users)))
+        wall = time.perf_counter() - started
+        await self.drain()
+
+        updates = scenario.users * scenario.messages
+        return {
+            "updates": updates,
+            "wall_s": round(wall, 3),
+            "messages_per_s": round(updates / wall, 2),
+            "parts_per_s": round(updates * scenario.parts / wall, 1),
+            "latency_ms": summarize(latencies),
+            "first_ai_reply_ms": summarize(first_ai),
+            "outcomes": dict(outcomes),
+            "report_bytes_mean": round(sum(report_bytes) / len(report_bytes)) if report_bytes else 0,
+            "stages_ms": self._stage_summary('stage_seconds', 'stage'),
+            "suppliers_ms": self._stage_summary('supplier_seconds', 'supplier'),
+            "mistral_calls": self.mistral.calls - mistral_calls,
+            "telegram_calls": self.telegram.calls - telegram_calls,
+            "db_round_trips": self.database.db_manager.round_trips - round_trips,
+        }
+
+    async def run_history(self, scenario: Scenario) -> Dict[str, Any]:
+        part_numbers = [part_number(80000, i) for i in range(self.args.history_parts)]
+        rows = self.database.db_manager.seed_daily_stats(part_numbers, days=30)
+        latencies = []
+
+        async def user_session(user_id: int):
+            for i in range(scenario.messages):
+                message = FakeMessage(self.telegram, '')
+                context = SimpleNamespace(args=[part_numbers[(user_id + i) % len(part_numbers)],
+                                                str(1 + i % 3)])
+                started = time.perf_counter()
+                await self.bot.history_command(make_update(user_id, message), context)
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(user_session(u) for u in range(scenario.users)))
+        wall = time.perf_counter() - started
+
+        calls = scenario.users * scenario.messages
+        return {
+            "updates": calls,
+            "seeded_rows": rows,
+            "wall_s": round(wall, 3),
+            "calls_per_s": round(calls / wall, 2),
+            "latency_ms": summarize(latencies),
+            "db_query_ms": self._stage_summary('db_query_seconds', 'query'),
+        }
+
+    async def run_db_write(self, scenario: Scenario) -> Dict[str, Any]:
+        """Запись найденных запчастей через write-behind до полного сброса в БД"""
+        parts = synthetic_parts(scenario.parts)
+        round_trips = self.database.db_manager.round_trips
+        flushed = self.write_behind.flushed + len(parts)
+
+        started = time.perf_counter()
+        await self.write_behind.enqueue_parts(parts)
+        # Пустая очередь - еще не конец: последняя пачка может быть в записи
+        while self.write_behind.flushed < flushed:
+            await asyncio.sleep(0.005)
+        wall = time.perf_counter() - started
+
+        return {
+            "parts": len(parts),
+            "wall_s": round(wall, 3),
+            "parts_per_s": round(len(parts) / wall, 1),
+            "db_round_trips": self.database.db_manager.round_trips - round_trips,
+            "flush_ms": self._stage_summary('db_flush_seconds', 'table'),
+        }
+
+    def run_analyze(self, scenario: Scenario) -> Dict[str, Any]:
+        """Микробенчмарк анализа цен (analyze_batch и поштучный analyze_prices)"""
+        parts = synthetic_parts(scenario.parts)
+        batch, single = [], []
+        for _ in range(scenario.messages):
+            started = time.perf_counter()
+            self.analyzer.analyze_batch(parts)
+            batch.append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            for part in parts[:100]:
+                self.analyzer.analyze_prices(part)
+            single.append((time.perf_counter() - started) / min(100, len(parts)))
+
+        return {
+            "parts": len(parts),
+            "analyze_batch_ms": summarize(batch),
+            "analyze_batch_us_per_part": round(min(batch) / len(parts) * 1e6, 2),
+            "analyze_prices_us_per_part": round(min(single) * 1e6, 2),
+        }
+
+    def run_report(self, scenario: Scenario) -> Dict[str, Any]:
+        """Микробенчмарк Excel-отчета: обычный и потоковый режим на 10x, 1x и 0.1x запчастей"""
+        sizes = {}
+        for size in sorted({max(1, scenario.parts // 10), scenario.parts, scenario.parts * 10}):
+            analysis_results = self.analyzer.analyze_batch(synthetic_parts(size))
+            for streaming in (False, True):
+                timings = []
+                report = b''
+                for _ in range(scenario.messages):
+                    started = time.perf_counter()
+                    report = self.report_generator.render_report(analysis_results, streaming=streaming)
+                    timings.append(time.perf_counter() - started)
+                sizes[f"{size}_{'streaming' if streaming else 'classic'}"] = {
+                    "parts": size,
+                    "render_ms": summarize(timings),
+                    "bytes": len(report),
+                }
+        return {"reports": sizes}
+
+    async def run(self, scenario: Scenario) -> Dict[str, Any]:
+        self.metrics.reset()
+        if scenario.kind == 'message':
+            return await self.run_messages(scenario)
+        if scenario.kind == 'history':
+            return await self.run_history(scenario)
+        if scenario.kind == 'db':
+            return await self.run_db_write(scenario)
+        if scenario.kind == 'analyze':
+            return self.run_analyze(scenario)
+        return self.run_report(scenario)
+
+
+def scaled(scenario: Scenario, scale: float) -> Scenario:
+    """Число сообщений (повторов) умножается на scale, размер сообщения не меняется"""
+    if scale == 1:
+        return scenario
+    messages = max(1, round(scenario.messages * scale))
+    return Scenario(scenario.name, scenario.kind, scenario.users, messages, scenario.parts)
+
+
+def git_commit() -> Optional[str]:
+    """Коммит репозитория бота, откуда бы ни был запущен бенчмарк"""
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+            cwd=REPO_ROOT
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any]):
+    """Изменение пропускной способности и p95 относительно прошлого прогона"""
+    print(f"\nvs {baseline['meta'].get('commit')} ({baseline['meta'].get('started_at')})")
+    for name, result in current['scenarios'].items():
+        before = baseline['scenarios'].get(name)
+        if not before:
+            continue
+        for key in ('messages_per_s', 'calls_per_s', 'parts_per_s'):
+            if key in result and before.get(key):
+                change = (result[key] / before[key] - 1) * 100
+                print(f"  {name:<16} {key:<15} {before[key]:>10} -> {result[key]:>10}  {change:+6.1f}%")
+        p95, p95_before = result.get('latency_ms', {}).get('p95'), before.get('latency_ms', {}).get('p95')
+        if p95 is not None and p95_before:
+            change = (p95 / p95_before - 1) * 100
+            print(f"  {name:<16} {'p95 ms':<15} {p95_before:>10} -> {p95:>10}  {change:+6.1f}%")
+
+
+def print_result(name: str, result: Dict[str, Any]):
+    latency = result.get('latency_ms')
+    if latency and latency.get('count'):
+        rate = result.get('messages_per_s', result.get('calls_per_s'))
+        print(
+            f"  {name:<16} {result['updates']:>6} updates  {rate:>8}/s  "
+            f"p50 {latency['p50']:>8} ms  p95 {latency['p95']:>8} ms  p99 {latency['p99']:>8} ms"
+        )
+    elif 'parts_per_s' in result:
+        print(f"  {name:<16} {result['parts']:>6} parts    {result['parts_per_s']:>8} parts/s")
+    elif 'analyze_batch_us_per_part' in result:
+        print(
+            f"  {name:<16} {result['parts']:>6} parts    "
+            f"batch {result['analyze_batch_us_per_part']} us/part, "
+            f"single {result['analyze_prices_us_per_part']} us/part"
+        )
+    else:
+        for key, report in result['reports'].items():
+            print(f"  {name:<16} {key:<18} p50 {report['render_ms']['p50']:>8} ms  {report['bytes']:>9} B")
+
+
+async def run(args) -> Dict[str, Any]:
+    benchmark = PipelineBenchmark(args)
+    await benchmark.start()
+    results = {}
+    try:
+        for name in args.scenarios:
+            scenario = scaled(SCENARIOS[name], args.scale)
+            results[name] = {"scenario": asdict(scenario), **await benchmark.run(scenario)}
+            print_result(name, results[name])
+    finally:
+        await benchmark.stop()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scenarios', nargs='+', choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help='множитель числа сообщений и повторов в сценариях')
+    parser.add_argument('--supplier-latency', type=float, default=0.05)
+    parser.add_argument('--supplier-error-rate', type=float, default=0.0)
+    parser.add_argument('--mistral-latency', type=float, default=0.3)
+    parser.add_argument('--mistral-part-latency', type=float, default=0.02)
+    parser.add_argument('--mistral-rate', type=float, default=0,
+                        help='лимит запросов к Mistral в секунду (0 - без лимита)')
+    parser.add_argument('--db-latency', type=float, default=0.002)
+    parser.add_argument('--telegram-latency', type=float, default=0.03)
+    parser.add_argument('--report-workers', type=int, default=None)
+    parser.add_argument('--history-parts', type=int, default=200)
+    parser.add_argument('--request-timeout', type=float, default=300)
+    parser.add_argument('--typo-check', action='store_true',
+                        help='не добавлять !exact (включает подсказки об опечатках)')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--compare', help='JSON прошлого прогона для сравнения')
+    parser.add_argument('--log-level', default='WARNING')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='bench_') as workdir:
+        port = free_port()
+        configure_environment(args, port, workdir)
+        stub = SupplierStubThread(port, args.supplier_latency, args.supplier_error_rate, args.seed)
+        stub.start()
+        stub.ready.wait()
+
+        started_at = datetime.now().isoformat(timespec='seconds')
+        try:
+            scenarios = asyncio.run(run(args))
+        finally:
+            stub.stop()
+
+    output = {
+        "meta": {
+            "commit": git_commit(),
+            "started_at": started_at,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "args": {k: v for k, v in vars(args).items() if k not in ('output', 'compare')},
+        },
+        "scenarios": scenarios,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(output, f, ensure_ascii=False, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            compare(json.load(f), output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""
+Память и время: предложения в словарях против Part/Quote со __slots__.
+
+Сравнивается путь данных от ответа поставщика до входа генерации отчета:
+сборка предложений и подготовка all_prices (раньше - копия каждого словаря
+с supplier и supplier_name). Запуск:
+    python -m benchmarks.quote_model --parts 20000
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+
+from models import SUPPLIER_NAMES, Part, Quote
+
+BRANDS = ["SKF", "FAG", "NSK", "Generic", "Standard"]
+
+
+def raw_offers(parts: int, per_supplier: int):
+    """Разобранный JSON поставщиков: каждое поле - отдельная строка, как после json.loads"""
+    return [
+        (
+            f"BP-{i:05d}-67890",
+            {
+                supplier: [
+                    ("".join(BRANDS[(i + j) % len(BRANDS)]), 10000 + (i * 7 + j) % 40000, 1 + (i + j) % 14)
+                    for j in range(per_supplier)
+                ]
+                for supplier in ("".join(code) for code in SUPPLIER_NAMES)
+            }
+        )
+        for i in range(parts)
+    ]
+
+
+def build_dicts(offers):
+    parts = []
+    for part_number, prices in offers:
+        part_data = {
+            "part_number": part_number,
+            "name": part_number,
+            "description": "",
+            "brands": [],
+            "analogs": [],
+            "prices": {
+                supplier: [{"brand": b, "price": p, "delivery": d} for b, p, d in quotes]
+                for supplier, quotes in prices.items()
+            }
+        }
+        # Как в прежнем analyze_prices: копия каждого предложения с поставщиком
+        part_data["all_prices"] = [
+            {**quote, "supplier": supplier, "supplier_name": SUPPLIER_NAMES.get(supplier, supplier)}
+            for supplier, quotes in part_data["prices"].items()
+            for quote in quotes
+        ]
+        parts.append(part_data)
+    return parts
+
+
+def build_models(offers):
+    parts = []
+    for part_number, prices in offers:
+        part = Part(
+            part_number=part_number,
+            name=part_number,
+            description="",
+            brands=[],
+            analogs=[],
+            prices={
+                supplier: [Quote(supplier, b, p, d) for b, p, d in quotes]
+                for supplier, quotes in prices.items()
+            },
+            supplier_status={}
+        )
+        parts.append((part, part.quotes()))
+    return parts
+
+
+def measure(build, offers):
+    """Время (без tracemalloc, он сильно замедляет) и память, занятая результатом"""
+    gc.collect()
+    started = time.perf_counter()
+    build(offers)
+    elapsed = time.perf_counter() - started
+
+    gc.collect()
+    tracemalloc.start()
+    result = build(offers)
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return elapsed, memory
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--parts', type=int, default=20000)
+    parser.add_argument('--quotes-per-supplier', type=int, default=2)
+    args = parser.parse_args()
+
+    offers = raw_offers(args.parts, args.quotes_per_supplier)
+    quotes = args.parts * len(SUPPLIER_NAMES) * args.quotes_per_supplier
+    print(f"{args.parts} parts, {quotes} quotes")
+
+    for label, build in (("dicts", build_dicts), ("Part/Quote", build_models)):
+        elapsed, memory = measure(build, offers)
+        print(
+            f"  {label:<11} {elapsed * 1000:8.1f} ms  {memory / 2 ** 20:7.1f} MiB  "
+            f"{memory / quotes:6.0f} B/quote"
+        )
+
+
+if __name__ == '__main__':
+    main()
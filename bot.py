@@ -0,0 +1,729 @@
+import asyncio
+import logging
+import math
+import os
+import tempfile
+import time
+from itertools import chain
+from telegram import Update
+from telegram.ext import Application, CommandHandler, MessageHandler, filters, ContextTypes
+
+from config import Config
+from bot_core import analyzer, build_analysis_rows
+from excel_generator import report_generator
+from report_pool import report_pool, ReportQueueFull
+from database import async_db
+from suppliers import supplier_registry
+from write_behind import write_behind
+from ai_cache import analysis_cache
+from ai_analyzer import ai_analyzer
+from metrics import STAGES, RequestTiming, metrics
+from price_cache import price_cache
+from supplier_health import LATENCY_BUCKETS, supplier_health
+from progress import ProgressReporter
+from scheduler import scheduler, SchedulerFull, UserRateLimited
+from bulk_upload import BulkUploadError, SUPPORTED_EXTENSIONS, file_extension, run_bulk_search
+from retention import retention_manager
+from analog_index import analog_index
+from part_index import part_index
+
+logging.basicConfig(
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    level=logging.INFO
+)
+logger = logging.getLogger(__name__)
+
+# Фоновые задачи, запущенные при старте и отменяемые при остановке
+background_tasks = []
+# HTTP-серверы (эндпоинт метрик), останавливаемые при остановке
+servers = []
+
+
+async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Обработчик команды /start"""
+    welcome_text = """
+🏭 *Industrial Parts Analyzer Bot*
+
+Я помогаю анализировать цены на промышленные запчасти.
+
+*Как использовать:*
+1. Отправьте каталожные номера через запятую:
+   `BP-12345-67890, MC-54321-09876`
+
+2. Укажите поставщиков (опционально):
+   `!industrialsupply` - IndustrialSupply.ru
+   `!machineparts` - MachineParts.com
+   `!factorystock` - FactoryStock.eu
+
+*Примеры:*
+- `BP-12345-67890` - поиск у всех поставщиков
+- `BP-12345-67890 !industrialsupply !machineparts` - только у двух
+- `BP-12345-67890, GR-98765-43210 !factorystock` - две запчасти, один поставщик
+- `BP-12345-67890 !refresh` - обновить цены, не используя кэш
+- `BP-12345-6789 !exact` - без подсказок об опечатках в ненайденных номерах
+
+3. Большой список - файлом .xlsx или .csv: номера в первой колонке
+   (или в колонке с заголовком «Номер»/«Артикул»), флаги - в подписи к файлу.
+
+Результат: Excel-отчет с анализом цен и рекомендациями AI.
+    """
+
+    await update.message.reply_text(welcome_text, parse_mode='Markdown')
+
+async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Обработчик команды /help"""
+    help_text = """
+📋 *Доступные команды:*
+
+/start - Начало работы
+/help - Эта справка
+/history [номер] [страница] - История цен за 30 дней
+/stats - Задержки обработки запросов (для администраторов)
+
+*Поставщики:*
+• IndustrialSupply.ru - Широкий ассортимент
+• MachineParts.com - Европейские бренды
+• FactoryStock.eu - Быстрая доставка
+
+*Формат номеров:*
+BP-xxxxx-xxxxx - Подшипники
+MC-xxxxx-xxxxx - Муфты
+GR-xxxxx-xxxxx - Редукторы
+    """
+
+    await update.message.reply_text(help_text, parse_mode='Markdown')
+
+async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Обработка текстовых сообщений с номерами запчастей"""
+    user = update.effective_user
+    message_text = update.message.text
+
+    logger.info(f"Message from {user.id}: {message_text}")
+    timing = RequestTiming(metrics, 'message', user.id)
+
+    # Показать индикатор "печатает"
+    await update.message.chat.send_action(action="typing")
+
+    try:
+        # Извлечение параметров поиска
+        with timing.stage('parse'):
+            part_numbers, suppliers = analyzer.extract_search_params(message_text)
+
+        if not part_numbers:
+            await update.message.reply_text(
+                "❌ Не найдены каталожные номера запчастей.\n"
+                "Пример: `BP-12345-67890, MC-54321-09876`",
+                parse_mode='Markdown'
+            )
+            return
+
+        # Подсказки по номерам, которых нет в индексе; поиск они не блокируют
+        corrections = {}
+        if not analyzer.wants_exact(message_text):
+            with timing.stage('parse'):
+                corrections = analyzer.suggest_corrections(part_numbers)
+
+    except Exception as e:
+        logger.error(f"Error processing message: {e}")
+        await update.message.reply_text(
+            "⚠️ Произошла ошибка при обработке запроса. Попробуйте позже."
+        )
+        return
+
+    timing.parts_count = len(set(part_numbers))
+    await submit_job(
+        update, timing.parts_count,
+        lambda: run_search(update, part_numbers, suppliers, message_text, timing, corrections),
+        timing
+    )
+
+async def submit_job(update: Update, cost: int, factory, timing: RequestTiming):
+    """Передача заявки планировщику; если она не запущена сразу - ответ с местом в очереди"""
+    queued_at = time.perf_counter()
+
+    async def run():
+        timing.add('queue', time.perf_counter() - queued_at)
+        await factory()
+
+    try:
+        position = scheduler.submit(update.effective_user.id, cost, run)
+    except UserRateLimited as e:
+        await finish_timing(timing, 'rate_limited')
+        await update.message.reply_text(
+            f"⏳ Слишком много запросов подряд. Повторите через {math.ceil(e.retry_after)} сек."
+        )
+        return
+    except SchedulerFull:
+        await finish_timing(timing, 'rejected')
+        await update.message.reply_text(
+            "⏳ Бот сейчас перегружен, очередь заполнена. Повторите запрос через пару минут."
+        )
+        return
+
+    if position:
+        await update.message.reply_text(
+            f"🕐 Запрос в очереди, позиция: {position}. Обработка начнется автоматически."
+        )
+
+async def finish_timing(timing: RequestTiming, outcome=None):
+    """Запись времени стадий в метрики; запросы из выборки - в request_timings"""
+    row = timing.finish(outcome)
+    if row is not None:
+        try:
+            await write_behind.enqueue_request_timing(row)
+        except RuntimeError as e:
+            logger.debug(f"Request timing not saved: {e}")
+
+async def run_search(update: Update, part_numbers, suppliers, message_text, timing: RequestTiming,
+                     corrections=None):
+    """Поиск, анализ и отчет по сообщению; запускается планировщиком.
+
+    corrections - подсказки по номерам вне индекса, показываются для тех,
+    по которым поставщики ничего не вернули
+    """
+    user = update.effective_user
+
+    try:
+        # Сообщение о начале поиска
+        supplier_names = [
+            analyzer.supplier_mapping.get(s, s)
+            for s in suppliers
+        ]
+
+        unique_parts = list(dict.fromkeys(part_numbers))
+        status_msg = await update.message.reply_text(
+            f"🔍 *Поиск информации...*\n"
+            f"• Запчастей: {len(unique_parts)}\n"
+            f"• Поставщики: {', '.join(supplier_names)}\n"
+            f"⏳ Ожидайте...",
+            parse_mode='Markdown'
+        )
+        progress = ProgressReporter(
+            status_msg, len(unique_parts), supplier_names, Config.PROGRESS_UPDATE_INTERVAL
+        )
+
+        # Конвейер: поиск -> анализ -> AI, каждая запчасть идет дальше, как только готова
+        analysis_results = []
+        ai_analyses = []
+
+        # Стадии конвейера перекрываются: search - до последнего ответа поставщиков,
+        # ai - сколько еще ждали AI после него
+        pipeline_started = time.perf_counter()
+        search_done = None
+
+        async def analyzed_parts():
+            nonlocal search_done
+            async for part in analyzer.search_parts_iter(
+                    part_numbers, suppliers,
+                    force_refresh=analyzer.wants_refresh(message_text)):
+                progress.searched += 1
+                with timing.stage('analysis'):
+                    results = analyzer.analyze_batch([part])
+                for result in results:
+                    progress.analyzed += 1
+                    analysis_results.append(result)
+                    yield result
+                progress.update()
+            search_done = time.perf_counter()
+            timing.add('search', search_done - pipeline_started)
+
+        ai_enabled = ai_analyzer.client is not None
+        if ai_enabled:
+            stream = ai_analyzer.analyze_stream(analyzed_parts())
+            title = AI_TITLE
+        else:
+            # Без AI по готовым запчастям отправляется краткая сводка цен
+            stream = price_summaries(analyzed_parts(), Config.MISTRAL_BATCH_SIZE)
+            title = PRICE_SUMMARY_TITLE
+
+        try:
+            async for analyses in stream:
+                if ai_enabled:
+                    ai_analyses.extend(analyses)
+                    progress.ai_done += len(analyses)
+                    progress.update()
+
+                # Рекомендации по готовым запчастям - не дожидаясь остальных
+                for analysis_text in split_ai_messages(analyses, title=title):
+                    await update.message.reply_text(analysis_text, parse_mode='Markdown')
+            if ai_enabled and search_done is not None:
+                timing.add('ai', time.perf_counter() - search_done)
+            timing.results_count = len(analysis_results)
+
+            found = {result['part_number'] for result in analysis_results}
+            missed = {
+                part_number: suggestions
+                for part_number, suggestions in (corrections or {}).items()
+                if part_number not in found
+            }
+            flags = analyzer.message_flags(message_text)
+
+            if not analysis_results:
+                await progress.close()
+                if missed:
+                    timing.outcome = 'corrections'
+                    await status_msg.edit_text(format_corrections(missed, flags), parse_mode='Markdown')
+                else:
+                    timing.outcome = 'not_found'
+                    await status_msg.edit_text("❌ Не удалось найти информацию по указанным запчастям.")
+                return
+
+            # Отчет - в порядке запроса, а не в порядке готовности
+            order = {part_number: idx for idx, part_number in enumerate(unique_parts)}
+            analysis_results.sort(key=lambda result: order[result['part_number']])
+
+            # Генерация Excel отчета
+            progress.update("Формирование отчета")
+            user_info = {
+                'id': user.id,
+                'username': user.username,
+                'full_name': user.full_name
+            }
+
+            try:
+                with timing.stage('report'):
+                    report_bytes = await report_pool.render(analysis_results, user_info)
+            except ReportQueueFull:
+                timing.outcome = 'report_busy'
+                await progress.close()
+                await status_msg.edit_text(
+                    "⏳ Сейчас формируется слишком много отчетов. Повторите запрос через минуту."
+                )
+                return
+
+            # Отправка файла прямо из памяти
+            timing.report_bytes = len(report_bytes)
+            with timing.stage('upload'):
+                await update.message.reply_document(
+                    document=report_bytes,
+                    filename=f"parts_analysis_{user.id}.xlsx",
+                    caption=f"📊 Отчет по {len(analysis_results)} запчастям"
+                )
+
+            if Config.REPORTS_ARCHIVE_ENABLED:
+                await asyncio.to_thread(report_generator.archive_report, report_bytes, user.id)
+
+            # Удаление статус-сообщения
+            await progress.close()
+            await status_msg.delete()
+
+            if missed:
+                await update.message.reply_text(format_corrections(missed, flags), parse_mode='Markdown')
+        finally:
+            await progress.close()
+
+        # Логирование запроса в БД (отложенная запись)
+        with timing.stage('db'):
+            await write_behind.enqueue_search_request(
+                user.id, user.username, part_numbers, suppliers, len(analysis_results),
+                analyses=build_analysis_rows(analysis_results, ai_analyses)
+            )
+
+    except Exception as e:
+        timing.outcome = 'error'
+        logger.error(f"Error processing message: {e}")
+        await update.message.reply_text(
+            "⚠️ Произошла ошибка при обработке запроса. Попробуйте позже."
+        )
+    finally:
+        await finish_timing(timing)
+
+async def handle_document(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Массовый поиск: список номеров в файле .xlsx или .csv"""
+    user = update.effective_user
+    document = update.message.document
+
+    logger.info(f"Document from {user.id}: {document.file_name} ({document.file_size} bytes)")
+
+    extension = file_extension(document.file_name)
+    if extension not in SUPPORTED_EXTENSIONS:
+        await update.message.reply_text(
+            "❌ Поддерживаются файлы .xlsx и .csv со списком каталожных номеров."
+        )
+        return
+
+    if document.file_size and document.file_size > Config.BULK_MAX_FILE_MB * 2 ** 20:
+        await update.message.reply_text(
+            f"❌ Файл больше {Config.BULK_MAX_FILE_MB:g} МБ. Разделите список на части."
+        )
+        return
+
+    # Число номеров до чтения файла неизвестно: в очереди файл весит как наибольший список
+    timing = RequestTiming(metrics, 'bulk', user.id)
+    await submit_job(
+        update, Config.BULK_MAX_PARTS,
+        lambda: run_bulk_document(update, context, timing),
+        timing
+    )
+
+async def run_bulk_document(update: Update, context: ContextTypes.DEFAULT_TYPE,
+                            timing: RequestTiming):
+    """Скачивание файла, массовый поиск и сводный отчет; запускается планировщиком"""
+    user = update.effective_user
+    document = update.message.document
+    caption = update.message.caption or ""
+    extension = file_extension(document.file_name)
+
+    _, suppliers = analyzer.extract_search_params(caption)
+    supplier_names = [analyzer.supplier_mapping.get(s, s) for s in suppliers]
+    user_info = {
+        'id': user.id,
+        'username': user.username,
+        'full_name': user.full_name
+    }
+
+    status_msg = await update.message.reply_text(
+        f"📥 *Файл получен:* {document.file_name}\n"
+        f"• Поставщики: {', '.join(supplier_names)}\n"
+        f"⏳ Обработка...",
+        parse_mode='Markdown'
+    )
+
+    async def on_progress(processed, found):
+        try:
+            await status_msg.edit_text(
+                f"🔍 Обработано запчастей: {processed}, найдено: {found}\n⏳ Ожидайте..."
+            )
+        except Exception as e:
+            logger.debug(f"Progress update skipped: {e}")
+
+    fd, upload_path = tempfile.mkstemp(suffix=extension, prefix='upload_', dir=Config.BULK_TEMP_DIR)
+    os.close(fd)
+    result = None
+
+    try:
+        # Файл скачивается на диск, а не в память
+        with timing.stage('download'):
+            telegram_file = await context.bot.get_file(document.file_id)
+            await telegram_file.download_to_drive(upload_path)
+
+        result = await run_bulk_search(
+            upload_path, document.file_name, suppliers, user_info,
+            force_refresh=analyzer.wants_refresh(caption),
+            on_progress=on_progress,
+            timing=timing
+        )
+
+        if not result.requested:
+            timing.outcome = 'not_found'
+            await status_msg.edit_text("❌ В файле не найдены каталожные номера запчастей.")
+            return
+
+        caption_lines = [f"📊 Сводный отчет: найдено {result.found} из {result.requested} запчастей"]
+        if result.duplicates:
+            caption_lines.append(f"Повторов пропущено: {result.duplicates}")
+        if result.skipped:
+            caption_lines.append(f"Нераспознанных строк: {result.skipped}")
+        if result.truncated:
+            caption_lines.append(f"⚠️ Обработаны первые {Config.BULK_MAX_PARTS} номеров")
+
+        with open(result.report_path, 'rb') as report, timing.stage('upload'):
+            await update.message.reply_document(
+                document=report,
+                filename=f"parts_bulk_{user.id}.xlsx",
+                caption="\n".join(caption_lines)
+            )
+
+        await status_msg.delete()
+
+    except BulkUploadError as e:
+        timing.outcome = 'bad_file'
+        logger.warning(f"Bulk upload from {user.id} rejected: {e}")
+        await status_msg.edit_text("❌ Не удалось прочитать файл. Нужен .xlsx или .csv с номерами в первой колонке.")
+    except Exception as e:
+        timing.outcome = 'error'
+        logger.error(f"Error processing document: {e}")
+        await update.message.reply_text(
+            "⚠️ Произошла ошибка при обработке файла. Попробуйте позже."
+        )
+    finally:
+        os.unlink(upload_path)
+        if result is not None:
+            os.unlink(result.report_path)
+        await finish_timing(timing)
+
+def format_corrections(corrections, flags=()):
+    """Подсказки по ненайденным номерам и запрос с исправленными номерами"""
+    lines = ["🔎 *Не найдены, возможно опечатка в номерах:*", ""]
+    for part_number, suggestions in corrections.items():
+        variants = ", ".join(f"`{s}`" for s in suggestions)
+        lines.append(f"• `{part_number}` → {variants}")
+
+    corrected = ", ".join(suggestions[0] for suggestions in corrections.values())
+    if flags:
+        corrected += " " + " ".join(flags)
+    lines += ["", f"Искать исправленные: `{corrected}`"]
+    return "\n".join(lines)
+
+AI_TITLE = "🤖 *AI Анализ цен:*"
+PRICE_SUMMARY_TITLE = "💰 *Цены:*"
+
+def format_price_summary(result):
+    """Краткая сводка цен по запчасти - вместо AI-анализа, когда AI отключен"""
+    best = result['min_price']
+    value = result['best_value']
+    stats = result['stats']
+    return (
+        f"Минимальная цена: {best.price} руб., {best.delivery} дн. ({best.supplier_name})\n"
+        f"Цена/срок: {value.price} руб., {value.delivery} дн. ({value.supplier_name})\n"
+        f"Предложений: {stats['count']} от {stats['suppliers']} поставщиков"
+    )
+
+async def price_summaries(analysis_results, batch_size):
+    """Сводки цен по мере готовности запчастей, пачками до batch_size"""
+    batch = []
+    async for result in analysis_results:
+        batch.append({
+            'part_number': result['part_number'],
+            'analysis': format_price_summary(result)
+        })
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def split_ai_messages(ai_analyses, limit=4000, title=AI_TITLE):
+    """Анализ всех запчастей, разбитый на сообщения в пределах лимита Telegram"""
+    messages = []
+    analysis_text = f"{title}\n\n"
+
+    for ai_analysis in ai_analyses:
+        block = f"*{ai_analysis['part_number']}*\n{ai_analysis['analysis']}\n\n"
+        if len(analysis_text) + len(block) > limit and analysis_text.strip():
+            messages.append(analysis_text)
+            analysis_text = ""
+        analysis_text += block[:limit]
+
+    if analysis_text.strip():
+        messages.append(analysis_text)
+    return messages
+
+def format_latency(summary):
+    """p50 / p95 / p99 в миллисекундах и число наблюдений"""
+    # Перцентиль - верхняя граница корзины; быстрее нижней корзины не различаются
+    floor = LATENCY_BUCKETS[0]
+    return (
+        " / ".join(
+            f"≤{floor * 1000:.0f}" if summary[q] <= floor else f"{summary[q] * 1000:.0f}"
+            for q in ('p50', 'p95', 'p99')
+        )
+        + f" ({summary['count']})"
+    )
+
+def format_stats():
+    """Сводка задержек за окно METRICS_WINDOW для /stats"""
+    lines = [f"📊 Задержки за {Config.METRICS_WINDOW / 60:.0f} мин, p50 / p95 / p99 мс (число)", ""]
+    sections = [
+        ("Запросы", 'request_seconds', ('kind', 'outcome')),
+        ("Стадии", 'stage_seconds', ('kind', 'stage')),
+        ("Поставщики", 'supplier_seconds', ('supplier', 'outcome')),
+        ("Mistral", 'mistral_seconds', ()),
+        ("Запись в БД", 'db_flush_seconds', ('table',)),
+    ]
+    for title, name, label_names in sections:
+        summary = metrics.percentiles(name)
+        if not summary:
+            continue
+        # Стадии - в порядке обработки, остальное - по меткам
+        items = sorted(summary.items(), key=lambda item: (
+            dict(item[0]).get('kind', ''),
+            STAGES.index(dict(item[0])['stage']) if name == 'stage_seconds' else item[0]
+        ))
+        lines.append(f"{title}:")
+        for key, values in items:
+            labels = dict(key)
+            label = " ".join(labels[label_name] for label_name in label_names) or "все"
+            lines.append(f"• {label}: {format_latency(values)}")
+        lines.append("")
+
+    if len(lines) == 2:
+        lines.append("Запросов за это время не было.\n")
+
+    cache = price_cache.stats()
+    queue = scheduler.stats()
+    lines.append(f"Кэш цен: {cache['hit_rate']:.0%} попаданий, {cache['entries']} записей")
+    lines.append(
+        f"Заявки: в работе {queue['running']}, в очереди {queue['queued']}; "
+        f"ожидают записи в БД: {write_behind.qsize()}"
+    )
+    return "\n".join(lines)
+
+async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Команда для администраторов: перцентили задержек по стадиям"""
+    if update.effective_user.id not in Config.ADMIN_IDS:
+        await update.message.reply_text("⛔ Команда доступна только администраторам.")
+        return
+
+    await update.message.reply_text(format_stats())
+
+def runtime_metrics():
+    """Состояние кэшей, очередей и поставщиков для эндпоинта метрик"""
+    cache = price_cache.stats()
+    yield 'price_cache_hits_total', 'counter', {}, cache['hits']
+    yield 'price_cache_misses_total', 'counter', {}, cache['misses']
+    yield 'price_cache_coalesced_total', 'counter', {}, cache['coalesced']
+    yield 'price_cache_entries', 'gauge', {}, cache['entries']
+
+    ai_cache = analysis_cache.stats()
+    yield 'ai_cache_hits_total', 'counter', {}, ai_cache['hits']
+    yield 'ai_cache_misses_total', 'counter', {}, ai_cache['misses']
+
+    yield 'write_behind_queued', 'gauge', {}, write_behind.qsize()
+    yield 'write_behind_flushed_total', 'counter', {}, write_behind.flushed
+    yield 'write_behind_dropped_total', 'counter', {}, write_behind.dropped
+
+    for key, value in scheduler.stats().items():
+        yield f'scheduler_{key}', 'gauge', {}, value
+
+    for code, health in supplier_health.stats().items():
+        labels = {'supplier': code}
+        yield 'supplier_circuit_closed', 'gauge', labels, int(health['state'] == 'closed')
+        yield 'supplier_timeout_seconds', 'gauge', labels, health['timeout']
+        for key in ('requests', 'failures', 'skipped', 'hedges', 'hedge_wins'):
+            yield f'supplier_{key}_total', 'counter', labels, health[key]
+
+def format_daily_stat(record):
+    """Строка дневной статистики для /history"""
+    brand = f" ({record['brand']})" if record['brand'] else ""
+    if record['min_price'] == record['max_price']:
+        price = f"{record['min_price']:.0f} руб."
+    else:
+        price = (
+            f"{record['min_price']:.0f}–{record['max_price']:.0f} руб., "
+            f"ср. {record['avg_price']:.0f}"
+        )
+    return (
+        f"{record['supplier_name']}{brand}: {price} "
+        f"({record['quote_count']} зап., {record['last_delivery_days']} дн.)"
+    )
+
+async def history_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Команда для просмотра истории цен"""
+    args = context.args
+
+    if not args:
+        await update.message.reply_text(
+            "Укажите каталожный номер: `/history BP-12345-67890`",
+            parse_mode='Markdown'
+        )
+        return
+
+    part_number = args[0].upper()
+    page = int(args[1]) if len(args) > 1 and args[1].isdigit() and int(args[1]) > 0 else 1
+    page_size = Config.HISTORY_PAGE_SIZE
+
+    try:
+        # На одну строку больше, чтобы понять, есть ли следующая страница
+        with metrics.timer('db_query_seconds', query='daily_stats'):
+            history = await async_db.get_daily_stats(
+                part_number, limit=page_size + 1, offset=(page - 1) * page_size
+            )
+        metrics.inc('db_round_trips_total', table='price_daily_stats')
+        has_more = len(history) > page_size
+        history = history[:page_size]
+
+        if not history:
+            await update.message.reply_text(
+                f"📭 История цен для {part_number} не найдена."
+            )
+            return
+
+        response = f"📈 *История цен: {part_number}*"
+        if page > 1:
+            response += f" (стр. {page})"
+        response += "\n\n"
+
+        # Группировка по дате
+        from collections import defaultdict
+        by_date = defaultdict(list)
+
+        for record in history:
+            by_date[record['stat_date']].append(record)
+
+        for date, records in by_date.items():
+            response += f"*{date}*\n"
+            for record in records:
+                response += f"• {format_daily_stat(record)}\n"
+            response += "\n"
+
+        if has_more:
+            response += f"Дальше: `/history {part_number} {page + 1}`"
+
+        await update.message.reply_text(response, parse_mode='Markdown')
+
+    except Exception as e:
+        logger.error(f"Error in history command: {e}")
+        await update.message.reply_text("⚠️ Ошибка при получении истории.")
+
+async def on_startup(application: Application):
+    """Запуск фоновых задач"""
+    await write_behind.start()
+    await asyncio.to_thread(analysis_cache.purge)
+    await report_pool.warm_up()
+    analog_edges = await async_db.load_analog_edges()
+    analog_index.load(analog_edges)
+    # Аналоги - тоже известные номера: опечатка в них не должна давать подсказку
+    part_index.add_many(chain(
+        await async_db.load_part_numbers(), (analog for _, analog in analog_edges)
+    ))
+
+    if Config.METRICS_ENABLED:
+        metrics.add_collector(runtime_metrics)
+        try:
+            servers.append(await metrics.start_server(Config.METRICS_HOST, Config.METRICS_PORT))
+        except OSError as e:
+            logger.error(f"Metrics endpoint not started: {e}")
+
+    if Config.REPORTS_ARCHIVE_ENABLED:
+        background_tasks.append(asyncio.create_task(
+            report_generator.cleanup_loop(Config.REPORTS_CLEANUP_INTERVAL)
+        ))
+
+    if Config.RETENTION_ENABLED:
+        background_tasks.append(asyncio.create_task(
+            retention_manager.run_loop(Config.RETENTION_INTERVAL)
+        ))
+
+async def on_shutdown(application: Application):
+    """Освобождение ресурсов при остановке бота"""
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    background_tasks.clear()
+
+    for server in servers:
+        await server.cleanup()
+    servers.clear()
+
+    await scheduler.shutdown()
+    await write_behind.stop()
+    await supplier_registry.close()
+    await ai_analyzer.close()
+    async_db.shutdown()
+    report_pool.shutdown()
+    analysis_cache.close()
+
+def main():
+    """Запуск бота"""
+    # Создание приложения Telegram
+    application = (
+        Application.builder()
+        .token(Config.TELEGRAM_TOKEN)
+        .concurrent_updates(True)  # обработчики разных чатов не ждут друг друга
+        .post_init(on_startup)
+        .post_shutdown(on_shutdown)
+        .build()
+    )
+
+    # Регистрация обработчиков
+    application.add_handler(CommandHandler("start", start_command))
+    application.add_handler(CommandHandler("help", help_command))
+    application.add_handler(CommandHandler("history", history_command))
+    application.add_handler(CommandHandler("stats", stats_command))
+    application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_message))
+    application.add_handler(MessageHandler(filters.Document.ALL, handle_document))
+
+    # Запуск бота
+    print("🤖 Industrial Parts Analyzer Bot запущен...")
+    application.run_polling(allowed_updates=Update.ALL_TYPES)
@@ -1,19 +1,24 @@
+from analog_index import analog_index, stable_hash
 from config import Config
-from database import db_manager
+from models import Part, Quote, SUPPLIER_NAMES
+from part_index import part_index
+from price_cache import price_cache
+from price_stats import PriceStatsEngine
+from search_engine import search_engine
+from suppliers import default_part_info
+from write_behind import write_behind
 import logging
 import json
-from typing import List, Dict, Any
+from dataclasses import replace
+from typing import AsyncIterator, List, Dict, Any
 import re
 
 logger = logging.getLogger(__name__)
 
 class PartsAnalyzer:
     def __init__(self):
-        self.supplier_mapping = {
-            'industrialsupply': 'IndustrialSupply.ru',
-            'machineparts': 'MachineParts.com',
-            'factorystock': 'FactoryStock.eu'
-        }
+        self.supplier_mapping = SUPPLIER_NAMES
+        self.stats_engine = PriceStatsEngine()
 
     def extract_search_params(self, message_text: str):
         """Извлечение параметров поиска из сообщения"""
@@ -37,113 +42,170 @@ class PartsAnalyzer:
 
         return part_numbers, suppliers
 
-    async def search_parts(self, part_numbers: List[str], suppliers: List[str]):
-        """Поиск информации по запчастям"""
-        results = []
+    def wants_refresh(self, message_text: str) -> bool:
+        """Флаг !refresh (!nocache): запросить цены заново, минуя кэш"""
+        return bool(re.search(r'!refresh|!nocache', message_text, re.IGNORECASE))
 
-        for part_number in part_numbers:
-            try:
-                part_data = await self._mock_supplier_search(part_number, suppliers)
+    def message_flags(self, message_text: str) -> List[str]:
+        """Флаги сообщения (!поставщик, !refresh ...) в исходном виде"""
+        return re.findall(r'![a-zA-Z]+', message_text)
 
-                if part_data:
-                    # Сохраняем в базу
-                    db_manager.save_part_data(part_data)
-                    results.append(part_data)
+    def wants_exact(self, message_text: str) -> bool:
+        """Флаг !exact: искать номера как есть, без подсказок об опечатках"""
+        return bool(re.search(r'!exact', message_text, re.IGNORECASE))
 
+    def suggest_corrections(self, part_numbers: List[str]) -> Dict[str, List[str]]:
+        """Похожие известные номера для номеров, которых нет в индексе"""
+        if not Config.PART_SUGGEST_ENABLED or not len(part_index):
+            return {}
+        corrections = {}
+        for part_number in part_numbers:
+            suggestions = part_index.suggest(part_number)
+            if suggestions:
+                corrections[part_number] = suggestions
+        return corrections
+
+    async def search_parts_iter(self, part_numbers: List[str], suppliers: List[str],
+                                force_refresh: bool = False) -> AsyncIterator[Part]:
+        """Поиск с выдачей запчастей по мере готовности; без ответов поставщиков - пропускаются"""
+        async for part_number, found, fresh, status in search_engine.search_iter(
+                part_numbers, suppliers, force_refresh=force_refresh):
+            try:
+                if not found:
+                    logger.warning(f"No supplier answered for part {part_number}")
+                    continue
+
+                part = self._merge_supplier_results(part_number, found, status)
+                analog_index.add(part.part_number, part.analogs)
+                part_index.add(part.part_number)
+                for analog in part.analogs:
+                    part_index.add(analog)
             except Exception as e:
                 logger.error(f"Error searching part {part_number}: {e}")
                 continue
 
-        return results
+            # В историю попадают только цены, полученные этим запросом, не из кэша;
+            # сохранение в базу - в фоне, пользователь его не ждет
+            if fresh:
+                await write_behind.enqueue_parts([replace(
+                    part, prices={s: q for s, q in part.prices.items() if s in fresh}
+                )])
 
-    async def _mock_supplier_search(self, part_number: str, suppliers: List[str]):
-        """Имитация поиска у поставщиков"""
-        mock_database = {
-            "BP-12345-67890": {
-                "part_number": "BP-12345-67890",
-                "name": "Подшипник радиальный шариковый 6205",
-                "description": "Подшипник шариковый радиальный 6205, 25x52x15мм",
-                "brands": ["SKF", "FAG", "NSK"],
-                "analogs": ["BP-12345-67891", "BP-12345-67892", "BP-6205-2RS"],
-                "prices": {}
-            },
-            "MC-54321-09876": {
-                "part_number": "MC-54321-09876",
-                "name": "Муфта упругая втулочно-пальцевая",
-                "description": "Муфта упругая втулочно-пальцевая МУВП-45",
-                "brands": ["Siemens", "Rexnord", "Dodge"],
-                "analogs": ["MC-54321-09877", "MC-54321-09878", "MC-MUVP-45"],
-                "prices": {}
-            }
-        }
+            yield part
 
-        base_data = mock_database.get(part_number, {
-            "part_number": part_number,
-            "name": f"Промышленная запчасть {part_number}",
-            "description": f"Запчасть для промышленного оборудования {part_number}",
-            "brands": ["Generic", "Standard"],
-            "analogs": [f"{part_number}-A", f"{part_number}-B"],
-            "prices": {}
-        })
+        logger.info(f"Price cache: {price_cache.stats()}")
 
-        import hashlib
-
-        for supplier in suppliers:
-            base_data["prices"][supplier] = []
-
-            for i, brand in enumerate(base_data["brands"][:2]):  # Первые 2 бренда
-                hash_input = f"{part_number}{supplier}{brand}{i}".encode()
-                hash_val = int(hashlib.md5(hash_input).hexdigest(), 16)
-
-                price = 10000 + (hash_val % 40000)  # 10000-50000
-                delivery = 1 + (hash_val % 14)  # 1-14 дней
-
-                base_data["prices"][supplier].append({
-                    "brand": brand,
-                    "price": price,
-                    "delivery": delivery
-                })
-
-        return base_data
+    async def search_parts(self, part_numbers: List[str], suppliers: List[str],
+                           force_refresh: bool = False):
+        """Поиск информации по запчастям; результат в порядке part_numbers"""
+        found = {
+            part.part_number: part
+            async for part in self.search_parts_iter(part_numbers, suppliers, force_refresh)
+        }
+        return [found[pn] for pn in dict.fromkeys(part_numbers) if pn in found]
+
+    def _merge_supplier_results(self, part_number: str, found: Dict[str, Any],
+                                status: Dict[str, str]) -> Part:
+        """Сборка данных о запчасти из ответов нескольких поставщиков"""
+        part_info = next(
+            (result["part"] for result in found.values() if result.get("part")),
+            None
+        ) or default_part_info(part_number)
+
+        return Part(
+            part_number=part_number,
+            name=part_info.get("name") or part_number,
+            description=part_info.get("description") or "",
+            brands=list(part_info.get("brands") or []),
+            analogs=list(part_info.get("analogs") or []),
+            prices={
+                supplier: result["quotes"]
+                for supplier, result in found.items()
+            },
+            supplier_status=status
+        )
 
-    def analyze_prices(self, part_data: Dict[str, Any]):
-        """Анализ ценовых данных"""
-        all_prices = []
-
-        for supplier, prices in part_data["prices"].items():
-            for price_info in prices:
-                all_prices.append({
-                    **price_info,
-                    "supplier": supplier,
-                    "supplier_name": self.supplier_mapping.get(supplier, supplier)
+    def _cached_offers(self, part_numbers: List[str]) -> Dict[str, Quote]:
+        """Лучшее (самое дешевое) предложение из кэша цен для каждого номера, где оно есть"""
+        offers = {}
+        for part_number in part_numbers:
+            for supplier in self.supplier_mapping:
+                cached = price_cache.peek(part_number, supplier)
+                for quote in (cached or {}).get("quotes", ()):
+                    best = offers.get(part_number)
+                    if best is None or quote.price < best.price:
+                        offers[part_number] = quote
+        return offers
+
+    def _analogs_analysis(self, substitutes, min_price: Quote, offers: Dict[str, Quote]):
+        """
+        Аналоги с ценами: реальное предложение из кэша, если оно есть,
+        иначе детерминированная оценка от минимальной цены запчасти.
+        """
+        analogs_analysis = []
+        for analog, hops in substitutes:
+            offer = offers.get(analog)
+            if offer is not None:
+                analogs_analysis.append({
+                    "part_number": analog,
+                    "hops": hops,
+                    "estimated_price": offer.price,
+                    "availability": (
+                        f"{offer.supplier_name}, {offer.delivery} дн."
+                    ),
+                    "source": "cache"
                 })
+                continue
 
-        if not all_prices:
-            return None
-
-        sorted_prices = sorted(all_prices, key=lambda x: x["price"])
-
-        min_price = sorted_prices[0]
-
-        median_index = len(sorted_prices) // 2
-        median_price = sorted_prices[median_index]
-
-        analogs_analysis = []
-        for analog in part_data["analogs"][:3]:  # Берем первые 3 аналога
+            seed = stable_hash(analog)
             analogs_analysis.append({
                 "part_number": analog,
-                "estimated_price": min_price["price"] * 0.9 + (hash(analog) % 2000),
-                "availability": "Есть в наличии" if hash(analog) % 2 == 0 else "Под заказ"
+                "hops": hops,
+                "estimated_price": min_price.price * 0.9 + (seed % 2000),
+                "availability": "Есть в наличии" if seed % 2 == 0 else "Под заказ",
+                "source": "estimate"
             })
+        return analogs_analysis
 
-        return {
-            "part_number": part_data["part_number"],
-            "name": part_data["name"],
-            "min_price": min_price,
-            "median_price": median_price,
-            "all_prices": all_prices,
-            "analogs": analogs_analysis,
-            "brands": part_data["brands"]
+    def analyze_batch(self, parts: List[Part]) -> List[Dict[str, Any]]:
+        """Анализ ценовых данных всех запчастей запроса; запчасти без цен пропускаются"""
+        substitutes = {
+            part.part_number: analog_index.substitutes(part.part_number) for part in parts
         }
+        offers = self._cached_offers(list({
+            analog for found in substitutes.values() for analog, _ in found
+        }))
+
+        results = []
+        for part, analysis in zip(parts, self.stats_engine.analyze(parts)):
+            if analysis is None:
+                continue
+            analysis["analogs"] = self._analogs_analysis(
+                substitutes[part.part_number], analysis["min_price"], offers
+            )
+            analysis["supplier_status"] = dict(part.supplier_status)
+            results.append(analysis)
+        return results
+
+    def analyze_prices(self, part: Part):
+        """Анализ ценовых данных"""
+        results = self.analyze_batch([part])
+        return results[0] if results else None
+
+def build_analysis_rows(analysis_results, ai_analyses=()):
+    """Строки analysis_results (без request_id) для записи в БД"""
+    ai_by_part = {a['part_number']: a['analysis'] for a in ai_analyses}
+    return [
+        (
+            result['part_number'],
+            result['min_price'].price,
+            result['min_price'].supplier,
+            result['median_price'].price,
+            result['median_price'].supplier,
+            ai_by_part.get(result['part_number'])
+        )
+        for result in analysis_results
+    ]
+
 
 analyzer = PartsAnalyzer()
@@ -0,0 +1,245 @@
+"""
+Массовый поиск по списку запчастей из файла (.xlsx / .csv).
+
+Файл читается потоково (openpyxl read-only / csv.reader), номера
+нормализуются и дедуплицируются, а затем идут через поиск и анализ
+порциями по BULK_CHUNK_SIZE. Результаты каждой порции сразу
+дописываются в сводный отчет и отбрасываются, поэтому память
+не растет с размером файла.
+"""
+import asyncio
+import csv
+import logging
+import os
+import re
+import tempfile
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import Any, Awaitable, Callable, Dict, Iterable, Iterator, List, Optional
+
+from openpyxl import load_workbook
+
+from config import Config
+from bot_core import analyzer, build_analysis_rows
+from excel_generator import report_generator
+from metrics import RequestTiming, metrics
+from write_behind import write_behind
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_EXTENSIONS = ('.xlsx', '.csv')
+
+PART_NUMBER_RE = re.compile(r'^[A-Z0-9][A-Z0-9\-./]{2,49}$')
+
+# Заголовки колонки с номерами (без цифр); без заголовка номера берутся из первой колонки
+HEADER_KEYWORDS = ('номер', 'артикул', 'каталож', 'part', 'sku', 'article')
+
+
+class BulkUploadError(Exception):
+    """Файл не удалось прочитать как список запчастей"""
+
+
+def file_extension(filename: str) -> str:
+    return os.path.splitext(filename or '')[1].lower()
+
+
+def _cell_text(value: Any) -> str:
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def _iter_xlsx_rows(path: str) -> Iterator[tuple]:
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        yield from wb.active.iter_rows(values_only=True)
+    finally:
+        wb.close()
+
+
+def _iter_csv_rows(path: str) -> Iterator[List[str]]:
+    with open(path, newline='', encoding='utf-8-sig', errors='replace') as f:
+        sample = f.read(4096)
+        f.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=',;\t')
+        except csv.Error:
+            dialect = csv.excel
+        yield from csv.reader(f, dialect)
+
+
+def _header_column(row) -> Optional[int]:
+    for idx, value in enumerate(row):
+        text = _cell_text(value)
+        if any(ch.isdigit() for ch in text):
+            continue
+        if any(keyword in text.lower() for keyword in HEADER_KEYWORDS):
+            return idx
+    return None
+
+
+class PartListReader:
+    """
+    Потоковое чтение номеров из файла.
+
+    Колонка с номерами определяется по заголовку в первой строке,
+    иначе берется первая колонка. Повторы и значения, не похожие
+    на каталожный номер, пропускаются; после max_parts уникальных
+    номеров чтение прекращается.
+    """
+
+    def __init__(self, path: str, filename: str, max_parts: int):
+        extension = file_extension(filename)
+        if extension not in SUPPORTED_EXTENSIONS:
+            raise BulkUploadError(f"Unsupported file type: {extension or filename}")
+
+        self.path = path
+        self.extension = extension
+        self.max_parts = max_parts
+
+        self.rows = 0
+        self.duplicates = 0
+        self.skipped = 0
+        self.truncated = False
+
+    def _rows(self) -> Iterator[Any]:
+        if self.extension == '.xlsx':
+            return _iter_xlsx_rows(self.path)
+        return _iter_csv_rows(self.path)
+
+    def __iter__(self) -> Iterator[str]:
+        seen = set()
+        column = 0
+        first = True
+
+        try:
+            for row in self._rows():
+                if first:
+                    first = False
+                    header = _header_column(row)
+                    if header is not None:
+                        column = header
+                        continue
+
+                self.rows += 1
+                if column >= len(row):
+                    continue
+                part_number = _cell_text(row[column]).upper()
+                if not part_number:
+                    continue
+                if not PART_NUMBER_RE.match(part_number):
+                    self.skipped += 1
+                    continue
+                if part_number in seen:
+                    self.duplicates += 1
+                    continue
+
+                if len(seen) >= self.max_parts:
+                    self.truncated = True
+                    break
+                seen.add(part_number)
+                yield part_number
+        except BulkUploadError:
+            raise
+        except Exception as e:
+            raise BulkUploadError(f"Cannot read {self.extension} file: {e}") from e
+
+
+def chunked(items: Iterable[str], size: int) -> Iterator[List[str]]:
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+@dataclass
+class BulkResult:
+    """Итог массового поиска: путь к сводному отчету и счетчики"""
+
+    report_path: str
+    requested: int = 0
+    found: int = 0
+    missing: List[str] = field(default_factory=list)
+    duplicates: int = 0
+    skipped: int = 0
+    truncated: bool = False
+
+
+ProgressCallback = Callable[[int, int], Awaitable[None]]
+
+
+async def run_bulk_search(path: str, filename: str, suppliers: List[str],
+                          user_info: Dict[str, Any], force_refresh: bool = False,
+                          on_progress: Optional[ProgressCallback] = None,
+                          chunk_size: Optional[int] = None,
+                          max_parts: Optional[int] = None,
+                          timing: Optional[RequestTiming] = None) -> BulkResult:
+    """
+    Поиск и анализ всех номеров из файла порциями с одним сводным отчетом.
+
+    AI-анализ для массового поиска не выполняется: в отчет идут цены,
+    статистика и аналоги. Каждая порция логируется отдельным поисковым
+    запросом через write-behind. Время стадий копится в timing.
+    """
+    timing = timing or RequestTiming(metrics, 'bulk', user_info.get('id'))
+    chunk_size = chunk_size or Config.BULK_CHUNK_SIZE
+    reader = PartListReader(path, filename, max_parts or Config.BULK_MAX_PARTS)
+    chunks = chunked(reader, chunk_size)
+    writer = report_generator.open_bulk_report(user_info)
+
+    fd, report_path = tempfile.mkstemp(suffix='.xlsx', prefix='bulk_', dir=Config.BULK_TEMP_DIR)
+    os.close(fd)
+    result = BulkResult(report_path=report_path)
+
+    try:
+        while True:
+            # Чтение файла блокирующее: следующая порция читается в потоке
+            with timing.stage('parse'):
+                chunk = await asyncio.to_thread(next, chunks, None)
+            if chunk is None:
+                break
+
+            with timing.stage('search'):
+                parts = await analyzer.search_parts(chunk, suppliers, force_refresh=force_refresh)
+            with timing.stage('analysis'):
+                analysis_results = analyzer.analyze_batch(parts)
+            with timing.stage('report'):
+                await asyncio.to_thread(writer.add, analysis_results)
+
+            found = {r['part_number'] for r in analysis_results}
+            result.missing.extend(pn for pn in chunk if pn not in found)
+            result.requested += len(chunk)
+            result.found += len(analysis_results)
+
+            with timing.stage('db'):
+                await write_behind.enqueue_search_request(
+                    user_info.get('id'), user_info.get('username'), chunk, suppliers,
+                    len(analysis_results),
+                    analyses=build_analysis_rows(analysis_results)
+                )
+
+            if on_progress is not None:
+                await on_progress(result.requested, result.found)
+
+        with timing.stage('report'):
+            writer.add_missing(result.missing)
+            await asyncio.to_thread(writer.save, report_path)
+    except BaseException:
+        os.unlink(report_path)
+        raise
+
+    result.duplicates = reader.duplicates
+    result.skipped = reader.skipped
+    result.truncated = reader.truncated
+    timing.parts_count = result.requested
+    timing.results_count = result.found
+    timing.report_bytes = os.path.getsize(report_path)
+    logger.info(
+        f"Bulk search for {user_info.get('id')}: {result.requested} parts, "
+        f"{result.found} found, {result.duplicates} duplicates, {result.skipped} skipped"
+    )
+    return result
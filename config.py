@@ -7,6 +7,11 @@ class Config:
     TELEGRAM_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN')
 
     MISTRAL_API_KEY = os.getenv('MISTRAL_API_KEY')
+    MISTRAL_MODEL = os.getenv('MISTRAL_MODEL', 'mistral-medium')
+    MISTRAL_MAX_CONCURRENCY = int(os.getenv('MISTRAL_MAX_CONCURRENCY', '4'))
+    MISTRAL_RATE_LIMIT = float(os.getenv('MISTRAL_RATE_LIMIT', '1.0'))  # запросов в секунду
+    MISTRAL_BATCH_SIZE = int(os.getenv('MISTRAL_BATCH_SIZE', '5'))  # запчастей в одном промпте
+    MISTRAL_TIMEOUT = int(os.getenv('MISTRAL_TIMEOUT', '60'))
 
     MYSQL_CONFIG = {
         'host': os.getenv('MYSQL_HOST', 'VH301.spaceweb.ru'),
@@ -19,8 +24,149 @@ class Config:
         'pool_size': 5
     }
 
+    HISTORY_PAGE_SIZE = int(os.getenv('HISTORY_PAGE_SIZE', '10'))
+
+    # Telegram ID администраторов через запятую (команда /stats)
+    ADMIN_IDS = {int(x) for x in os.getenv('ADMIN_IDS', '').split(',') if x.strip()}
+
+    # Писать в price_history только изменившиеся цены
+    PRICE_HISTORY_DEDUP = os.getenv('PRICE_HISTORY_DEDUP', '1') == '1'
+
+    # Хранение истории: таблицы секционированы помесячно, старые секции
+    # выгружаются в архив и удаляются (дневная статистика сохраняется)
+    RETENTION_ENABLED = os.getenv('RETENTION_ENABLED', '1') == '1'
+    RETENTION_DAYS = {
+        'price_history': int(os.getenv('PRICE_HISTORY_RETENTION_DAYS', '180')),
+        'search_requests': int(os.getenv('SEARCH_REQUESTS_RETENTION_DAYS', '365')),
+        'analysis_results': int(os.getenv('ANALYSIS_RESULTS_RETENTION_DAYS', '365')),
+        'request_timings': int(os.getenv('REQUEST_TIMINGS_RETENTION_DAYS', '30'))
+    }
+    RETENTION_ARCHIVE_DIR = os.getenv('RETENTION_ARCHIVE_DIR', 'archive')
+    RETENTION_EXPORT = os.getenv('RETENTION_EXPORT', '1') == '1'
+    RETENTION_INTERVAL = int(os.getenv('RETENTION_INTERVAL', '86400'))  # секунд
+    RETENTION_DELETE_BATCH = int(os.getenv('RETENTION_DELETE_BATCH', '5000'))
+    PARTITION_MONTHS_AHEAD = int(os.getenv('PARTITION_MONTHS_AHEAD', '2'))
+
     SUPPLIER_APIS = {
-        'industrialsupply': 'https://api.industrialsupply.ru/v1',
-        'machineparts': 'https://api.machineparts.com/v1',
-        'factorystock': 'https://api.factorystock.eu/v1'
+        'industrialsupply': os.getenv('INDUSTRIALSUPPLY_API_URL', 'https://api.industrialsupply.ru/v1'),
+        'machineparts': os.getenv('MACHINEPARTS_API_URL', 'https://api.machineparts.com/v1'),
+        'factorystock': os.getenv('FACTORYSTOCK_API_URL', 'https://api.factorystock.eu/v1')
+    }
+
+    # Адаптеры поставщиков: 'mock' - встроенная имитация, 'http' - реальные API
+    SUPPLIER_MODE = os.getenv('SUPPLIER_MODE', 'mock')
+
+    SUPPLIER_ADAPTERS = {
+        'industrialsupply': os.getenv('INDUSTRIALSUPPLY_ADAPTER', SUPPLIER_MODE),
+        'machineparts': os.getenv('MACHINEPARTS_ADAPTER', SUPPLIER_MODE),
+        'factorystock': os.getenv('FACTORYSTOCK_ADAPTER', SUPPLIER_MODE)
     }
+
+    SUPPLIER_API_KEYS = {
+        'industrialsupply': os.getenv('INDUSTRIALSUPPLY_API_KEY'),
+        'machineparts': os.getenv('MACHINEPARTS_API_KEY'),
+        'factorystock': os.getenv('FACTORYSTOCK_API_KEY')
+    }
+
+    SUPPLIER_TIMEOUTS = {
+        'industrialsupply': float(os.getenv('INDUSTRIALSUPPLY_TIMEOUT', '5')),
+        'machineparts': float(os.getenv('MACHINEPARTS_TIMEOUT', '5')),
+        'factorystock': float(os.getenv('FACTORYSTOCK_TIMEOUT', '5'))
+    }
+
+    SUPPLIER_MAX_RETRIES = int(os.getenv('SUPPLIER_MAX_RETRIES', '2'))
+    SUPPLIER_RETRY_BACKOFF = float(os.getenv('SUPPLIER_RETRY_BACKOFF', '0.2'))
+
+    # Общий пул keep-alive соединений к API поставщиков
+    SUPPLIER_POOL_SIZE = int(os.getenv('SUPPLIER_POOL_SIZE', '30'))
+    SUPPLIER_POOL_SIZE_PER_HOST = int(os.getenv('SUPPLIER_POOL_SIZE_PER_HOST', '10'))
+    SUPPLIER_KEEPALIVE_TIMEOUT = float(os.getenv('SUPPLIER_KEEPALIVE_TIMEOUT', '30'))
+
+    # Параллельный поиск у поставщиков
+    SEARCH_MAX_CONCURRENCY = int(os.getenv('SEARCH_MAX_CONCURRENCY', '30'))
+    SEARCH_LOOKUP_TIMEOUT = float(os.getenv('SEARCH_LOOKUP_TIMEOUT', '10'))
+
+    SUPPLIER_CONCURRENCY = {
+        'industrialsupply': int(os.getenv('INDUSTRIALSUPPLY_CONCURRENCY', '10')),
+        'machineparts': int(os.getenv('MACHINEPARTS_CONCURRENCY', '10')),
+        'factorystock': int(os.getenv('FACTORYSTOCK_CONCURRENCY', '10'))
+    }
+
+    # Здоровье поставщиков: адаптивные таймауты, дублирующие запросы, circuit breaker
+    SUPPLIER_HEALTH_WINDOW = float(os.getenv('SUPPLIER_HEALTH_WINDOW', '300'))
+    SUPPLIER_HEALTH_MIN_SAMPLES = int(os.getenv('SUPPLIER_HEALTH_MIN_SAMPLES', '20'))
+    SUPPLIER_TIMEOUT_PERCENTILE = float(os.getenv('SUPPLIER_TIMEOUT_PERCENTILE', '99'))
+    SUPPLIER_TIMEOUT_MULTIPLIER = float(os.getenv('SUPPLIER_TIMEOUT_MULTIPLIER', '1.5'))
+    SUPPLIER_MIN_TIMEOUT = float(os.getenv('SUPPLIER_MIN_TIMEOUT', '0.5'))
+    SUPPLIER_HEDGE_ENABLED = os.getenv('SUPPLIER_HEDGE_ENABLED', '1') == '1'
+    SUPPLIER_HEDGE_PERCENTILE = float(os.getenv('SUPPLIER_HEDGE_PERCENTILE', '95'))
+    SUPPLIER_HEDGE_MAX_RATIO = float(os.getenv('SUPPLIER_HEDGE_MAX_RATIO', '0.1'))
+    CIRCUIT_FAILURE_THRESHOLD = int(os.getenv('CIRCUIT_FAILURE_THRESHOLD', '5'))
+    CIRCUIT_OPEN_SECONDS = float(os.getenv('CIRCUIT_OPEN_SECONDS', '30'))
+
+    # Аналоги: глубина поиска заменителей и сколько показывать в отчете
+    ANALOG_MAX_HOPS = int(os.getenv('ANALOG_MAX_HOPS', '2'))
+    ANALOG_MAX_RESULTS = int(os.getenv('ANALOG_MAX_RESULTS', '3'))
+
+    # Подсказки при опечатках в каталожных номерах
+    PART_SUGGEST_ENABLED = os.getenv('PART_SUGGEST_ENABLED', '1') == '1'
+    PART_SUGGEST_MAX_DISTANCE = int(os.getenv('PART_SUGGEST_MAX_DISTANCE', '2'))
+    PART_SUGGEST_WINDOW = int(os.getenv('PART_SUGGEST_WINDOW', '8'))
+
+    # Планировщик заявок: общая очередь и справедливое разделение между пользователями
+    SCHEDULER_MAX_RUNNING = int(os.getenv('SCHEDULER_MAX_RUNNING', '8'))
+    SCHEDULER_MAX_QUEUED = int(os.getenv('SCHEDULER_MAX_QUEUED', '100'))
+    SCHEDULER_USER_CONCURRENCY = int(os.getenv('SCHEDULER_USER_CONCURRENCY', '1'))
+    SCHEDULER_USER_MAX_QUEUED = int(os.getenv('SCHEDULER_USER_MAX_QUEUED', '5'))
+    SCHEDULER_QUANTUM = int(os.getenv('SCHEDULER_QUANTUM', '20'))  # запчастей за круг
+
+    # Лимит частоты на пользователя, в запчастях (0 - без лимита)
+    USER_PARTS_PER_MINUTE = float(os.getenv('USER_PARTS_PER_MINUTE', '300'))
+    USER_PARTS_BURST = int(os.getenv('USER_PARTS_BURST', '100'))
+
+    # Минимальный интервал между правками статус-сообщения с прогрессом (сек)
+    PROGRESS_UPDATE_INTERVAL = float(os.getenv('PROGRESS_UPDATE_INTERVAL', '2.0'))
+
+    # Массовая загрузка списка запчастей файлом (.xlsx / .csv)
+    BULK_CHUNK_SIZE = int(os.getenv('BULK_CHUNK_SIZE', '50'))
+    BULK_MAX_PARTS = int(os.getenv('BULK_MAX_PARTS', '5000'))
+    BULK_MAX_FILE_MB = float(os.getenv('BULK_MAX_FILE_MB', '20'))
+    BULK_TEMP_DIR = os.getenv('BULK_TEMP_DIR') or None
+
+    # Кэш цен поставщиков
+    PRICE_CACHE_TTL = float(os.getenv('PRICE_CACHE_TTL', '900'))
+    PRICE_CACHE_MAX_ENTRIES = int(os.getenv('PRICE_CACHE_MAX_ENTRIES', '50000'))
+    # Сколько еще после TTL показывать цены недоступного поставщика (как устаревшие)
+    PRICE_CACHE_STALE_TTL = float(os.getenv('PRICE_CACHE_STALE_TTL', str(24 * 3600)))
+
+    # Отложенная запись в БД (write-behind)
+    WRITE_BEHIND_MAX_ITEMS = int(os.getenv('WRITE_BEHIND_MAX_ITEMS', '10000'))
+    WRITE_BEHIND_BATCH_SIZE = int(os.getenv('WRITE_BEHIND_BATCH_SIZE', '500'))
+    WRITE_BEHIND_FLUSH_INTERVAL = float(os.getenv('WRITE_BEHIND_FLUSH_INTERVAL', '1.0'))
+
+    # Кэш AI-анализа (локальная SQLite-база)
+    AI_CACHE_PATH = os.getenv('AI_CACHE_PATH', 'cache/ai_analysis.sqlite3')
+    AI_CACHE_TTL = int(os.getenv('AI_CACHE_TTL', str(24 * 3600)))
+    AI_CACHE_MAX_ENTRIES = int(os.getenv('AI_CACHE_MAX_ENTRIES', '100000'))
+
+    # Потоковая (write-only) генерация Excel-отчетов
+    REPORT_STREAMING = os.getenv('REPORT_STREAMING', '1') == '1'
+
+    # Пул процессов для генерации отчетов (0 - генерация в потоке)
+    REPORT_WORKERS = int(os.getenv('REPORT_WORKERS', str(min(4, os.cpu_count() or 1))))
+    REPORT_MAX_PENDING = int(os.getenv('REPORT_MAX_PENDING', '16'))
+    REPORT_TIMEOUT = float(os.getenv('REPORT_TIMEOUT', '120'))
+
+    # Архив отчетов на диске (по умолчанию отчеты не сохраняются)
+    REPORTS_DIR = os.getenv('REPORTS_DIR', 'reports')
+    REPORTS_ARCHIVE_ENABLED = os.getenv('REPORTS_ARCHIVE_ENABLED', '0') == '1'
+    REPORTS_RETENTION_DAYS = float(os.getenv('REPORTS_RETENTION_DAYS', '7'))
+    REPORTS_MAX_TOTAL_MB = float(os.getenv('REPORTS_MAX_TOTAL_MB', '500'))
+    REPORTS_CLEANUP_INTERVAL = float(os.getenv('REPORTS_CLEANUP_INTERVAL', '3600'))
+
+    # Метрики: локальный эндпоинт Prometheus и выборка запросов в request_timings
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', '1') == '1'
+    METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+    METRICS_PORT = int(os.getenv('METRICS_PORT', '9108'))
+    METRICS_WINDOW = float(os.getenv('METRICS_WINDOW', '900'))  # окно перцентилей /stats, сек
+    METRICS_SAMPLE_RATE = float(os.getenv('METRICS_SAMPLE_RATE', '0.1'))  # доля запросов в БД (0 - не писать)
@@ -1,16 +1,24 @@
 import mysql.connector
 from mysql.connector import Error, pooling
 from config import Config
+from async_database import AsyncDatabaseManager
+from migrations import apply_migrations
 import logging
 import json
+import time
+from datetime import timedelta
+from decimal import Decimal
 
 logger = logging.getLogger(__name__)
 
 class DatabaseManager:
     def __init__(self):
         self.connection_pool = None
+        self.supplier_names = {}
         self.init_pool()
         self.create_tables()
+        self.applied_migrations = self.run_migrations()
+        self.load_supplier_names()
 
     def init_pool(self):
         """Инициализация пула соединений"""
@@ -33,6 +41,8 @@ class DatabaseManager:
 
     def create_tables(self):
         """Создание таблиц в базе данных"""
+        # price_history, search_requests и analysis_results секционируются помесячно
+        # (см. partitions.py): внешних ключей нет, время входит в первичный ключ
         create_tables_queries = [
             """
             CREATE TABLE IF NOT EXISTS parts (
@@ -59,35 +69,37 @@ class DatabaseManager:
             """,
             """
             CREATE TABLE IF NOT EXISTS price_history (
-                id INT AUTO_INCREMENT PRIMARY KEY,
+                id INT AUTO_INCREMENT,
                 part_number VARCHAR(50) NOT NULL,
                 supplier_code VARCHAR(20) NOT NULL,
                 brand VARCHAR(100),
                 price DECIMAL(10,2),
                 delivery_days INT,
                 currency VARCHAR(3) DEFAULT 'RUB',
-                found_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (part_number) REFERENCES parts(part_number),
+                found_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (id, found_at),
                 INDEX idx_part_supplier (part_number, supplier_code),
+                INDEX idx_part_found (part_number, found_at),
                 INDEX idx_found_at (found_at)
             )
             """,
             """
             CREATE TABLE IF NOT EXISTS search_requests (
-                id INT AUTO_INCREMENT PRIMARY KEY,
+                id INT AUTO_INCREMENT,
                 telegram_user_id BIGINT,
                 telegram_username VARCHAR(100),
                 part_numbers JSON,
                 suppliers JSON,
                 results_count INT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (id, created_at),
                 INDEX idx_user_id (telegram_user_id),
                 INDEX idx_created_at (created_at)
             )
             """,
             """
             CREATE TABLE IF NOT EXISTS analysis_results (
-                id INT AUTO_INCREMENT PRIMARY KEY,
+                id INT AUTO_INCREMENT,
                 request_id INT,
                 part_number VARCHAR(50),
                 min_price DECIMAL(10,2),
@@ -95,11 +107,72 @@ class DatabaseManager:
                 median_price DECIMAL(10,2),
                 median_price_supplier VARCHAR(20),
                 ai_analysis TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (request_id) REFERENCES search_requests(id),
+                created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (id, created_at),
+                INDEX idx_request_id (request_id),
                 INDEX idx_part_number (part_number),
                 INDEX idx_created_at (created_at)
             )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS request_timings (
+                id INT AUTO_INCREMENT,
+                telegram_user_id BIGINT,
+                kind VARCHAR(20),
+                outcome VARCHAR(20),
+                parts_count INT,
+                results_count INT,
+                report_bytes INT,
+                queue_ms INT,
+                parse_ms INT,
+                download_ms INT,
+                search_ms INT,
+                analysis_ms INT,
+                ai_ms INT,
+                report_ms INT,
+                upload_ms INT,
+                db_ms INT,
+                total_ms INT,
+                created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (id, created_at),
+                INDEX idx_created_at (created_at)
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS price_daily_stats (
+                part_number VARCHAR(50) NOT NULL,
+                supplier_code VARCHAR(20) NOT NULL,
+                brand VARCHAR(100) NOT NULL DEFAULT '',
+                stat_date DATE NOT NULL,
+                min_price DECIMAL(10,2),
+                max_price DECIMAL(10,2),
+                price_sum DECIMAL(14,2),
+                quote_count INT NOT NULL DEFAULT 0,
+                last_delivery_days INT,
+                last_seen_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (part_number, stat_date, supplier_code, brand),
+                INDEX idx_stat_date (stat_date)
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS part_analogs (
+                part_number VARCHAR(50) NOT NULL,
+                analog_number VARCHAR(50) NOT NULL,
+                PRIMARY KEY (part_number, analog_number),
+                INDEX idx_analog_number (analog_number)
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS price_latest (
+                part_number VARCHAR(50) NOT NULL,
+                supplier_code VARCHAR(20) NOT NULL,
+                brand VARCHAR(100) NOT NULL DEFAULT '',
+                price DECIMAL(10,2),
+                delivery_days INT,
+                changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                last_seen_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (part_number, supplier_code, brand)
+            )
             """
         ]
 
@@ -136,111 +209,628 @@ class DatabaseManager:
             if conn:
                 conn.close()
 
-    def save_part_data(self, part_data):
+    def run_migrations(self):
+        """Доведение схемы существующей базы до актуальной"""
+        conn = None
+        try:
+            conn = self.get_connection()
+            applied = apply_migrations(conn)
+            if applied:
+                logger.info(f"Applied migrations: {', '.join(applied)}")
+            return applied
+        except Error as e:
+            logger.error(f"Error applying migrations: {e}")
+            return []
+        finally:
+            if conn:
+                conn.close()
+
+    def load_supplier_names(self):
+        """Справочник поставщиков в памяти: code -> name"""
+        conn = None
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.execute("SELECT code, name FROM suppliers")
+            self.supplier_names = {code: name for code, name in cursor.fetchall()}
+            cursor.close()
+        except Error as e:
+            logger.error(f"Error loading suppliers: {e}")
+        finally:
+            if conn:
+                conn.close()
+        return self.supplier_names
+
+    UPSERT_PART_QUERY = """
+    INSERT INTO parts (part_number, name, description, brands, analogs)
+    VALUES (%s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+        name = VALUES(name),
+        description = VALUES(description),
+        brands = VALUES(brands),
+        analogs = VALUES(analogs),
+        updated_at = CURRENT_TIMESTAMP
+    """
+
+    INSERT_PRICE_QUERY = """
+    INSERT INTO price_history
+    (part_number, supplier_code, brand, price, delivery_days)
+    VALUES (%s, %s, %s, %s, %s)
+    """
+
+    UPSERT_DAILY_STATS_QUERY = """
+    INSERT INTO price_daily_stats
+    (part_number, supplier_code, brand, stat_date,
+     min_price, max_price, price_sum, quote_count, last_delivery_days)
+    VALUES (%s, %s, %s, CURDATE(), %s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+        min_price = LEAST(min_price, VALUES(min_price)),
+        max_price = GREATEST(max_price, VALUES(max_price)),
+        price_sum = price_sum + VALUES(price_sum),
+        quote_count = quote_count + VALUES(quote_count),
+        last_delivery_days = VALUES(last_delivery_days),
+        last_seen_at = CURRENT_TIMESTAMP
+    """
+
+    INSERT_ANALOG_QUERY = """
+    INSERT IGNORE INTO part_analogs (part_number, analog_number)
+    VALUES (%s, %s)
+    """
+
+    UPSERT_LATEST_QUERY = """
+    INSERT INTO price_latest (part_number, supplier_code, brand, price, delivery_days)
+    VALUES (%s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+        changed_at = IF(
+            NOT (price <=> VALUES(price)) OR NOT (delivery_days <=> VALUES(delivery_days)),
+            CURRENT_TIMESTAMP, changed_at
+        ),
+        price = VALUES(price),
+        delivery_days = VALUES(delivery_days),
+        last_seen_at = CURRENT_TIMESTAMP
+    """
+
+    LATEST_KEYS_PER_QUERY = 500
+
+    @staticmethod
+    def _part_row(part):
+        return (
+            part.part_number,
+            part.name,
+            part.description,
+            json.dumps(part.brands),
+            json.dumps(part.analogs)
+        )
+
+    @staticmethod
+    def _analog_rows(part):
+        return [
+            (part.part_number, analog)
+            for analog in dict.fromkeys(part.analogs)
+            if analog and analog != part.part_number
+        ]
+
+    @staticmethod
+    def _price_rows(part):
+        return [
+            (part.part_number, quote.supplier, quote.brand, quote.price, quote.delivery)
+            for quote in part.quotes()
+        ]
+
+    @staticmethod
+    def _daily_stat_rows(price_rows):
+        """Свертка цен в строки дневной статистики (одна строка на ключ)"""
+        stats = {}
+        for part_number, supplier, brand, price, delivery in price_rows:
+            key = (part_number, supplier, brand or '')
+            entry = stats.get(key)
+            if entry is None:
+                stats[key] = [price, price, price, 1, delivery]
+            else:
+                entry[0] = min(entry[0], price)
+                entry[1] = max(entry[1], price)
+                entry[2] += price
+                entry[3] += 1
+                entry[4] = delivery
+
+        # Единый порядок ключей снижает риск взаимных блокировок
+        return [key + tuple(entry) for key, entry in sorted(stats.items())]
+
+    @staticmethod
+    def _quote_key(part_number, supplier, brand):
+        return (part_number, supplier, brand or '')
+
+    @staticmethod
+    def _quote_value(price, delivery):
+        """Цена и срок в том виде, в каком их хранит DECIMAL(10,2)/INT"""
+        price = None if price is None else Decimal(str(price)).quantize(Decimal('0.01'))
+        return price, delivery
+
+    def _load_latest(self, cursor, keys):
+        """Последние известные цены для ключей (part, supplier, brand) с блокировкой строк"""
+        latest = {}
+        keys = sorted(keys)
+        for start in range(0, len(keys), self.LATEST_KEYS_PER_QUERY):
+            chunk = keys[start:start + self.LATEST_KEYS_PER_QUERY]
+            placeholders = ", ".join(["(%s, %s, %s)"] * len(chunk))
+            cursor.execute(
+                f"""
+                SELECT part_number, supplier_code, brand, price, delivery_days
+                FROM price_latest
+                WHERE (part_number, supplier_code, brand) IN ({placeholders})
+                FOR UPDATE
+                """,
+                [value for key in chunk for value in key]
+            )
+            for part_number, supplier, brand, price, delivery in cursor.fetchall():
+                latest[(part_number, supplier, brand)] = self._quote_value(price, delivery)
+        return latest
+
+    def _changed_price_rows(self, cursor, price_rows):
+        """
+        Режим обнаружения изменений: в историю идут только цены, отличающиеся
+        от последней известной; price_latest фиксирует время последнего просмотра.
+        """
+        latest = self._load_latest(
+            cursor, {self._quote_key(*row[:3]) for row in price_rows}
+        )
+
+        changed = []
+        current = {}
+        for row in price_rows:
+            key = self._quote_key(*row[:3])
+            value = self._quote_value(row[3], row[4])
+            if latest.get(key) != value:
+                changed.append(row)
+                latest[key] = value
+            current[key] = row
+
+        cursor.executemany(
+            self.UPSERT_LATEST_QUERY,
+            [key + tuple(row[3:]) for key, row in sorted(current.items())]
+        )
+        return changed
+
+    def _write_prices(self, cursor, price_rows):
+        """
+        Запись цен в историю и дневную статистику в текущей транзакции.
+
+        Дневная статистика учитывает все полученные цены, а price_history
+        в режиме PRICE_HISTORY_DEDUP - только изменившиеся.
+        """
+        if not price_rows:
+            return 0
+
+        history_rows = price_rows
+        if Config.PRICE_HISTORY_DEDUP:
+            history_rows = self._changed_price_rows(cursor, price_rows)
+
+        if history_rows:
+            cursor.executemany(self.INSERT_PRICE_QUERY, history_rows)
+        cursor.executemany(self.UPSERT_DAILY_STATS_QUERY, self._daily_stat_rows(price_rows))
+        return len(history_rows)
+
+    def save_search_results(self, parts):
+        """
+        Сохранение всех запчастей и цен одного поиска.
+
+        Одно соединение, одна транзакция, многострочные executemany.
+        Возвращает количество записанных строк и время выполнения.
+        """
+        started = time.perf_counter()
+        part_rows = [self._part_row(part) for part in parts]
+        price_rows = [row for part in parts for row in self._price_rows(part)]
+        stats = {"ok": True, "parts": 0, "prices": 0, "elapsed_ms": 0.0}
+
+        if not part_rows:
+            return stats
+
+        conn = None
+        try:
+            conn = self.get_connection()
+            conn.start_transaction()
+            cursor = conn.cursor()
+
+            cursor.executemany(self.UPSERT_PART_QUERY, part_rows)
+            stats["parts"] = len(part_rows)
+
+            analog_rows = sorted({row for part in parts for row in self._analog_rows(part)})
+            if analog_rows:
+                cursor.executemany(self.INSERT_ANALOG_QUERY, analog_rows)
+
+            stats["prices"] = self._write_prices(cursor, price_rows)
+
+            cursor.close()
+            conn.commit()
+        except Error as e:
+            logger.error(f"Error saving search results: {e}")
+            if conn:
+                conn.rollback()
+            stats.update(ok=False, parts=0, prices=0)
+        finally:
+            if conn:
+                conn.close()
+
+        stats["elapsed_ms"] = (time.perf_counter() - started) * 1000
+        logger.info(
+            f"Saved {stats['parts']} parts and {stats['prices']} prices "
+            f"in {stats['elapsed_ms']:.1f} ms"
+        )
+        return stats
+
+    def save_part_data(self, part):
         """Сохранение данных о запчасти"""
+        return self.save_search_results([part])["ok"]
+
+    def save_prices(self, part):
+        """Сохранение цен в историю"""
+        price_rows = self._price_rows(part)
+        if not price_rows:
+            return
+
+        conn = None
+        try:
+            conn = self.get_connection()
+            conn.start_transaction()
+            cursor = conn.cursor()
+            self._write_prices(cursor, price_rows)
+            cursor.close()
+            conn.commit()
+        except Error as e:
+            logger.error(f"Error saving prices: {e}")
+            if conn:
+                conn.rollback()
+        finally:
+            if conn:
+                conn.close()
+
+    def load_part_numbers(self):
+        """Все известные каталожные номера для индекса подсказок"""
+        conn = None
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.execute("SELECT part_number FROM parts")
+            part_numbers = [row[0] for row in cursor.fetchall()]
+            cursor.close()
+            return part_numbers
+        except Error as e:
+            logger.error(f"Error loading part numbers: {e}")
+            return []
+        finally:
+            if conn:
+                conn.close()
+
+    def load_analog_edges(self):
+        """Все связи (запчасть, аналог) для индекса аналогов"""
+        conn = None
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.execute("SELECT part_number, analog_number FROM part_analogs")
+            edges = cursor.fetchall()
+            cursor.close()
+            return edges
+        except Error as e:
+            logger.error(f"Error loading part analogs: {e}")
+            return []
+        finally:
+            if conn:
+                conn.close()
+
+    def get_part_history(self, part_number, days=30, limit=None, offset=0):
+        """
+        Получение истории цен за период, новые записи первыми.
+
+        limit/offset - постраничная выборка на стороне сервера; запрос идет
+        по индексу (part_number, found_at) без сортировки и без JOIN,
+        название поставщика берется из справочника в памяти.
+
+        В режиме PRICE_HISTORY_DEDUP повторно подтвержденные цены в price_history
+        не пишутся, поэтому к истории добавляются текущие цены из price_latest
+        на дату их последнего просмотра.
+        """
         query = """
-        INSERT INTO parts (part_number, name, description, brands, analogs)
-        VALUES (%s, %s, %s, %s, %s)
-        ON DUPLICATE KEY UPDATE
-            name = VALUES(name),
-            description = VALUES(description),
-            brands = VALUES(brands),
-            analogs = VALUES(analogs),
-            updated_at = CURRENT_TIMESTAMP
+        SELECT part_number, supplier_code, brand, price, delivery_days, found_at
+        FROM price_history
+        WHERE part_number = %s
+            AND found_at >= DATE_SUB(CURDATE(), INTERVAL %s DAY)
+        ORDER BY found_at DESC
+        """
+        current_query = """
+        SELECT part_number, supplier_code, brand, price, delivery_days,
+            last_seen_at AS found_at
+        FROM price_latest
+        WHERE part_number = %s
+            AND last_seen_at > changed_at
+            AND last_seen_at >= DATE_SUB(CURDATE(), INTERVAL %s DAY)
+        """
+        params = [part_number, days]
+        if limit is not None:
+            # Текущие цены встают в начало, поэтому страница берется с запасом от начала
+            query += " LIMIT %s"
+            params += [offset + limit]
+
+        conn = None
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute(query, params)
+            results = cursor.fetchall()
+            if Config.PRICE_HISTORY_DEDUP:
+                cursor.execute(current_query, (part_number, days))
+                results = sorted(
+                    results + cursor.fetchall(),
+                    key=lambda record: record['found_at'],
+                    reverse=True
+                )
+            cursor.close()
+        except Error as e:
+            logger.error(f"Error getting part history: {e}")
+            return []
+        finally:
+            if conn:
+                conn.close()
+
+        if limit is not None:
+            results = results[offset:offset + limit]
+
+        for record in results:
+            code = record.pop('supplier_code')
+            record['supplier_name'] = self.supplier_names.get(code, code)
+            record['date'] = record.pop('found_at').date()
+        return results
+
+    def get_daily_stats(self, part_number, days=30, limit=None, offset=0):
+        """Дневная статистика цен по запчасти, новые дни первыми"""
+        query = """
+        SELECT part_number, supplier_code, brand, stat_date,
+            min_price, max_price, price_sum / quote_count AS avg_price,
+            quote_count, last_delivery_days
+        FROM price_daily_stats
+        WHERE part_number = %s
+            AND stat_date >= DATE_SUB(CURDATE(), INTERVAL %s DAY)
+        ORDER BY stat_date DESC, supplier_code, brand
+        """
+        params = [part_number, days]
+        if limit is not None:
+            query += " LIMIT %s OFFSET %s"
+            params += [limit, offset]
+
+        conn = None
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute(query, params)
+            results = cursor.fetchall()
+            cursor.close()
+        except Error as e:
+            logger.error(f"Error getting daily stats: {e}")
+            return []
+        finally:
+            if conn:
+                conn.close()
+
+        for record in results:
+            record['supplier_name'] = self.supplier_names.get(
+                record['supplier_code'], record['supplier_code']
+            )
+        return results
+
+    def backfill_daily_stats(self, days=None):
         """
+        Пересчет price_daily_stats из price_history.
+
+        Идет по одному дню, чтобы транзакции оставались короткими; строки
+        статистики за каждый день заменяются значениями из сырых данных.
+        В режиме PRICE_HISTORY_DEDUP в price_history только изменения цен,
+        поэтому существующие строки не трогаются - досчитываются недостающие.
+        Возвращает число обработанных дней.
+        """
+        query = """
+        INSERT {ignore}INTO price_daily_stats
+        (part_number, supplier_code, brand, stat_date, min_price, max_price,
+         price_sum, quote_count, last_delivery_days, last_seen_at)
+        SELECT
+            part_number, supplier_code, COALESCE(brand, ''), DATE(found_at),
+            MIN(price), MAX(price), SUM(price), COUNT(*),
+            CAST(SUBSTRING_INDEX(
+                GROUP_CONCAT(delivery_days ORDER BY found_at DESC), ',', 1
+            ) AS SIGNED),
+            MAX(found_at)
+        FROM price_history
+        WHERE found_at >= %s AND found_at < %s + INTERVAL 1 DAY
+        GROUP BY part_number, supplier_code, COALESCE(brand, ''), DATE(found_at)
+        {update}"""
+        update = """ON DUPLICATE KEY UPDATE
+            min_price = VALUES(min_price),
+            max_price = VALUES(max_price),
+            price_sum = VALUES(price_sum),
+            quote_count = VALUES(quote_count),
+            last_delivery_days = VALUES(last_delivery_days),
+            last_seen_at = VALUES(last_seen_at)
+        """
+        if Config.PRICE_HISTORY_DEDUP:
+            logger.warning(
+                "PRICE_HISTORY_DEDUP is on: price_history holds only price changes, "
+                "existing daily stats are kept and only missing rows are filled"
+            )
+            query = query.format(ignore='IGNORE ', update='')
+        else:
+            query = query.format(ignore='', update=update)
 
         conn = None
+        processed = 0
         try:
             conn = self.get_connection()
             cursor = conn.cursor()
 
-            cursor.execute(query, (
-                part_data['part_number'],
-                part_data['name'],
-                part_data['description'],
-                json.dumps(part_data['brands']),
-                json.dumps(part_data['analogs'])
-            ))
+            if days is None:
+                cursor.execute("SELECT DATE(MIN(found_at)) FROM price_history")
+            else:
+                cursor.execute("SELECT DATE_SUB(CURDATE(), INTERVAL %s DAY)", (days,))
+            first_day = cursor.fetchone()[0]
+            cursor.execute("SELECT CURDATE()")
+            today = cursor.fetchone()[0]
+
+            day = first_day
+            while day is not None and day <= today:
+                cursor.execute(query, (day, day))
+                conn.commit()
+                processed += 1
+                day += timedelta(days=1)
 
             cursor.close()
-            conn.commit()
+        except Error as e:
+            logger.error(f"Error backfilling daily stats: {e}")
+            if conn:
+                conn.rollback()
+        finally:
+            if conn:
+                conn.close()
+
+        logger.info(f"Daily stats backfilled for {processed} days")
+        return processed
 
-            # Сохранение цен
-            self.save_prices(part_data)
+    def log_search_request(self, user_id, username, part_numbers, suppliers, results_count):
+        """Логирование поискового запроса"""
+        query = """
+        INSERT INTO search_requests
+        (telegram_user_id, telegram_username, part_numbers, suppliers, results_count)
+        VALUES (%s, %s, %s, %s, %s)
+        """
 
-            return True
+        conn = None
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.execute(query, (
+                user_id,
+                username,
+                json.dumps(part_numbers),
+                json.dumps(suppliers),
+                results_count
+            ))
+            request_id = cursor.lastrowid
+            cursor.close()
+            conn.commit()
+            return request_id
         except Error as e:
-            logger.error(f"Error saving part data: {e}")
+            logger.error(f"Error logging search request: {e}")
             if conn:
                 conn.rollback()
-            return False
+            return None
         finally:
             if conn:
                 conn.close()
 
-    def save_prices(self, part_data):
-        """Сохранение цен в историю"""
+    INSERT_ANALYSIS_QUERY = """
+    INSERT INTO analysis_results
+    (request_id, part_number, min_price, min_price_supplier,
+     median_price, median_price_supplier, ai_analysis)
+    VALUES (%s, %s, %s, %s, %s, %s, %s)
+    """
+
+    def save_search_requests(self, requests):
+        """
+        Пакетное сохранение поисковых запросов вместе с результатами анализа.
+
+        Каждый элемент: user_id, username, part_numbers, suppliers,
+        results_count и список analyses (строки analysis_results без request_id).
+        """
         query = """
-        INSERT INTO price_history
-        (part_number, supplier_code, brand, price, delivery_days)
+        INSERT INTO search_requests
+        (telegram_user_id, telegram_username, part_numbers, suppliers, results_count)
         VALUES (%s, %s, %s, %s, %s)
         """
 
+        started = time.perf_counter()
+        stats = {"ok": True, "requests": 0, "analyses": 0, "elapsed_ms": 0.0}
+        if not requests:
+            return stats
+
         conn = None
         try:
             conn = self.get_connection()
+            conn.start_transaction()
             cursor = conn.cursor()
 
-            for supplier, prices in part_data['prices'].items():
-                for price_data in prices:
-                    cursor.execute(query, (
-                        part_data['part_number'],
-                        supplier,
-                        price_data['brand'],
-                        price_data['price'],
-                        price_data['delivery']
-                    ))
+            analysis_rows = []
+            for request in requests:
+                cursor.execute(query, (
+                    request['user_id'],
+                    request['username'],
+                    json.dumps(request['part_numbers']),
+                    json.dumps(request['suppliers']),
+                    request['results_count']
+                ))
+                request_id = cursor.lastrowid
+                analysis_rows.extend(
+                    (request_id, *row) for row in request.get('analyses', [])
+                )
+
+            if analysis_rows:
+                cursor.executemany(self.INSERT_ANALYSIS_QUERY, analysis_rows)
 
             cursor.close()
             conn.commit()
+            stats.update(requests=len(requests), analyses=len(analysis_rows))
         except Error as e:
-            logger.error(f"Error saving prices: {e}")
+            logger.error(f"Error saving search requests: {e}")
             if conn:
                 conn.rollback()
+            stats["ok"] = False
         finally:
             if conn:
                 conn.close()
 
-    def get_part_history(self, part_number, days=30):
-        """Получение истории цен за период"""
-        query = """
-        SELECT
-            ph.part_number,
-            s.name as supplier_name,
-            ph.brand,
-            ph.price,
-            ph.delivery_days,
-            DATE(ph.found_at) as date
-        FROM price_history ph
-        JOIN suppliers s ON ph.supplier_code = s.code
-        WHERE ph.part_number = %s
-            AND ph.found_at >= DATE_SUB(CURDATE(), INTERVAL %s DAY)
-        ORDER BY ph.found_at DESC
+        stats["elapsed_ms"] = (time.perf_counter() - started) * 1000
+        return stats
+
+    REQUEST_TIMING_COLUMNS = (
+        'kind', 'outcome', 'parts_count', 'results_count', 'report_bytes',
+        'queue_ms', 'parse_ms', 'download_ms', 'search_ms', 'analysis_ms',
+        'ai_ms', 'report_ms', 'upload_ms', 'db_ms', 'total_ms'
+    )
+
+    def save_request_timings(self, timings):
+        """Пакетное сохранение выборки времени обработки запросов (request_timings)"""
+        query = f"""
+        INSERT INTO request_timings
+        (telegram_user_id, {', '.join(self.REQUEST_TIMING_COLUMNS)})
+        VALUES ({', '.join(['%s'] * (len(self.REQUEST_TIMING_COLUMNS) + 1))})
         """
 
+        started = time.perf_counter()
+        stats = {"ok": True, "timings": 0, "elapsed_ms": 0.0}
+        if not timings:
+            return stats
+
+        rows = [
+            (timing['user_id'], *(timing.get(column) for column in self.REQUEST_TIMING_COLUMNS))
+            for timing in timings
+        ]
+
         conn = None
         try:
             conn = self.get_connection()
-            cursor = conn.cursor(dictionary=True)
-            cursor.execute(query, (part_number, days))
-            results = cursor.fetchall()
+            conn.start_transaction()
+            cursor = conn.cursor()
+            cursor.executemany(query, rows)
             cursor.close()
-            return results
+            conn.commit()
+            stats["timings"] = len(rows)
         except Error as e:
-            logger.error(f"Error getting part history: {e}")
-            return []
+            logger.error(f"Error saving request timings: {e}")
+            if conn:
+                conn.rollback()
+            stats["ok"] = False
         finally:
             if conn:
                 conn.close()
 
+        stats["elapsed_ms"] = (time.perf_counter() - started) * 1000
+        return stats
+
 db_manager = DatabaseManager()
+async_db = AsyncDatabaseManager(db_manager, max_workers=Config.MYSQL_CONFIG['pool_size'])
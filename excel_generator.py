@@ -1,14 +1,27 @@
 from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import PatternFill, Font, Alignment, Border, Side
 from openpyxl.utils import get_column_letter
 from datetime import datetime
+import asyncio
+import io
+import logging
 import os
+import time
+import uuid
 from config import Config
+from models import SUPPLIER_NAMES
+
+logger = logging.getLogger(__name__)
+
+REPORT_COLUMNS = 10  # A:J - ширина заголовков отчета
+
+# Ширины колонок сводного отчета: строки пишутся до того, как известны все значения
+BULK_COLUMN_WIDTHS = [30, 36, 14, 12, 20, 6, 6, 6, 6, 6]
 
 class ExcelReportGenerator:
     def __init__(self):
-        self.reports_dir = "reports"
-        os.makedirs(self.reports_dir, exist_ok=True)
+        self.reports_dir = Config.REPORTS_DIR
 
         self.header_fill = PatternFill(
             start_color="CCCCCC",
@@ -24,8 +37,145 @@ class ExcelReportGenerator:
             "factorystock": "FFFFFFCC"       # Светло-желтый
         }
 
-    def generate_report(self, analysis_results, user_info=None):
-        """Генерация Excel отчета"""
+        # Общие стили потокового режима: создаются один раз, а не на каждую ячейку
+        self.title_font = Font(bold=True, size=14)
+        self.part_font = Font(bold=True, size=12, color="000000")
+        self.part_fill = PatternFill(start_color="DDDDDD", end_color="DDDDDD", fill_type="solid")
+        self.bold_font = Font(bold=True)
+        self.min_font = Font(bold=True, color="FF8C00")  # Оранжевый
+        self.median_font = Font(bold=True, color="0000FF")  # Синий
+        self.supplier_fills = {
+            code: PatternFill(start_color=color, end_color=color, fill_type="solid")
+            for code, color in self.supplier_colors.items()
+        }
+
+    def generate_report(self, analysis_results, user_info=None, streaming=None, output=None):
+        """
+        Генерация Excel отчета.
+
+        output - файловый объект (например, io.BytesIO), в который пишется отчет;
+        без него отчет сохраняется в reports_dir под уникальным именем и
+        возвращается путь к файлу.
+        """
+        if streaming is None:
+            streaming = Config.REPORT_STREAMING
+
+        if streaming:
+            wb = self._build_streaming_workbook(analysis_results, user_info)
+        else:
+            wb = self._build_workbook(analysis_results, user_info)
+
+        if output is not None:
+            wb.save(output)
+            return output
+
+        filepath = self._archive_path(user_info.get('id') if user_info else None)
+        wb.save(filepath)
+
+        return filepath
+
+    def render_report(self, analysis_results, user_info=None, streaming=None) -> bytes:
+        """Отчет целиком в памяти, без записи на диск"""
+        buffer = io.BytesIO()
+        self.generate_report(analysis_results, user_info, streaming=streaming, output=buffer)
+        return buffer.getvalue()
+
+    def _archive_path(self, user_id=None):
+        """Уникальное имя файла: отчеты одной секунды от разных пользователей не совпадают"""
+        os.makedirs(self.reports_dir, exist_ok=True)
+        filename = (
+            f"parts_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+            f"_{user_id or 'anon'}_{uuid.uuid4().hex[:8]}.xlsx"
+        )
+        return os.path.join(self.reports_dir, filename)
+
+    def archive_report(self, report_bytes: bytes, user_id=None):
+        """Сохранение копии отчета в архив (если архив включен)"""
+        if not Config.REPORTS_ARCHIVE_ENABLED:
+            return None
+
+        filepath = self._archive_path(user_id)
+        tmp_path = f"{filepath}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(report_bytes)
+        os.replace(tmp_path, filepath)
+        return filepath
+
+    def cleanup_archive(self):
+        """Удаление отчетов старше срока хранения и самых старых сверх лимита размера"""
+        if not os.path.isdir(self.reports_dir):
+            return 0
+
+        files = []
+        for entry in os.scandir(self.reports_dir):
+            if entry.is_file() and entry.name.endswith('.xlsx'):
+                stat = entry.stat()
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+        files.sort()
+
+        removed = 0
+        expire_before = time.time() - Config.REPORTS_RETENTION_DAYS * 86400
+        total_size = sum(size for _, size, _ in files)
+        max_size = Config.REPORTS_MAX_TOTAL_MB * 1024 * 1024
+
+        for mtime, size, path in files:
+            if mtime >= expire_before and total_size <= max_size:
+                break
+            try:
+                os.remove(path)
+                removed += 1
+                total_size -= size
+            except OSError as e:
+                logger.warning(f"Cannot remove archived report {path}: {e}")
+
+        if removed:
+            logger.info(f"Removed {removed} archived reports")
+        return removed
+
+    async def cleanup_loop(self, interval: float):
+        """Фоновая периодическая очистка архива отчетов"""
+        while True:
+            try:
+                await asyncio.to_thread(self.cleanup_archive)
+            except Exception as e:
+                logger.error(f"Report archive cleanup failed: {e}")
+            await asyncio.sleep(interval)
+
+    @staticmethod
+    def _analog_price(analog):
+        """Цена аналога; оценка (нет предложения в кэше) помечается знаком ~"""
+        prefix = "~" if analog.get("source") != "cache" else ""
+        return f"{prefix}{analog['estimated_price']:.0f} руб."
+
+    @staticmethod
+    def _supplier_status_rows(result):
+        """Поставщики без свежего ответа: (подпись, пояснение) для блока сведений"""
+        status = result.get("supplier_status") or {}
+        rows = []
+        for code, label, note in (
+            ('stale', "Устаревшие цены", "поставщик недоступен, цены из кэша"),
+            ('missing', "Нет данных", "поставщик недоступен")
+        ):
+            names = [SUPPLIER_NAMES.get(s, s) for s, value in status.items() if value == code]
+            if names:
+                rows.append((label, f"{', '.join(names)} - {note}"))
+        return rows
+
+    @staticmethod
+    def _price_note(price, result):
+        """Примечание к предложению: минимальная/медианная цена, устаревшие данные"""
+        note = None
+        if price.price == result["min_price"].price:
+            note = "МИНИМАЛЬНАЯ ЦЕНА"
+        elif price.price == result["median_price"].price:
+            note = "МЕДИАННАЯ ЦЕНА"
+
+        if (result.get("supplier_status") or {}).get(price.supplier) == 'stale':
+            note = f"{note} (устар.)" if note else "УСТАРЕВШАЯ ЦЕНА"
+        return note
+
+    def _build_workbook(self, analysis_results, user_info=None):
+        """Отчет на обычном (in-memory) листе openpyxl"""
         wb = Workbook()
         ws = wb.active
         ws.title = "Анализ запчастей"
@@ -56,10 +206,11 @@ class ExcelReportGenerator:
 
             info_rows = [
                 ["Бренды", ", ".join(result["brands"])],
-                ["Мин. цена", f"{result['min_price']['price']} руб. ({result['min_price']['supplier_name']})"],
-                ["Мед. цена", f"{result['median_price']['price']} руб. ({result['median_price']['supplier_name']})"],
-                ["Срок доставки", f"{result['min_price']['delivery']} дней (мин.)"]
+                ["Мин. цена", f"{result['min_price'].price} руб. ({result['min_price'].supplier_name})"],
+                ["Мед. цена", f"{result['median_price'].price} руб. ({result['median_price'].supplier_name})"],
+                ["Срок доставки", f"{result['min_price'].delivery} дней (мин.)"]
             ]
+            info_rows.extend(self._supplier_status_rows(result))
 
             for label, value in info_rows:
                 ws[f'A{row_idx}'] = label
@@ -78,12 +229,12 @@ class ExcelReportGenerator:
             row_idx += 1
 
             for price in result["all_prices"]:
-                ws.cell(row=row_idx, column=1, value=price["supplier_name"])
-                ws.cell(row=row_idx, column=2, value=price["brand"])
-                ws.cell(row=row_idx, column=3, value=price["price"])
-                ws.cell(row=row_idx, column=4, value=price["delivery"])
+                ws.cell(row=row_idx, column=1, value=price.supplier_name)
+                ws.cell(row=row_idx, column=2, value=price.brand)
+                ws.cell(row=row_idx, column=3, value=price.price)
+                ws.cell(row=row_idx, column=4, value=price.delivery)
 
-                supplier_code = price["supplier"]
+                supplier_code = price.supplier
                 if supplier_code in self.supplier_colors:
                     fill_color = self.supplier_colors[supplier_code]
                     for col in range(1, 6):
@@ -93,16 +244,18 @@ class ExcelReportGenerator:
                             fill_type="solid"
                         )
 
-                if price["price"] == result["min_price"]["price"]:
-                    ws.cell(row=row_idx, column=5, value="МИНИМАЛЬНАЯ ЦЕНА")
+                note = self._price_note(price, result)
+                if note:
+                    ws.cell(row=row_idx, column=5, value=note)
+
+                if price.price == result["min_price"].price:
                     for col in range(1, 6):
                         ws.cell(row=row_idx, column=col).font = Font(
                             bold=True,
                             color="FF8C00"  # Оранжевый
                         )
 
-                elif price["price"] == result["median_price"]["price"]:
-                    ws.cell(row=row_idx, column=5, value="МЕДИАННАЯ ЦЕНА")
+                elif price.price == result["median_price"].price:
                     for col in range(1, 6):
                         ws.cell(row=row_idx, column=col).font = Font(
                             bold=True,
@@ -120,7 +273,7 @@ class ExcelReportGenerator:
 
             for analog in result["analogs"]:
                 ws[f'A{row_idx}'] = analog["part_number"]
-                ws[f'B{row_idx}'] = f"~{analog['estimated_price']:.0f} руб."
+                ws[f'B{row_idx}'] = self._analog_price(analog)
                 ws[f'C{row_idx}'] = analog["availability"]
                 row_idx += 1
 
@@ -140,10 +293,181 @@ class ExcelReportGenerator:
             adjusted_width = min(max_length + 2, 50)
             ws.column_dimensions[column_letter].width = adjusted_width
 
-        filename = f"parts_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-        filepath = os.path.join(self.reports_dir, filename)
-        wb.save(filepath)
+        return wb
 
-        return filepath
+    def _title_rows(self, user_info=None):
+        """Заголовок отчета: название с датой, пользователь и пустая строка"""
+        title = f"Отчет анализа промышленных запчастей\n{datetime.now().strftime('%d.%m.%Y %H:%M')}"
+        yield [(title, self.title_font, None, self.center_alignment)], REPORT_COLUMNS
+
+        if user_info:
+            yield [
+                (f"Пользователь: {user_info.get('username', 'Неизвестно')}", None, None, None),
+                (f"ID: {user_info.get('id', 'Неизвестно')}", None, None, None)
+            ], None
+        else:
+            yield [], None
+        yield [], None
+
+    def _result_rows(self, result):
+        """Блок одной запчасти: сведения, таблица предложений и аналоги"""
+        yield [(
+            f"Запчасть: {result['part_number']} - {result['name']}",
+            self.part_font, self.part_fill, None
+        )], REPORT_COLUMNS
+
+        yield [("Бренды", None, None, None), (", ".join(result["brands"]), None, None, None)], None
+        yield [
+            ("Мин. цена", None, None, None),
+            (f"{result['min_price'].price} руб. ({result['min_price'].supplier_name})", None, None, None)
+        ], None
+        yield [
+            ("Мед. цена", None, None, None),
+            (f"{result['median_price'].price} руб. ({result['median_price'].supplier_name})", None, None, None)
+        ], None
+        yield [
+            ("Срок доставки", None, None, None),
+            (f"{result['min_price'].delivery} дней (мин.)", None, None, None)
+        ], None
+        for label, value in self._supplier_status_rows(result):
+            yield [(label, None, None, None), (value, None, None, None)], None
+        yield [], None
+
+        headers = ["Поставщик", "Бренд", "Цена (руб.)", "Срок (дней)", "Примечание"]
+        yield [
+            (header, self.header_font, self.header_fill, self.center_alignment)
+            for header in headers
+        ], None
+
+        min_price = result["min_price"].price
+        median_price = result["median_price"].price
+        for price in result["all_prices"]:
+            fill = self.supplier_fills.get(price.supplier)
+            font = None
+            if price.price == min_price:
+                font = self.min_font
+            elif price.price == median_price:
+                font = self.median_font
+            note = self._price_note(price, result)
+
+            values = [price.supplier_name, price.brand, price.price, price.delivery, note]
+            yield [(value, font, fill, None) for value in values], None
+
+        yield [], None
+        yield [("Доступные аналоги:", self.bold_font, None, None)], 5
+
+        for analog in result["analogs"]:
+            yield [
+                (analog["part_number"], None, None, None),
+                (self._analog_price(analog), None, None, None),
+                (analog["availability"], None, None, None)
+            ], None
+
+        yield [], None
+        yield [], None
+
+    def _report_rows(self, analysis_results, user_info=None):
+        """
+        Раскладка отчета по строкам для потокового режима.
+
+        Каждая строка - (ячейки, объединение), где ячейка - (значение, font, fill,
+        alignment), а объединение - номер последней колонки или None.
+        """
+        yield from self._title_rows(user_info)
+        for result in analysis_results:
+            yield from self._result_rows(result)
+
+    def _column_widths(self, rows):
+        """Ширины колонок, накопленные по строкам (как в автоподборе обычного режима)"""
+        # Пустая ячейка в обычном режиме дает str(None) - 4 символа
+        widths = [len(str(None))] * REPORT_COLUMNS
+        for cells, _ in rows:
+            for col_idx, (value, _, _, _) in enumerate(cells):
+                if value is not None:
+                    widths[col_idx] = max(widths[col_idx], len(str(value)))
+        return [min(width + 2, 50) for width in widths]
+
+    def _build_streaming_workbook(self, analysis_results, user_info=None):
+        """
+        Отчет на write-only листе: строки пишутся сразу в поток.
+
+        Ширины колонок в write-only листе записываются до первой строки,
+        поэтому они накапливаются отдельным легким проходом по той же раскладке.
+        """
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet("Анализ запчастей")
+
+        widths = self._column_widths(self._report_rows(analysis_results, user_info))
+        for col_idx, width in enumerate(widths, 1):
+            ws.column_dimensions[get_column_letter(col_idx)].width = width
+
+        self._append_rows(ws, self._report_rows(analysis_results, user_info))
+        return wb
+
+    @staticmethod
+    def _append_rows(ws, rows, row_idx=1, merge=True):
+        """Запись строк раскладки в write-only лист; возвращает номер следующей строки"""
+        for cells, merge_to in rows:
+            row = []
+            for value, font, fill, alignment in cells:
+                cell = WriteOnlyCell(ws, value=value)
+                if font is not None:
+                    cell.font = font
+                if fill is not None:
+                    cell.fill = fill
+                if alignment is not None:
+                    cell.alignment = alignment
+                row.append(cell)
+            ws.append(row)
+
+            if merge and merge_to:
+                ws.merged_cells.add(f"A{row_idx}:{get_column_letter(merge_to)}{row_idx}")
+            row_idx += 1
+
+        return row_idx
+
+    def open_bulk_report(self, user_info=None):
+        """Сводный отчет, дописываемый порциями (см. BulkReportWriter)"""
+        return BulkReportWriter(self, user_info)
+
+
+class BulkReportWriter:
+    """
+    Сводный отчет по большому списку запчастей.
+
+    Write-only лист с заранее заданными ширинами колонок: результаты
+    дописываются порциями по мере готовности и в памяти не накапливаются.
+    Объединения ячеек write-only лист держит до сохранения, поэтому
+    в сводном отчете заголовки не объединяются - текст и так виден целиком.
+    """
+
+    def __init__(self, generator, user_info=None, widths=BULK_COLUMN_WIDTHS):
+        self.generator = generator
+        self.wb = Workbook(write_only=True)
+        self.ws = self.wb.create_sheet("Анализ запчастей")
+        for col_idx, width in enumerate(widths, 1):
+            self.ws.column_dimensions[get_column_letter(col_idx)].width = width
+
+        self.row_idx = generator._append_rows(self.ws, generator._title_rows(user_info))
+        self.parts = 0
+
+    def add(self, analysis_results):
+        for result in analysis_results:
+            self.row_idx = self.generator._append_rows(
+                self.ws, self.generator._result_rows(result), self.row_idx, merge=False
+            )
+            self.parts += 1
+
+    def add_missing(self, part_numbers):
+        """Итоговый раздел: запчасти, по которым никто из поставщиков не ответил"""
+        if not part_numbers:
+            return
+        rows = [([(f"Не найдены у поставщиков ({len(part_numbers)}):", self.generator.bold_font, None, None)], 5)]
+        rows += [([(part_number, None, None, None)], None) for part_number in part_numbers]
+        self.row_idx = self.generator._append_rows(self.ws, rows, self.row_idx, merge=False)
+
+    def save(self, path):
+        self.wb.save(path)
+        return path
 
 report_generator = ExcelReportGenerator()
@@ -0,0 +1,64 @@
+"""
+Обслуживание базы данных.
+
+    python maintenance.py migrate                       - применить миграции схемы
+    python maintenance.py backfill-daily-stats [--days N] - пересчитать price_daily_stats
+        (при PRICE_HISTORY_DEDUP=1 - только досчитать отсутствующие строки)
+    python maintenance.py retention [--table T]          - архивировать и удалить старую историю
+"""
+import argparse
+import logging
+
+from config import Config
+from database import db_manager
+from retention import retention_manager
+
+logging.basicConfig(
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    level=logging.INFO
+)
+
+
+def migrate(args):
+    # Миграции применяются и при подключении, поэтому учитываем обе попытки
+    applied = db_manager.applied_migrations + db_manager.run_migrations()
+    print(f"Применено миграций: {len(applied)}")
+    for name in applied:
+        print(f"  {name}")
+
+
+def backfill_daily_stats(args):
+    processed = db_manager.backfill_daily_stats(days=args.days)
+    print(f"Пересчитано дней: {processed}")
+
+
+def retention(args):
+    tables = Config.RETENTION_DAYS
+    if args.table:
+        tables = {args.table: tables[args.table]}
+    for table, result in retention_manager.run(tables).items():
+        print(f"{table}: {result}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Обслуживание базы данных бота")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    commands.add_parser('migrate', help="применить миграции схемы").set_defaults(func=migrate)
+
+    backfill = commands.add_parser('backfill-daily-stats', help="пересчитать price_daily_stats")
+    backfill.add_argument('--days', type=int, default=None,
+                          help="только последние N дней (по умолчанию вся история)")
+    backfill.set_defaults(func=backfill_daily_stats)
+
+    expire = commands.add_parser('retention', help="архивировать и удалить историю старше окна хранения")
+    expire.add_argument('--table', choices=sorted(Config.RETENTION_DAYS), default=None,
+                        help="только одна таблица (по умолчанию все)")
+    expire.set_defaults(func=retention)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
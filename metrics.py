@@ -0,0 +1,289 @@
+"""
+Метрики задержек и счетчики горячего пути.
+
+Каждая гистограмма ведется в двух видах:
+- накопительная, в формате Prometheus (_bucket/_sum/_count) - для внешнего
+  сбора с локального HTTP-эндпоинта /metrics;
+- скользящая за окно (supplier_health.LatencyHistogram) - для перцентилей
+  p50/p95/p99 в команде /stats.
+
+Состояние других модулей (очереди, кэши, поставщики) не дублируется:
+его отдают функции-сборщики, вызываемые при каждом чтении метрик.
+"""
+import logging
+import random
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from aiohttp import web
+
+from config import Config
+from supplier_health import LATENCY_BUCKETS, LatencyHistogram
+
+logger = logging.getLogger(__name__)
+
+PREFIX = 'partsbot_'
+
+# Единица измерения -> (корзины Prometheus, более мелкие корзины скользящих перцентилей)
+BUCKETS = {
+    'seconds': ([0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120],
+                LATENCY_BUCKETS),
+    'bytes': ([1024 * 4 ** i for i in range(9)], [1024 * 2 ** i for i in range(17)]),
+    'count': ([1, 5, 10, 50, 100, 500, 1000, 5000], [2 ** i for i in range(14)]),
+}
+
+# Стадии обработки запроса (колонки <стадия>_ms в request_timings)
+STAGES = ('queue', 'parse', 'download', 'search', 'analysis', 'ai', 'report', 'upload', 'db')
+
+Labels = Tuple[Tuple[str, str], ...]
+# Сборщик возвращает (имя, тип counter/gauge, метки, значение)
+Sample = Tuple[str, str, Dict[str, Any], float]
+
+
+def _labels(labels: Dict[str, Any]) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in pairs) + '}'
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return f"{value:.10g}" if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    def __init__(self, buckets: List[float], window: float, recent_buckets: List[float]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.recent = LatencyHistogram(window, buckets=recent_buckets)
+
+    def observe(self, value: float):
+        for i, upper in enumerate(self.buckets):
+            if value <= upper:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.sum += value
+        self.count += 1
+        self.recent.observe(value)
+
+
+class MetricsRegistry:
+    def __init__(self, window: float, sample_rate: float = 0.0):
+        self.window = window
+        self.sample_rate = sample_rate
+
+        self._histograms: Dict[str, Dict[Labels, Histogram]] = {}
+        self._counters: Dict[str, Dict[Labels, float]] = {}
+        self._help: Dict[str, str] = {}
+        self._collectors: List[Callable[[], Iterable[Sample]]] = []
+
+    def describe(self, name: str, text: str):
+        self._help[name] = text
+
+    def observe(self, name: str, value: float, unit: str = 'seconds', **labels):
+        """Наблюдение в гистограмму; unit выбирает корзины (seconds, bytes, count)"""
+        series = self._histograms.setdefault(name, {})
+        key = _labels(labels)
+        histogram = series.get(key)
+        if histogram is None:
+            buckets, recent_buckets = BUCKETS[unit]
+            histogram = series[key] = Histogram(buckets, self.window, recent_buckets)
+        histogram.observe(value)
+
+    def inc(self, name: str, value: float = 1, **labels):
+        series = self._counters.setdefault(name, {})
+        key = _labels(labels)
+        series[key] = series.get(key, 0) + value
+
+    @contextmanager
+    def timer(self, name: str, **labels) -> Iterator[None]:
+        """Время выполнения блока в гистограмму name, в том числе при исключении"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def add_collector(self, collector: Callable[[], Iterable[Sample]]):
+        self._collectors.append(collector)
+
+    def reset(self):
+        """Обнуление гистограмм и счетчиков (между прогонами бенчмарка)"""
+        self._histograms.clear()
+        self._counters.clear()
+
+    def should_sample(self) -> bool:
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def percentiles(self, name: str, quantiles=(50, 95, 99)) -> Dict[Labels, Dict[str, Any]]:
+        """Число наблюдений за окно и перцентили по каждой серии метрики"""
+        summary = {}
+        for key, histogram in sorted(self._histograms.get(name, {}).items()):
+            count = histogram.recent.count()
+            if not count:
+                continue
+            summary[key] = {"count": count}
+            for q in quantiles:
+                summary[key][f"p{q:g}"] = histogram.recent.percentile(q)
+        return summary
+
+    def _collected(self) -> Dict[str, Tuple[str, List[Tuple[Labels, float]]]]:
+        collected: Dict[str, Tuple[str, List[Tuple[Labels, float]]]] = {}
+        for collector in self._collectors:
+            try:
+                for name, kind, labels, value in collector():
+                    collected.setdefault(name, (kind, []))[1].append((_labels(labels), value))
+            except Exception as e:
+                logger.error(f"Metrics collector failed: {e}")
+        return collected
+
+    def render(self) -> str:
+        """Все метрики в текстовом формате Prometheus"""
+        lines = []
+
+        def header(name, kind):
+            if name in self._help:
+                lines.append(f"# HELP {PREFIX}{name} {self._help[name]}")
+            lines.append(f"# TYPE {PREFIX}{name} {kind}")
+
+        for name, series in sorted(self._histograms.items()):
+            header(name, 'histogram')
+            for key, histogram in sorted(series.items()):
+                cumulative = 0
+                for upper, count in zip(histogram.buckets + [float('inf')], histogram.counts):
+                    cumulative += count
+                    lines.append(
+                        f"{PREFIX}{name}_bucket{_format_labels(key, ('le', _format_value(float(upper))))} "
+                        f"{cumulative}"
+                    )
+                lines.append(f"{PREFIX}{name}_sum{_format_labels(key)} {_format_value(histogram.sum)}")
+                lines.append(f"{PREFIX}{name}_count{_format_labels(key)} {histogram.count}")
+
+        for name, series in sorted(self._counters.items()):
+            header(name, 'counter')
+            for key, value in sorted(series.items()):
+                lines.append(f"{PREFIX}{name}{_format_labels(key)} {_format_value(value)}")
+
+        for name, (kind, samples) in sorted(self._collected().items()):
+            header(name, kind)
+            for key, value in samples:
+                lines.append(f"{PREFIX}{name}{_format_labels(key)} {_format_value(value)}")
+
+        return "\n".join(lines) + "\n"
+
+    async def start_server(self, host: str, port: int) -> web.AppRunner:
+        """Локальный HTTP-эндпоинт GET /metrics"""
+        async def handle(request):
+            return web.Response(text=self.render(), content_type='text/plain', charset='utf-8')
+
+        app = web.Application()
+        app.router.add_get('/metrics', handle)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+        logger.info(f"Metrics endpoint on http://{host}:{port}/metrics")
+        return runner
+
+
+class RequestTiming:
+    """
+    Время стадий одного запроса пользователя.
+
+    Поиск, анализ и AI идут конвейером и перекрываются, поэтому стадии
+    не складываются в total: search - время до последнего ответа
+    поставщиков, analysis - суммарное время расчетов, ai - ожидание
+    AI-рекомендаций после окончания поиска.
+    """
+
+    def __init__(self, registry: MetricsRegistry, kind: str, user_id: Optional[int] = None):
+        self.registry = registry
+        self.kind = kind
+        self.user_id = user_id
+        self.started = time.perf_counter()
+
+        self.stages: Dict[str, float] = {}
+        self.parts_count = 0
+        self.results_count = 0
+        self.report_bytes = 0
+        self.outcome = 'ok'
+        self.total: Optional[float] = None
+
+    def add(self, stage: str, seconds: float):
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    @contextmanager
+    def stage(self, stage: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - started)
+
+    def finish(self, outcome: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Запись стадий и общего времени в гистограммы (однократно).
+        Возвращает строку для request_timings, если запрос попал в выборку.
+        """
+        if self.total is not None:
+            return None
+        if outcome is not None:
+            self.outcome = outcome
+        self.total = time.perf_counter() - self.started
+
+        for stage, seconds in self.stages.items():
+            self.registry.observe('stage_seconds', seconds, kind=self.kind, stage=stage)
+        self.registry.observe('request_seconds', self.total, kind=self.kind, outcome=self.outcome)
+        self.registry.inc('requests_total', kind=self.kind, outcome=self.outcome)
+        if self.parts_count:
+            self.registry.observe('request_parts', self.parts_count, unit='count', kind=self.kind)
+        if self.report_bytes:
+            self.registry.observe('report_bytes', self.report_bytes, unit='bytes', kind=self.kind)
+
+        if not self.registry.should_sample():
+            return None
+        row = {
+            'user_id': self.user_id,
+            'kind': self.kind,
+            'outcome': self.outcome,
+            'parts_count': self.parts_count,
+            'results_count': self.results_count,
+            'report_bytes': self.report_bytes,
+            'total_ms': round(self.total * 1000)
+        }
+        for stage in STAGES:
+            seconds = self.stages.get(stage)
+            row[f'{stage}_ms'] = round(seconds * 1000) if seconds is not None else None
+        return row
+
+
+metrics = MetricsRegistry(
+    window=Config.METRICS_WINDOW,
+    sample_rate=Config.METRICS_SAMPLE_RATE
+)
+
+metrics.describe('stage_seconds', 'Время стадии обработки запроса')
+metrics.describe('request_seconds', 'Полное время обработки запроса')
+metrics.describe('requests_total', 'Обработанные запросы по исходу')
+metrics.describe('request_parts', 'Число запчастей в запросе')
+metrics.describe('report_bytes', 'Размер Excel-отчета')
+metrics.describe('supplier_seconds', 'Время обращения к API поставщика')
+metrics.describe('mistral_seconds', 'Время запроса к Mistral')
+metrics.describe('db_flush_seconds', 'Время записи пачки в БД')
+metrics.describe('db_query_seconds', 'Время чтения из БД')
+metrics.describe('db_round_trips_total', 'Обращения к БД (транзакции)')
+metrics.describe('db_rows_written_total', 'Записанные в БД строки')
@@ -0,0 +1,156 @@
+"""
+Миграции схемы для уже существующих баз.
+
+Новые базы получают актуальную схему из DatabaseManager.create_tables,
+поэтому каждая миграция проверяет, не применено ли изменение ранее.
+Примененные миграции записываются в schema_migrations.
+"""
+import json
+import logging
+from datetime import date
+
+from config import Config
+from partitions import (
+    PARTITIONED_TABLES, add_months, is_partitioned, month_start, partition_table
+)
+
+logger = logging.getLogger(__name__)
+
+
+def index_exists(cursor, table, index):
+    cursor.execute(
+        """
+        SELECT COUNT(*) FROM information_schema.statistics
+        WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s
+        """,
+        (table, index)
+    )
+    return cursor.fetchone()[0] > 0
+
+
+def add_price_history_part_found_index(cursor):
+    """Составной индекс для /history: поиск по запчасти и сортировка по дате без filesort"""
+    if not index_exists(cursor, 'price_history', 'idx_part_found'):
+        cursor.execute(
+            "ALTER TABLE price_history ADD INDEX idx_part_found (part_number, found_at)"
+        )
+
+
+def primary_key_columns(cursor, table):
+    cursor.execute(
+        """
+        SELECT column_name FROM information_schema.key_column_usage
+        WHERE table_schema = DATABASE() AND table_name = %s AND constraint_name = 'PRIMARY'
+        ORDER BY ordinal_position
+        """,
+        (table,)
+    )
+    return [row[0] for row in cursor.fetchall()]
+
+
+def drop_foreign_keys(cursor, table):
+    """Удаление внешних ключей таблицы и ссылок на нее: секционированные таблицы их не поддерживают"""
+    cursor.execute(
+        """
+        SELECT table_name, constraint_name FROM information_schema.referential_constraints
+        WHERE constraint_schema = DATABASE()
+            AND (table_name = %s OR referenced_table_name = %s)
+        """,
+        (table, table)
+    )
+    for owner, constraint in cursor.fetchall():
+        cursor.execute(f"ALTER TABLE {owner} DROP FOREIGN KEY {constraint}")
+
+
+def partition_history_tables(cursor):
+    """
+    Помесячное секционирование таблиц истории для удаления старых данных целыми секциями.
+
+    Ключ секционирования должен входить в первичный ключ, поэтому он
+    становится (id, <время>); внешние ключи удаляются.
+    """
+    current = month_start(date.today())
+    for table, column in PARTITIONED_TABLES.items():
+        if is_partitioned(cursor, table):
+            continue
+
+        drop_foreign_keys(cursor, table)
+        if primary_key_columns(cursor, table) != ['id', column]:
+            cursor.execute(
+                f"""
+                ALTER TABLE {table}
+                    MODIFY {column} TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                    DROP PRIMARY KEY,
+                    ADD PRIMARY KEY (id, {column})
+                """
+            )
+
+        cursor.execute(f"SELECT MIN({column}) FROM {table}")
+        oldest = cursor.fetchone()[0]
+        first_month = month_start(oldest.date()) if oldest else current
+        partition_table(
+            cursor, table, min(first_month, current),
+            add_months(current, Config.PARTITION_MONTHS_AHEAD)
+        )
+
+
+def backfill_part_analogs(cursor):
+    """Перенос аналогов из JSON-колонки parts.analogs в таблицу связей part_analogs"""
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS part_analogs (
+            part_number VARCHAR(50) NOT NULL,
+            analog_number VARCHAR(50) NOT NULL,
+            PRIMARY KEY (part_number, analog_number),
+            INDEX idx_analog_number (analog_number)
+        )
+        """
+    )
+    cursor.execute("SELECT part_number, analogs FROM parts WHERE analogs IS NOT NULL")
+    rows = []
+    for part_number, analogs in cursor.fetchall():
+        for analog in json.loads(analogs) or []:
+            if analog and analog != part_number:
+                rows.append((part_number, analog))
+    if rows:
+        cursor.executemany(
+            "INSERT IGNORE INTO part_analogs (part_number, analog_number) VALUES (%s, %s)",
+            rows
+        )
+
+
+MIGRATIONS = [
+    ("0001_price_history_part_found_index", add_price_history_part_found_index),
+    ("0002_partition_history_tables", partition_history_tables),
+    ("0003_backfill_part_analogs", backfill_part_analogs),
+    # Секционирует таблицы, добавленные в PARTITIONED_TABLES позже (request_timings)
+    ("0004_partition_request_timings", partition_history_tables),
+]
+
+
+def apply_migrations(conn):
+    """Применение всех еще не выполненных миграций; возвращает их имена"""
+    cursor = conn.cursor()
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            name VARCHAR(100) PRIMARY KEY,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+    cursor.execute("SELECT name FROM schema_migrations")
+    done = {row[0] for row in cursor.fetchall()}
+
+    applied = []
+    for name, migration in MIGRATIONS:
+        if name in done:
+            continue
+        logger.info(f"Applying migration {name}")
+        migration(cursor)
+        cursor.execute("INSERT INTO schema_migrations (name) VALUES (%s)", (name,))
+        conn.commit()
+        applied.append(name)
+
+    cursor.close()
+    return applied
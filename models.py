@@ -0,0 +1,77 @@
+"""
+Компактные типы данных поиска: запчасть и предложение поставщика.
+
+Классы со __slots__ вместо словарей: без __dict__ и повторяющихся ключей
+в каждом предложении. Коды поставщиков и брендов интернируются, поэтому
+одинаковые строки во всех предложениях - один объект.
+"""
+import sys
+from dataclasses import dataclass
+from typing import Any, Dict, List
+
+SUPPLIER_NAMES = {
+    'industrialsupply': 'IndustrialSupply.ru',
+    'machineparts': 'MachineParts.com',
+    'factorystock': 'FactoryStock.eu'
+}
+
+
+def intern_code(value: Any) -> Any:
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+@dataclass
+class Quote:
+    """Предложение поставщика: бренд, цена и срок поставки в днях"""
+
+    __slots__ = ('supplier', 'brand', 'price', 'delivery')
+
+    supplier: str
+    brand: str
+    price: float
+    delivery: int
+
+    def __post_init__(self):
+        self.supplier = intern_code(self.supplier)
+        self.brand = intern_code(self.brand)
+
+    @property
+    def supplier_name(self) -> str:
+        return SUPPLIER_NAMES.get(self.supplier, self.supplier)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "supplier": self.supplier,
+            "brand": self.brand,
+            "price": self.price,
+            "delivery": self.delivery
+        }
+
+
+@dataclass
+class Part:
+    """
+    Запчасть со справочными данными и предложениями по поставщикам.
+
+    supplier_status - поставщики, от которых ответа не получено:
+    'stale' (цены взяты из просроченного кэша) или 'missing' (данных нет).
+    """
+
+    __slots__ = ('part_number', 'name', 'description', 'brands', 'analogs', 'prices',
+                 'supplier_status')
+
+    part_number: str
+    name: str
+    description: str
+    brands: List[str]
+    analogs: List[str]
+    prices: Dict[str, List[Quote]]
+    supplier_status: Dict[str, str]
+
+    def __post_init__(self):
+        self.brands = [intern_code(brand) for brand in self.brands]
+        self.prices = {intern_code(supplier): quotes for supplier, quotes in self.prices.items()}
+
+    def quotes(self) -> List[Quote]:
+        """Все предложения по порядку поставщиков"""
+        return [quote for quotes in self.prices.values() for quote in quotes]
@@ -0,0 +1,234 @@
+import heapq
+import logging
+import string
+from bisect import bisect_left, insort
+from typing import Iterable, List, Optional, Set
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+PART_NUMBER_ALPHABET = string.ascii_uppercase + string.digits + "-"
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """
+    Расстояние Дамерау-Левенштейна (с перестановкой соседних символов).
+    Если оно больше limit, возвращается limit + 1 - счет прекращается раньше.
+    """
+    # Общие начало и конец на расстояние не влияют
+    start = 0
+    while start < len(a) and start < len(b) and a[start] == b[start]:
+        start += 1
+    end_a, end_b = len(a), len(b)
+    while end_a > start and end_b > start and a[end_a - 1] == b[end_b - 1]:
+        end_a -= 1
+        end_b -= 1
+    a, b = a[start:end_a], b[start:end_b]
+
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    if not a or not b:
+        return max(len(a), len(b))
+
+    # Считаются только клетки полосы |i - j| <= limit: остальные заведомо больше limit
+    over = limit + 1
+    previous2: Optional[List[int]] = None
+    previous = [j if j <= limit else over for j in range(len(b) + 1)]
+    for i in range(1, len(a) + 1):
+        current = [over] * (len(b) + 1)
+        if i <= limit:
+            current[0] = i
+        row_min = current[0]
+        for j in range(max(1, i - limit), min(len(b), i + limit) + 1):
+            value = previous[j - 1] if a[i - 1] == b[j - 1] else previous[j - 1] + 1
+            if previous[j] + 1 < value:
+                value = previous[j] + 1
+            if current[j - 1] + 1 < value:
+                value = current[j - 1] + 1
+            if (previous2 is not None and j > 1 and previous2[j - 2] + 1 < value
+                    and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]):
+                value = previous2[j - 2] + 1
+            current[j] = value if value < over else over
+            if value < row_min:
+                row_min = value
+        if row_min > limit:
+            return over
+        previous2, previous = previous, current
+
+    return previous[-1]
+
+
+class SortedStrings:
+    """
+    Отсортированный список строк с пакетной вставкой.
+
+    Новые строки копятся в отсортированном буфере и вливаются в основной
+    список, когда буфер дорастает до max(merge_size, n / merge_ratio):
+    вставка стоит O(буфер), слияние O(n) - раз на много вставок.
+    Запросы смотрят оба списка.
+    """
+
+    def __init__(self, merge_size: int = 1024, merge_ratio: int = 128):
+        self.merge_size = merge_size
+        self.merge_ratio = merge_ratio
+        self._main: List[str] = []
+        self._buffer: List[str] = []
+
+    def reset(self, values: Iterable[str]):
+        self._main = sorted(values)
+        self._buffer = []
+
+    def add(self, value: str):
+        insort(self._buffer, value)
+        if len(self._buffer) >= max(self.merge_size, len(self._main) // self.merge_ratio):
+            self._merge()
+
+    def _merge(self):
+        """Слияние буфера: позиции ищутся bisect, основной список копируется срезами"""
+        merged: List[str] = []
+        start = 0
+        for value in self._buffer:
+            position = bisect_left(self._main, value, start)
+            merged.extend(self._main[start:position])
+            merged.append(value)
+            start = position
+        merged.extend(self._main[start:])
+        self._main = merged
+        self._buffer = []
+
+    def after(self, key: str, limit: int) -> List[str]:
+        """До limit строк, не меньших key, по возрастанию"""
+        main = bisect_left(self._main, key)
+        if not self._buffer:
+            return self._main[main:main + limit]
+        buffer = bisect_left(self._buffer, key)
+        return list(heapq.merge(
+            self._main[main:main + limit], self._buffer[buffer:buffer + limit]
+        ))[:limit]
+
+    def before(self, key: str, limit: int) -> List[str]:
+        """До limit строк, меньших key, по возрастанию"""
+        main = bisect_left(self._main, key)
+        buffer = bisect_left(self._buffer, key)
+        found = list(heapq.merge(
+            self._main[max(0, main - limit):main], self._buffer[max(0, buffer - limit):buffer]
+        ))
+        return found[-limit:] if limit else []
+
+
+class PartIndex:
+    """
+    Индекс известных каталожных номеров в памяти.
+
+    - множество номеров - точная проверка за O(1);
+    - отсортированный список - запросы по префиксу через bisect;
+    - отсортированный список перевернутых номеров - поиск по общему окончанию.
+    Списки - SortedStrings: номера из результатов поиска добавляются пачками.
+
+    Исправление опечаток: сначала все варианты на расстоянии 1 (удаление,
+    вставка, замена, перестановка) проверяются по множеству; если ничего
+    не нашлось - ближайшие соседи по общему началу и по общему окончанию
+    ранжируются по расстоянию редактирования.
+    """
+
+    def __init__(self, max_distance: int = 2, window: int = 8):
+        self.max_distance = max_distance
+        self.window = window
+
+        self._known: Set[str] = set()
+        self._sorted = SortedStrings()
+        self._reversed = SortedStrings()
+
+    def __len__(self) -> int:
+        return len(self._known)
+
+    def __contains__(self, part_number: str) -> bool:
+        return part_number in self._known
+
+    def add(self, part_number: str) -> bool:
+        """Добавление одного номера; False - он уже был в индексе"""
+        if not part_number or part_number in self._known:
+            return False
+        self._known.add(part_number)
+        self._sorted.add(part_number)
+        self._reversed.add(part_number[::-1])
+        return True
+
+    def add_many(self, part_numbers: Iterable[str]) -> int:
+        """Массовая загрузка: одна сортировка вместо вставки по одному"""
+        new = {pn for pn in part_numbers if pn} - self._known
+        if not new:
+            return 0
+        self._known |= new
+        self._sorted.reset(self._known)
+        self._reversed.reset(pn[::-1] for pn in self._known)
+        logger.info(f"Part index: {len(self._known)} part numbers")
+        return len(new)
+
+    def prefix(self, prefix: str, limit: int = 10) -> List[str]:
+        """Номера, начинающиеся с prefix, по алфавиту"""
+        found = []
+        for part_number in self._sorted.after(prefix, limit):
+            if not part_number.startswith(prefix):
+                break
+            found.append(part_number)
+        return found
+
+    def _known_edits1(self, query: str) -> Set[str]:
+        """Известные номера на расстоянии 1: удаление, перестановка, замена, вставка"""
+        known = self._known
+        found = set()
+        for i in range(len(query) + 1):
+            left, right = query[:i], query[i:]
+            if right:
+                tail = right[1:]
+                candidate = left + tail
+                if candidate in known:
+                    found.add(candidate)
+                if tail:
+                    candidate = left + tail[0] + right[0] + tail[1:]
+                    if candidate in known:
+                        found.add(candidate)
+                for c in PART_NUMBER_ALPHABET:
+                    candidate = left + c + tail
+                    if candidate in known:
+                        found.add(candidate)
+            for c in PART_NUMBER_ALPHABET:
+                candidate = left + c + right
+                if candidate in known:
+                    found.add(candidate)
+        found.discard(query)
+        return found
+
+    @staticmethod
+    def _neighbors(values: SortedStrings, key: str, window: int) -> List[str]:
+        return values.before(key, window) + values.after(key, window)
+
+    def suggest(self, query: str, limit: int = 3) -> List[str]:
+        """Похожие известные номера, ближайшие первыми; пусто, если query известен"""
+        if not query or query in self._known:
+            return []
+
+        candidates = self._known_edits1(query)
+        if candidates:
+            return sorted(candidates)[:limit]
+
+        candidates = set(self._neighbors(self._sorted, query, self.window))
+        candidates.update(
+            pn[::-1] for pn in self._neighbors(self._reversed, query[::-1], self.window)
+        )
+
+        ranked = []
+        for candidate in candidates:
+            distance = edit_distance(query, candidate, self.max_distance)
+            if distance <= self.max_distance:
+                ranked.append((distance, candidate))
+        ranked.sort()
+        return [candidate for _, candidate in ranked[:limit]]
+
+
+part_index = PartIndex(
+    max_distance=Config.PART_SUGGEST_MAX_DISTANCE,
+    window=Config.PART_SUGGEST_WINDOW
+)
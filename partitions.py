@@ -0,0 +1,121 @@
+"""
+Помесячное секционирование таблиц с историей.
+
+Секции задаются по UNIX_TIMESTAMP(<колонка времени>): секция pYYYYMM
+содержит строки до начала следующего месяца, pmax - все остальное.
+"""
+import logging
+from datetime import date
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Таблица -> колонка времени, по которой она секционирована
+PARTITIONED_TABLES = {
+    'price_history': 'found_at',
+    'search_requests': 'created_at',
+    'analysis_results': 'created_at',
+    'request_timings': 'created_at',
+}
+
+MAX_PARTITION = 'pmax'
+
+
+def month_start(day: date) -> date:
+    return date(day.year, day.month, 1)
+
+
+def add_months(month: date, count: int) -> date:
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"p{month.year:04d}{month.month:02d}"
+
+
+def partition_definition(month: date) -> str:
+    """Секция для месяца month: строки строго до начала следующего месяца"""
+    upper = add_months(month, 1).isoformat()
+    return f"PARTITION {partition_name(month)} VALUES LESS THAN (UNIX_TIMESTAMP('{upper} 00:00:00'))"
+
+
+def is_partitioned(cursor, table: str) -> bool:
+    cursor.execute(
+        """
+        SELECT COUNT(*) FROM information_schema.partitions
+        WHERE table_schema = DATABASE() AND table_name = %s
+            AND partition_name IS NOT NULL
+        """,
+        (table,)
+    )
+    return cursor.fetchone()[0] > 0
+
+
+def list_partitions(cursor, table: str) -> List[Tuple[str, Optional[int]]]:
+    """Секции таблицы по порядку: (имя, верхняя граница в UNIX_TIMESTAMP); у pmax - None"""
+    cursor.execute(
+        """
+        SELECT partition_name, partition_description
+        FROM information_schema.partitions
+        WHERE table_schema = DATABASE() AND table_name = %s
+            AND partition_name IS NOT NULL
+        ORDER BY partition_ordinal_position
+        """,
+        (table,)
+    )
+    partitions = []
+    for name, description in cursor.fetchall():
+        upper = None if description in (None, 'MAXVALUE') else int(description)
+        partitions.append((name, upper))
+    return partitions
+
+
+def partition_table(cursor, table: str, first_month: date, last_month: date):
+    """Секционирование таблицы помесячно с first_month по last_month плюс pmax"""
+    column = PARTITIONED_TABLES[table]
+    definitions = []
+    month = first_month
+    while month <= last_month:
+        definitions.append(partition_definition(month))
+        month = add_months(month, 1)
+    definitions.append(f"PARTITION {MAX_PARTITION} VALUES LESS THAN MAXVALUE")
+
+    cursor.execute(
+        f"ALTER TABLE {table} PARTITION BY RANGE (UNIX_TIMESTAMP({column})) "
+        f"({', '.join(definitions)})"
+    )
+
+
+def add_future_partitions(cursor, table: str, last_month: date) -> List[str]:
+    """
+    Нарезка секций до last_month включительно из pmax.
+
+    Пока секции создаются заранее, pmax остается пустой и REORGANIZE
+    не переносит строки. Возвращает имена созданных секций.
+    """
+    names = [name for name, _ in list_partitions(cursor, table)]
+    if MAX_PARTITION not in names:
+        return []
+
+    # Продолжаем сразу после последней месячной секции
+    monthly = sorted(name for name in names if name != MAX_PARTITION)
+    if monthly:
+        month = add_months(date(int(monthly[-1][1:5]), int(monthly[-1][5:7]), 1), 1)
+    else:
+        month = month_start(date.today())
+
+    created = []
+    definitions = []
+    while month <= last_month:
+        definitions.append(partition_definition(month))
+        created.append(partition_name(month))
+        month = add_months(month, 1)
+
+    if definitions:
+        definitions.append(f"PARTITION {MAX_PARTITION} VALUES LESS THAN MAXVALUE")
+        cursor.execute(
+            f"ALTER TABLE {table} REORGANIZE PARTITION {MAX_PARTITION} INTO ({', '.join(definitions)})"
+        )
+        logger.info(f"Added partitions to {table}: {', '.join(created)}")
+    return created
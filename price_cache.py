@@ -0,0 +1,141 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+CacheKey = Tuple[str, str]
+
+# Результат объединенного запроса, завершившегося ошибкой: в кэш не попадает
+LOOKUP_FAILED = object()
+
+
+class PriceCache:
+    """
+    Кэш ответов поставщиков по ключу (part_number, supplier).
+
+    TTL + вытеснение давно не использованных записей (LRU).
+    Одинаковые одновременные запросы объединяются: первый запрос
+    «захватывает» ключ, остальные ждут его результат.
+
+    Просроченные записи еще stale_ttl секунд доступны через get_stale -
+    на случай, когда поставщик недоступен.
+    """
+
+    def __init__(self, ttl: float, max_entries: int, stale_ttl: float = 0):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.stale_ttl = stale_ttl
+
+        self._entries: "OrderedDict[CacheKey, Tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[CacheKey, asyncio.Future] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def get(self, part_number: str, supplier: str) -> Optional[Any]:
+        """Свежее значение из кэша или None"""
+        key = (part_number, supplier)
+        entry = self._entries.get(key)
+
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, value = entry
+        now = time.monotonic()
+        if expires_at < now:
+            if expires_at + self.stale_ttl < now:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def peek(self, part_number: str, supplier: str) -> Optional[Any]:
+        """Свежее значение без учета в статистике и без продления в LRU"""
+        entry = self._entries.get((part_number, supplier))
+        if entry is None or entry[0] < time.monotonic():
+            return None
+        return entry[1]
+
+    def get_stale(self, part_number: str, supplier: str) -> Optional[Any]:
+        """Значение, просроченное не более чем на stale_ttl (или еще свежее)"""
+        entry = self._entries.get((part_number, supplier))
+        if entry is None or entry[0] + self.stale_ttl < time.monotonic():
+            return None
+        return entry[1]
+
+    def put(self, part_number: str, supplier: str, value: Any):
+        key = (part_number, supplier)
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def inflight(self, part_number: str, supplier: str) -> Optional[asyncio.Future]:
+        """Future уже выполняющегося запроса к поставщику, если он есть"""
+        future = self._inflight.get((part_number, supplier))
+        if future is not None:
+            self.coalesced += 1
+        return future
+
+    def claim(self, part_number: str, supplier: str) -> asyncio.Future:
+        """Регистрация запроса, результат которого получат и другие ожидающие"""
+        key = (part_number, supplier)
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self._inflight[key] = future
+        return future
+
+    def resolve(self, part_number: str, supplier: str, value: Optional[Any]):
+        """Завершение запроса: сохранение в кэш и пробуждение ожидающих"""
+        if value is not None and value is not LOOKUP_FAILED:
+            self.put(part_number, supplier, value)
+
+        future = self._inflight.pop((part_number, supplier), None)
+        if future is not None and not future.done():
+            future.set_result(value)
+
+    def release(self, part_number: str, supplier: str, future: asyncio.Future):
+        """Снятие захвата, если запрос так и не был выполнен (например, отменен):
+        ожидающие получают LOOKUP_FAILED, а не «у поставщика нет данных»"""
+        key = (part_number, supplier)
+        if self._inflight.get(key) is future:
+            self.resolve(part_number, supplier, LOOKUP_FAILED)
+
+    def invalidate(self, part_number: str, supplier: Optional[str] = None):
+        if supplier is not None:
+            self._entries.pop((part_number, supplier), None)
+            return
+        for key in [k for k in self._entries if k[0] == part_number]:
+            del self._entries[key]
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+
+price_cache = PriceCache(
+    ttl=Config.PRICE_CACHE_TTL,
+    max_entries=Config.PRICE_CACHE_MAX_ENTRIES,
+    stale_ttl=Config.PRICE_CACHE_STALE_TTL
+)
@@ -0,0 +1,132 @@
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from models import Part, Quote
+
+
+class PriceStatsEngine:
+    """
+    Пакетная статистика цен по всем запчастям запроса.
+
+    Предложения всех поставщиков раскладываются в столбцы NumPy (цена, срок,
+    поставщик, номер запчасти) и обрабатываются одним проходом:
+    минимум, медиана, процентили и оценка соотношения цена/срок.
+    """
+
+    def __init__(self, price_weight: float = 0.7, percentiles=(25, 75)):
+        self.price_weight = price_weight
+        self.percentiles = tuple(percentiles)
+
+    def _columns(self, parts: List[Part]):
+        """Плоский список предложений (подряд по запчастям) и их столбцы"""
+        quotes: List[Quote] = []
+        part_ids = []
+        supplier_ids: Dict[str, int] = {}
+        suppliers = []
+
+        for part_id, part in enumerate(parts):
+            for supplier, prices in part.prices.items():
+                supplier_id = supplier_ids.setdefault(supplier, len(supplier_ids))
+                quotes.extend(prices)
+                part_ids.extend([part_id] * len(prices))
+                suppliers.extend([supplier_id] * len(prices))
+
+        columns = {
+            "part": np.asarray(part_ids, dtype=np.int64),
+            "price": np.asarray([q.price for q in quotes], dtype=np.float64),
+            "delivery": np.asarray([q.delivery for q in quotes], dtype=np.float64),
+            "supplier": np.asarray(suppliers, dtype=np.int64),
+        }
+        return quotes, columns, len(supplier_ids)
+
+    @staticmethod
+    def _normalized(values: np.ndarray, starts: np.ndarray, counts: np.ndarray) -> np.ndarray:
+        """Значения внутри каждой группы, приведенные к [0, 1]; при равных значениях - 0"""
+        low = np.repeat(np.minimum.reduceat(values, starts), counts)
+        span = np.repeat(np.maximum.reduceat(values, starts), counts) - low
+        return np.divide(values - low, span, out=np.zeros_like(values), where=span > 0)
+
+    def analyze(self, parts: List[Part]) -> List[Optional[Dict[str, Any]]]:
+        """
+        Статистика по каждой запчасти, в порядке parts; None - нет предложений.
+
+        min_price и median_price - предложения (медианой, как и раньше, считается
+        элемент len // 2 отсортированного списка), stats["median"] - настоящая
+        медиана, best_value - лучшее соотношение цена/срок, scores - оценки
+        предложений all_prices.
+        """
+        quotes, columns, supplier_count = self._columns(parts)
+        results: List[Optional[Dict[str, Any]]] = [None] * len(parts)
+        if not quotes:
+            return results
+
+        # Предложения сгруппированы по запчасти и отсортированы по цене (устойчиво)
+        order = np.lexsort((columns["price"], columns["part"]))
+        part = columns["part"][order]
+        price = columns["price"][order]
+        delivery = columns["delivery"][order]
+
+        present, starts, counts = np.unique(part, return_index=True, return_counts=True)
+
+        min_idx = order[starts]
+        median_idx = order[starts + counts // 2]
+        median = (price[starts + (counts - 1) // 2] + price[starts + counts // 2]) / 2
+        maximum = price[starts + counts - 1]
+
+        # Число разных поставщиков с предложениями по каждой запчасти
+        pairs = np.unique(columns["part"] * supplier_count + columns["supplier"])
+        supplier_counts = np.bincount(pairs // supplier_count, minlength=len(parts))
+
+        percentile_values = {}
+        for q in self.percentiles:
+            position = (counts - 1) * (q / 100.0)
+            lower = np.floor(position).astype(np.int64)
+            upper = np.ceil(position).astype(np.int64)
+            low_value = price[starts + lower]
+            percentile_values[f"p{q}"] = (
+                low_value + (price[starts + upper] - low_value) * (position - lower)
+            ).tolist()
+
+        # Чем меньше score, тем лучше: взвешенная сумма нормированных цены и срока
+        score = (
+            self.price_weight * self._normalized(price, starts, counts)
+            + (1 - self.price_weight) * self._normalized(delivery, starts, counts)
+        )
+        by_score = np.lexsort((score, part))
+        best_idx = order[by_score[starts]]
+
+        scores = np.empty_like(score)
+        scores[order] = np.round(score, 3)
+        scores = scores.tolist()
+
+        min_idx, median_idx, best_idx = min_idx.tolist(), median_idx.tolist(), best_idx.tolist()
+        median, maximum = median.tolist(), maximum.tolist()
+        # Предложения одной запчасти идут в quotes подряд, в исходном порядке
+        first = np.searchsorted(columns["part"], present)
+        first, last = first.tolist(), (first + counts).tolist()
+
+        for g, part_id in enumerate(present.tolist()):
+            part = parts[part_id]
+            stats = {
+                "count": int(counts[g]),
+                "suppliers": int(supplier_counts[part_id]),
+                "min": quotes[min_idx[g]].price,
+                "median": median[g],
+                "max": maximum[g],
+            }
+            stats.update({name: values[g] for name, values in percentile_values.items()})
+
+            results[part_id] = {
+                "part_number": part.part_number,
+                "name": part.name,
+                "min_price": quotes[min_idx[g]],
+                "median_price": quotes[median_idx[g]],
+                "best_value": quotes[best_idx[g]],
+                "stats": stats,
+                "all_prices": quotes[first[g]:last[g]],
+                "scores": scores[first[g]:last[g]],
+                "brands": part.brands
+            }
+
+        return results
@@ -0,0 +1,89 @@
+"""
+Прогресс обработки запроса в статус-сообщении Telegram.
+
+Счетчики стадий обновляются сколько угодно часто, а сообщение
+редактируется не чаще раза в min_interval секунд: Telegram ограничивает
+частоту правок. Последнее состояние не теряется - если правка сейчас
+преждевременна, она откладывается до конца интервала.
+"""
+import asyncio
+import logging
+import time
+from typing import List, Optional
+
+from telegram.error import RetryAfter
+
+logger = logging.getLogger(__name__)
+
+
+class ProgressReporter:
+    def __init__(self, message, total: int, suppliers: List[str], min_interval: float):
+        self.message = message
+        self.total = total
+        self.suppliers = suppliers
+        self.min_interval = min_interval
+
+        self.searched = 0
+        self.analyzed = 0
+        self.ai_done = 0
+        self.stage = "Поиск у поставщиков"
+
+        self._last_text: Optional[str] = None
+        self._last_edit = time.monotonic()
+        self._flush_task: Optional[asyncio.Task] = None
+        self._closed = False
+
+    def render(self) -> str:
+        lines = [
+            f"🔍 *{self.stage}...*",
+            f"• Поставщики: {', '.join(self.suppliers)}",
+            f"• Найдено: {self.searched} из {self.total}",
+            f"• Проанализировано: {self.analyzed}",
+        ]
+        if self.ai_done:
+            lines.append(f"• AI-рекомендации: {self.ai_done}")
+        return "\n".join(lines)
+
+    def update(self, stage: Optional[str] = None):
+        """Отметить изменение; правка сообщения - сразу или по окончании интервала"""
+        if stage is not None:
+            self.stage = stage
+        if self._closed or self._flush_task is not None:
+            return
+
+        delay = self._last_edit + self.min_interval - time.monotonic()
+        self._flush_task = asyncio.create_task(self._flush(max(0.0, delay)))
+
+    async def _flush(self, delay: float):
+        if delay:
+            await asyncio.sleep(delay)
+        await self._edit()
+        self._flush_task = None
+
+        # Изменения, пришедшие во время правки, уходят следующей правкой
+        if not self._closed and self.render() != self._last_text:
+            self.update()
+
+    async def _edit(self):
+        text = self.render()
+        if text == self._last_text:
+            return
+        try:
+            await self.message.edit_text(text, parse_mode='Markdown')
+            self._last_text = text
+        except RetryAfter as e:
+            # Превышен лимит правок: следующая правка - не раньше, чем разрешит Telegram
+            retry_after = getattr(e.retry_after, 'total_seconds', lambda: e.retry_after)()
+            self._last_edit = time.monotonic() + retry_after
+            return
+        except Exception as e:
+            logger.debug(f"Progress edit skipped: {e}")
+        self._last_edit = time.monotonic()
+
+    async def close(self):
+        """Остановить правки (перед удалением или заменой статус-сообщения)"""
+        self._closed = True
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            await asyncio.gather(self._flush_task, return_exceptions=True)
+            self._flush_task = None
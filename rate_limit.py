@@ -0,0 +1,48 @@
+import asyncio
+import time
+
+
+class RateLimiter:
+    """Ограничитель частоты по алгоритму token bucket"""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, tokens: float = 1) -> bool:
+        """Забрать токены без ожидания; False, если их недостаточно"""
+        if self.rate <= 0:
+            return True
+        self._refill()
+        if self._tokens >= tokens:
+            self._tokens -= tokens
+            return True
+        return False
+
+    def is_full(self) -> bool:
+        """Запас полон: ограничитель не отличается от нового"""
+        if self.rate <= 0:
+            return True
+        self._refill()
+        return self._tokens >= self.burst
+
+    def retry_after(self, tokens: float = 1) -> float:
+        """Через сколько секунд будет доступно tokens токенов"""
+        if self.rate <= 0:
+            return 0.0
+        self._refill()
+        return max(0.0, (tokens - self._tokens) / self.rate)
+
+    async def acquire(self, tokens: float = 1):
+        """Дождаться и забрать токены; ожидающие обслуживаются по очереди"""
+        async with self._lock:
+            while not self.try_acquire(tokens):
+                await asyncio.sleep(self.retry_after(tokens))
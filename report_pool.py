@@ -0,0 +1,99 @@
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+import report_worker
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class ReportQueueFull(Exception):
+    """Слишком много отчетов ожидает генерации"""
+
+
+class ReportRenderPool:
+    """
+    Генерация Excel-отчетов в пуле процессов.
+
+    CPU-нагрузка openpyxl уходит с event loop бота и распределяется по ядрам.
+    max_pending ограничивает число отчетов в работе и в очереди, timeout -
+    время ожидания одного отчета. Отчет, не дождавшийся результата, занимает
+    место до фактического окончания генерации. При max_workers=0 отчет
+    строится в потоке.
+    """
+
+    def __init__(self, max_workers: int, max_pending: int, timeout: float):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+
+        self._executor: Optional[Executor] = None
+        self._pending = 0
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.max_workers <= 0:
+                self._executor = ThreadPoolExecutor(thread_name_prefix='report')
+            else:
+                # spawn: дочерние процессы не наследуют потоки и соединения родителя
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+        return self._executor
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def _release(self, loop: asyncio.AbstractEventLoop):
+        """Освобождение места по окончании генерации (колбэк из потока пула)"""
+        def release():
+            self._pending -= 1
+
+        try:
+            loop.call_soon_threadsafe(release)
+        except RuntimeError:
+            # Event loop уже закрыт: счетчик больше никто не читает
+            pass
+
+    async def render(self, analysis_results: List[Dict[str, Any]],
+                     user_info: Optional[Dict[str, Any]] = None,
+                     streaming: Optional[bool] = None) -> bytes:
+        if self._pending >= self.max_pending:
+            raise ReportQueueFull(f"{self._pending} reports pending")
+
+        loop = asyncio.get_running_loop()
+        future = self._get_executor().submit(
+            report_worker.render_report, analysis_results, user_info, streaming
+        )
+        self._pending += 1
+        future.add_done_callback(lambda _: self._release(loop))
+
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            # Отчет из очереди отменяется, начатый дорабатывает и держит место
+            if not future.cancel():
+                logger.warning(f"Report render exceeded {self.timeout:.0f}s, still running in worker")
+            raise
+
+    async def warm_up(self):
+        """Запуск процессов заранее, чтобы первый отчет не ждал их старта"""
+        if self.max_workers > 0:
+            await self.render([], None)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+report_pool = ReportRenderPool(
+    max_workers=Config.REPORT_WORKERS,
+    max_pending=Config.REPORT_MAX_PENDING,
+    timeout=Config.REPORT_TIMEOUT
+)
@@ -0,0 +1,13 @@
+"""
+Модуль процессов генерации Excel-отчетов.
+
+Задачи пула ссылаются на функцию этого модуля: процесс, получив задачу,
+импортирует только его и excel_generator, без database (подключение к MySQL)
+и ai_analyzer (клиент Mistral).
+"""
+from excel_generator import report_generator
+
+
+def render_report(analysis_results, user_info, streaming):
+    """Данные анализа на входе, байты xlsx на выходе"""
+    return report_generator.render_report(analysis_results, user_info, streaming=streaming)
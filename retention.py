@@ -0,0 +1,198 @@
+import asyncio
+import csv
+import gzip
+import logging
+import os
+import time
+from datetime import date
+from typing import Any, Dict, Optional
+
+from mysql.connector import Error
+
+from config import Config
+from database import async_db, db_manager
+from partitions import (
+    MAX_PARTITION, PARTITIONED_TABLES, add_months, add_future_partitions,
+    is_partitioned, list_partitions, month_start
+)
+
+logger = logging.getLogger(__name__)
+
+# Дни, которых еще нет в price_daily_stats, досчитываются из сырых цен.
+# Уже существующие строки не трогаем: они собраны из всех полученных цен,
+# а в price_history хранятся только изменения.
+COMPACT_DAILY_STATS_QUERY = """
+INSERT IGNORE INTO price_daily_stats
+(part_number, supplier_code, brand, stat_date, min_price, max_price,
+ price_sum, quote_count, last_delivery_days, last_seen_at)
+SELECT
+    part_number, supplier_code, COALESCE(brand, ''), DATE(found_at),
+    MIN(price), MAX(price), SUM(price), COUNT(*),
+    CAST(SUBSTRING_INDEX(
+        GROUP_CONCAT(delivery_days ORDER BY found_at DESC), ',', 1
+    ) AS SIGNED),
+    MAX(found_at)
+FROM price_history {source}
+GROUP BY part_number, supplier_code, COALESCE(brand, ''), DATE(found_at)
+"""
+
+EXPORT_FETCH_SIZE = 1000
+
+
+class RetentionManager:
+    """
+    Политика хранения таблиц истории.
+
+    Секции старше окна хранения сворачиваются в дневную статистику
+    (для price_history), выгружаются в gzip-CSV и удаляются целиком.
+    Для несекционированных таблиц - выгрузка и удаление порциями.
+    """
+
+    def __init__(self, db, async_db, retention_days: Dict[str, int], archive_dir: str,
+                 export: bool, months_ahead: int, delete_batch: int):
+        self.db = db
+        self.async_db = async_db
+        self.retention_days = retention_days
+        self.archive_dir = archive_dir
+        self.export = export
+        self.months_ahead = months_ahead
+        self.delete_batch = delete_batch
+
+    def _archive_path(self, table: str, suffix: str) -> str:
+        directory = os.path.join(self.archive_dir, table)
+        os.makedirs(directory, exist_ok=True)
+        return os.path.join(directory, f"{table}_{suffix}.csv.gz")
+
+    def _export(self, cursor, query: str, params, path: str) -> int:
+        """Потоковая выгрузка результата запроса в gzip-CSV; файл появляется только целиком"""
+        cursor.execute(query, params)
+        columns = [column[0] for column in cursor.description]
+        tmp_path = path + ".tmp"
+        exported = 0
+
+        with gzip.open(tmp_path, 'wt', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(columns)
+            while True:
+                rows = cursor.fetchmany(EXPORT_FETCH_SIZE)
+                if not rows:
+                    break
+                writer.writerows(
+                    [v.decode('utf-8') if isinstance(v, (bytes, bytearray)) else v for v in row]
+                    for row in rows
+                )
+                exported += len(rows)
+
+        os.replace(tmp_path, path)
+        return exported
+
+    def _expire_partitions(self, conn, cursor, table: str, days: int) -> Dict[str, Any]:
+        add_future_partitions(
+            cursor, table, add_months(month_start(date.today()), self.months_ahead)
+        )
+
+        cursor.execute("SELECT UNIX_TIMESTAMP(NOW() - INTERVAL %s DAY)", (days,))
+        cutoff = cursor.fetchone()[0]
+
+        dropped = []
+        exported = 0
+        for name, upper in list_partitions(cursor, table):
+            if name == MAX_PARTITION or upper is None or upper > cutoff:
+                continue
+
+            source = f"PARTITION ({name})"
+            if table == 'price_history':
+                cursor.execute(COMPACT_DAILY_STATS_QUERY.format(source=source), ())
+                conn.commit()
+            if self.export:
+                exported += self._export(
+                    cursor, f"SELECT * FROM {table} {source}", (),
+                    self._archive_path(table, name)
+                )
+            cursor.execute(f"ALTER TABLE {table} DROP PARTITION {name}")
+            dropped.append(name)
+
+        return {"partitions": dropped, "rows": exported}
+
+    def _expire_rows(self, conn, cursor, table: str, days: int) -> Dict[str, Any]:
+        """Запасной путь для таблиц без секций: выгрузка и DELETE порциями"""
+        column = PARTITIONED_TABLES[table]
+        cursor.execute("SELECT NOW() - INTERVAL %s DAY", (days,))
+        cutoff = cursor.fetchone()[0]
+        where = f"WHERE {column} < %s"
+
+        cursor.execute(f"SELECT 1 FROM {table} {where} LIMIT 1", (cutoff,))
+        if not cursor.fetchall():
+            return {"partitions": [], "rows": 0}
+
+        if table == 'price_history':
+            cursor.execute(COMPACT_DAILY_STATS_QUERY.format(source=where), (cutoff,))
+            conn.commit()
+        if self.export:
+            self._export(
+                cursor, f"SELECT * FROM {table} {where}", (cutoff,),
+                self._archive_path(table, cutoff.strftime('%Y%m%d%H%M%S'))
+            )
+
+        deleted = 0
+        while True:
+            cursor.execute(f"DELETE FROM {table} {where} LIMIT %s", (cutoff, self.delete_batch))
+            conn.commit()
+            deleted += cursor.rowcount
+            if cursor.rowcount < self.delete_batch:
+                break
+
+        return {"partitions": [], "rows": deleted}
+
+    def run(self, tables: Optional[Dict[str, int]] = None) -> Dict[str, Dict[str, Any]]:
+        """Применение политики хранения ко всем таблицам истории"""
+        report = {}
+        for table, days in (tables or self.retention_days).items():
+            started = time.perf_counter()
+            conn = None
+            try:
+                conn = self.db.get_connection()
+                cursor = conn.cursor()
+                if is_partitioned(cursor, table):
+                    report[table] = self._expire_partitions(conn, cursor, table, days)
+                else:
+                    report[table] = self._expire_rows(conn, cursor, table, days)
+                cursor.close()
+            except (Error, OSError) as e:
+                logger.error(f"Retention failed for {table}: {e}")
+                report[table] = {"error": str(e)}
+                continue
+            finally:
+                if conn:
+                    conn.close()
+
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            logger.info(f"Retention for {table} ({days} days): {report[table]}, {elapsed_ms:.0f} ms")
+
+        return report
+
+    async def run_loop(self, interval: float):
+        """
+        Фоновое периодическое применение политики хранения.
+
+        Работа идет в пуле потоков БД (по таблице за вызов): соединение берется
+        в пределах его размера, и записи write-behind не получают исчерпанный пул.
+        """
+        while True:
+            for table, days in self.retention_days.items():
+                try:
+                    await self.async_db.run(self.run, {table: days})
+                except Exception as e:
+                    logger.error(f"Retention job failed for {table}: {e}")
+            await asyncio.sleep(interval)
+
+
+retention_manager = RetentionManager(
+    db_manager,
+    async_db,
+    retention_days=Config.RETENTION_DAYS,
+    archive_dir=Config.RETENTION_ARCHIVE_DIR,
+    export=Config.RETENTION_EXPORT,
+    months_ahead=Config.PARTITION_MONTHS_AHEAD,
+    delete_batch=Config.RETENTION_DELETE_BATCH
+)
@@ -0,0 +1,244 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from itertools import count
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+from config import Config
+from rate_limit import RateLimiter
+
+logger = logging.getLogger(__name__)
+
+# Как часто удалять ограничители частоты неактивных пользователей, секунды
+LIMITER_PRUNE_INTERVAL = 60
+
+
+class SchedulerFull(Exception):
+    """Общая очередь заявок (или очередь пользователя) заполнена"""
+
+
+class UserRateLimited(Exception):
+    """Пользователь превысил лимит частоты; retry_after - через сколько секунд повторить"""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"retry after {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class Job:
+    __slots__ = ('id', 'user_id', 'cost', 'factory', 'task')
+
+    def __init__(self, job_id: int, user_id: int, cost: int,
+                 factory: Callable[[], Awaitable[Any]]):
+        self.id = job_id
+        self.user_id = user_id
+        self.cost = cost
+        self.factory = factory
+        self.task: Optional[asyncio.Task] = None
+
+
+class FairScheduler:
+    """
+    Допуск заявок к обработке со справедливой очередью.
+
+    - max_running заявок выполняются одновременно, еще max_queued ждут;
+    - у пользователя не больше user_concurrency заявок в работе
+      и user_max_queued в очереди;
+    - частота ограничивается token bucket по числу запчастей (user_rate в
+      секунду, запас user_burst);
+    - очередь разбирается по deficit round robin: за круг пользователь
+      получает quantum запчастей кредита, заявка запускается, когда кредит
+      покрывает ее стоимость. Тяжелые заявки одного пользователя не
+      задерживают легкие заявки остальных.
+    """
+
+    def __init__(self, max_running: int, max_queued: int, user_concurrency: int,
+                 user_max_queued: int, quantum: int, user_rate: float, user_burst: int):
+        self.max_running = max(1, max_running)
+        self.max_queued = max_queued
+        self.user_concurrency = max(1, user_concurrency)
+        self.user_max_queued = user_max_queued
+        self.quantum = max(1, quantum)
+        self.user_rate = user_rate
+        self.user_burst = user_burst
+
+        self._queues: Dict[int, Deque[Job]] = {}
+        self._ring: Deque[int] = deque()
+        self._deficit: Dict[int, int] = {}
+        self._running: Dict[int, int] = {}
+        self._tasks = set()
+        self._limiters: Dict[int, RateLimiter] = {}
+        self._limiters_pruned = time.monotonic()
+        self._ids = count(1)
+
+        self.queued = 0
+        self.running = 0
+
+    def _prune_limiters(self):
+        """
+        Удаление ограничителей пользователей без заявок, у которых запас
+        восстановился полностью: новый ограничитель будет таким же.
+        """
+        now = time.monotonic()
+        if now - self._limiters_pruned < LIMITER_PRUNE_INTERVAL:
+            return
+        self._limiters_pruned = now
+        idle = [
+            user_id for user_id, limiter in self._limiters.items()
+            if user_id not in self._queues and user_id not in self._running and limiter.is_full()
+        ]
+        for user_id in idle:
+            del self._limiters[user_id]
+
+    def _limiter(self, user_id: int) -> RateLimiter:
+        self._prune_limiters()
+        limiter = self._limiters.get(user_id)
+        if limiter is None:
+            limiter = RateLimiter(self.user_rate, burst=self.user_burst)
+            self._limiters[user_id] = limiter
+        return limiter
+
+    def submit(self, user_id: int, cost: int, factory: Callable[[], Awaitable[Any]]) -> int:
+        """
+        Постановка заявки; factory() - корутина обработки.
+
+        Возвращает 0, если заявка запущена сразу, иначе позицию в очереди.
+        """
+        cost = max(1, cost)
+        if self.queued >= self.max_queued:
+            raise SchedulerFull("global queue is full")
+        if len(self._queues.get(user_id, ())) >= self.user_max_queued:
+            raise SchedulerFull(f"queue of user {user_id} is full")
+
+        # Стоимость больше запаса не набрать никогда: такая заявка забирает весь запас
+        limiter = self._limiter(user_id)
+        tokens = min(cost, limiter.burst)
+        if not limiter.try_acquire(tokens):
+            raise UserRateLimited(limiter.retry_after(tokens))
+
+        job = Job(next(self._ids), user_id, cost, factory)
+        queue = self._queues.get(user_id)
+        if queue is None:
+            queue = self._queues[user_id] = deque()
+            self._ring.append(user_id)
+            self._deficit[user_id] = 0
+        queue.append(job)
+        self.queued += 1
+
+        self._dispatch()
+        return 0 if job.task is not None else self.position(job.id)
+
+    def _eligible(self, user_id: int) -> bool:
+        return self._running.get(user_id, 0) < self.user_concurrency
+
+    def _next_job(self) -> Optional[Job]:
+        """Следующая заявка по deficit round robin среди пользователей без превышения лимита"""
+        if not any(self._eligible(user_id) for user_id in self._ring):
+            return None
+
+        while True:
+            user_id = self._ring[0]
+            if not self._eligible(user_id):
+                self._ring.rotate(-1)
+                continue
+
+            queue = self._queues[user_id]
+            if self._deficit[user_id] < queue[0].cost:
+                # Кредита не хватает: добавка за круг и ход следующему пользователю
+                self._deficit[user_id] += self.quantum
+                self._ring.rotate(-1)
+                continue
+
+            job = queue.popleft()
+            self._deficit[user_id] -= job.cost
+            if not queue:
+                del self._queues[user_id]
+                del self._deficit[user_id]
+                self._ring.popleft()
+            return job
+
+    def _dispatch(self):
+        while self.running < self.max_running and self._ring:
+            job = self._next_job()
+            if job is None:
+                return
+            self.queued -= 1
+            self.running += 1
+            self._running[job.user_id] = self._running.get(job.user_id, 0) + 1
+            job.task = asyncio.create_task(self._run(job))
+            self._tasks.add(job.task)
+
+    async def _run(self, job: Job):
+        try:
+            await job.factory()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Job {job.id} of user {job.user_id} failed: {e}")
+        finally:
+            self._tasks.discard(job.task)
+            self.running -= 1
+            self._running[job.user_id] -= 1
+            if not self._running[job.user_id]:
+                del self._running[job.user_id]
+            self._dispatch()
+
+    def position(self, job_id: int) -> int:
+        """
+        Место заявки в очереди (1 - следующая): порядок разбора моделируется
+        на копии очередей без учета лимитов параллельности.
+        """
+        queues = {user_id: deque(queue) for user_id, queue in self._queues.items()}
+        deficit = dict(self._deficit)
+        ring = deque(self._ring)
+        position = 0
+
+        while ring:
+            user_id = ring[0]
+            queue = queues[user_id]
+            if deficit[user_id] < queue[0].cost:
+                deficit[user_id] += self.quantum
+                ring.rotate(-1)
+                continue
+
+            job = queue.popleft()
+            deficit[user_id] -= job.cost
+            position += 1
+            if job.id == job_id:
+                return position
+            if not queue:
+                ring.popleft()
+
+        return position
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "queued": self.queued,
+            "users_waiting": len(self._ring),
+            "rate_limiters": len(self._limiters)
+        }
+
+    async def shutdown(self):
+        """Отмена выполняющихся заявок; ожидающие отбрасываются"""
+        self._queues.clear()
+        self._ring.clear()
+        self._deficit.clear()
+        self.queued = 0
+
+        tasks: List[asyncio.Task] = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+scheduler = FairScheduler(
+    max_running=Config.SCHEDULER_MAX_RUNNING,
+    max_queued=Config.SCHEDULER_MAX_QUEUED,
+    user_concurrency=Config.SCHEDULER_USER_CONCURRENCY,
+    user_max_queued=Config.SCHEDULER_USER_MAX_QUEUED,
+    quantum=Config.SCHEDULER_QUANTUM,
+    user_rate=Config.USER_PARTS_PER_MINUTE / 60,
+    user_burst=Config.USER_PARTS_BURST
+)
@@ -0,0 +1,298 @@
+import asyncio
+import logging
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple
+
+from config import Config
+from metrics import metrics
+from price_cache import LOOKUP_FAILED, PriceCache, price_cache
+from supplier_health import SupplierHealth, SupplierHealthRegistry, supplier_health
+from suppliers import SupplierAdapter, SupplierRegistry, SupplierTimeout, supplier_registry
+
+logger = logging.getLogger(__name__)
+
+
+class ConcurrentSearchEngine:
+    def __init__(self, registry: SupplierRegistry, cache: PriceCache, max_concurrency: int,
+                 supplier_concurrency: Dict[str, int], lookup_timeout: float,
+                 health: SupplierHealthRegistry, default_supplier_concurrency: int = 5):
+        self.registry = registry
+        self.cache = cache
+        self.health = health
+        self.max_concurrency = max_concurrency
+        self.supplier_concurrency = dict(supplier_concurrency)
+        self.default_supplier_concurrency = default_supplier_concurrency
+        self.lookup_timeout = lookup_timeout
+
+        self._global_semaphore = asyncio.Semaphore(max_concurrency)
+        self._supplier_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    def _supplier_semaphore(self, supplier: str) -> asyncio.Semaphore:
+        """Семафор, ограничивающий число одновременных запросов к поставщику"""
+        semaphore = self._supplier_semaphores.get(supplier)
+        if semaphore is None:
+            limit = self.supplier_concurrency.get(supplier, self.default_supplier_concurrency)
+            semaphore = asyncio.Semaphore(limit)
+            self._supplier_semaphores[supplier] = semaphore
+        return semaphore
+
+    @staticmethod
+    async def _fetch(adapter: SupplierAdapter, part_numbers: List[str]) -> Dict[str, Any]:
+        if len(part_numbers) == 1 and not adapter.supports_batch:
+            result = await adapter.fetch_quotes(part_numbers[0])
+            return {part_numbers[0]: result} if result is not None else {}
+        return await adapter.fetch_batch(part_numbers)
+
+    async def _attempt(self, adapter: SupplierAdapter, part_numbers: List[str],
+                       health: SupplierHealth) -> Dict[str, Any]:
+        """
+        Одно обращение к поставщику внутри лимитов параллельности.
+        Адаптивный таймаут отсчитывается после ожидания в очереди.
+        """
+        async with self._supplier_semaphore(adapter.code):
+            async with self._global_semaphore:
+                timeout = health.timeout()
+                started = time.monotonic()
+                try:
+                    response = await asyncio.wait_for(self._fetch(adapter, part_numbers), timeout)
+                except asyncio.TimeoutError:
+                    elapsed = time.monotonic() - started
+                    health.record_timeout(elapsed)
+                    metrics.observe('supplier_seconds', elapsed, supplier=adapter.code, outcome='timeout')
+                    # Отдельный тип: в _lookup TimeoutError означает общий таймаут, еще не учтенный
+                    raise SupplierTimeout(f"no response in {elapsed:.2f}s") from None
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    health.record_failure(str(e))
+                    metrics.observe('supplier_seconds', time.monotonic() - started,
+                                    supplier=adapter.code, outcome='error')
+                    raise
+                elapsed = time.monotonic() - started
+                health.record_success(elapsed)
+                metrics.observe('supplier_seconds', elapsed, supplier=adapter.code, outcome='ok')
+                return response
+
+    async def _hedged_fetch(self, adapter: SupplierAdapter, part_numbers: List[str],
+                            health: SupplierHealth) -> Dict[str, Any]:
+        """
+        Запрос с дублированием: если ответа нет дольше hedge_delay, параллельно
+        отправляется такой же второй и берется первый успешный ответ.
+        """
+        attempts = [asyncio.ensure_future(self._attempt(adapter, part_numbers, health))]
+        try:
+            delay = health.hedge_delay()
+            if delay is not None:
+                done, _ = await asyncio.wait(attempts, timeout=delay)
+                if not done:
+                    health.hedges += 1
+                    attempts.append(asyncio.ensure_future(self._attempt(adapter, part_numbers, health)))
+
+            pending = set(attempts)
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for attempt in done:
+                    if attempt.exception() is None:
+                        if attempt is not attempts[0]:
+                            health.hedge_wins += 1
+                        return attempt.result()
+                    error = attempt.exception()
+            raise error
+        finally:
+            for attempt in attempts:
+                attempt.cancel()
+
+    async def _lookup(self, adapter: SupplierAdapter,
+                      part_numbers: List[str]) -> Tuple[Dict[str, Any], bool]:
+        """
+        Один запрос к поставщику; таймаут включает ожидание в очереди.
+        Возвращает (ответ, получен ли он); при разомкнутой цепи поставщик пропускается.
+        """
+        health = self.health.get(adapter.code)
+        response: Dict[str, Any] = {}
+        ok = False
+        try:
+            if health.allow():
+                response = await asyncio.wait_for(
+                    self._hedged_fetch(adapter, part_numbers, health),
+                    timeout=self.lookup_timeout
+                )
+                ok = True
+            else:
+                logger.debug(f"Supplier {adapter.code} skipped: circuit {health.breaker.state}")
+        except SupplierTimeout:
+            logger.warning(f"Supplier {adapter.code} timed out for {', '.join(part_numbers)}")
+        except asyncio.TimeoutError:
+            # Общий таймаут отменил попытки до их собственного: ошибка учитывается здесь,
+            # иначе зависший поставщик не размыкает цепь, а пробный запрос не завершается
+            health.record_timeout(self.lookup_timeout)
+            logger.warning(f"Supplier {adapter.code} timed out for {', '.join(part_numbers)}")
+        except asyncio.CancelledError:
+            health.record_cancelled()
+            raise
+        except Exception as e:
+            logger.error(f"Supplier {adapter.code} failed for {', '.join(part_numbers)}: {e}")
+        finally:
+            # Ожидающие тот же ключ получают результат даже при ошибке или отмене
+            for part_number in part_numbers:
+                self.cache.resolve(
+                    part_number, adapter.code, response.get(part_number) if ok else LOOKUP_FAILED
+                )
+        return response, ok
+
+    async def _await_inflight(self, part_number: str,
+                              future: asyncio.Future) -> Tuple[Dict[str, Any], bool]:
+        """Ожидание чужого запроса к поставщику с тем же ключом"""
+        try:
+            value = await asyncio.wait_for(asyncio.shield(future), timeout=self.lookup_timeout)
+        except asyncio.TimeoutError:
+            return {}, False
+        if value is LOOKUP_FAILED:
+            return {}, False
+        return ({part_number: value} if value is not None else {}), True
+
+    def _plan_lookups(self, part_numbers: List[str], supplier: str):
+        """Разбиение на запросы: по одному на пару или пачками для пакетных API"""
+        adapter = self.registry.get(supplier)
+        if adapter.supports_batch:
+            size = max(1, adapter.batch_size)
+            for start in range(0, len(part_numbers), size):
+                yield adapter, part_numbers[start:start + size]
+        else:
+            for part_number in part_numbers:
+                yield adapter, [part_number]
+
+    async def search_iter(self, part_numbers: List[str], suppliers: List[str],
+                          force_refresh: bool = False
+                          ) -> AsyncIterator[Tuple[str, Dict[str, Any], Set[str], Dict[str, str]]]:
+        """
+        Параллельный поиск по всем парам (запчасть, поставщик) с выдачей по готовности.
+
+        Для каждой уникальной запчасти выдается (номер, {поставщик: {"part": ..., "quotes": [...]}},
+        поставщики, чьи данные получены этим запросом, а не из кэша, {поставщик: статус}) -
+        как только ответили или не ответили все ее поставщики. Запчасти, целиком
+        найденные в кэше, выдаются сразу. Порядок поставщиков внутри запчасти - как в запросе.
+
+        Статус есть только у поставщиков, от которых ответа не получено (ошибка,
+        таймаут, разомкнутая цепь): 'stale' - взяты просроченные цены из кэша,
+        'missing' - данных нет.
+
+        force_refresh игнорирует кэш, но присоединяется к уже идущим запросам.
+        """
+        unique_parts = list(dict.fromkeys(part_numbers))
+        found: Dict[str, Dict[str, Any]] = {pn: {} for pn in unique_parts}
+        fresh: Dict[str, Set[str]] = {pn: set() for pn in unique_parts}
+        remaining: Dict[str, int] = {pn: 0 for pn in unique_parts}
+        status: Dict[str, Dict[str, str]] = {pn: {} for pn in unique_parts}
+
+        lookups = []
+        waiting = []
+        claimed = []
+
+        for supplier in suppliers:
+            to_fetch = []
+            for part_number in unique_parts:
+                if not force_refresh:
+                    cached = self.cache.get(part_number, supplier)
+                    if cached is not None:
+                        found[part_number][supplier] = cached
+                        continue
+
+                remaining[part_number] += 1
+                future = self.cache.inflight(part_number, supplier)
+                if future is not None:
+                    waiting.append((part_number, supplier, future))
+                    continue
+
+                claimed.append((part_number, supplier, self.cache.claim(part_number, supplier)))
+                to_fetch.append(part_number)
+
+            lookups.extend(self._plan_lookups(to_fetch, supplier))
+
+        def ready(part_number):
+            answers = found[part_number]
+            return (
+                part_number,
+                {s: answers[s] for s in suppliers if s in answers},
+                set(fresh[part_number]),
+                dict(status[part_number])
+            )
+
+        tasks: Dict[asyncio.Task, Tuple[str, List[str], bool]] = {}
+        try:
+            for adapter, chunk in lookups:
+                tasks[asyncio.create_task(self._lookup(adapter, chunk))] = (adapter.code, chunk, True)
+            for part_number, supplier, future in waiting:
+                tasks[asyncio.create_task(self._await_inflight(part_number, future))] = (
+                    supplier, [part_number], False
+                )
+
+            for part_number in unique_parts:
+                if not remaining[part_number]:
+                    yield ready(part_number)
+
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                completed = []
+                for task in done:
+                    supplier, chunk, own = tasks[task]
+                    response, ok = task.result()
+                    for part_number, answer in response.items():
+                        if part_number in found and answer is not None:
+                            found[part_number][supplier] = answer
+                            if own:
+                                fresh[part_number].add(supplier)
+
+                    if not ok:
+                        for part_number in chunk:
+                            stale = self.cache.get_stale(part_number, supplier)
+                            if stale is not None:
+                                found[part_number][supplier] = stale
+                                status[part_number][supplier] = 'stale'
+                            else:
+                                status[part_number][supplier] = 'missing'
+
+                    for part_number in chunk:
+                        remaining[part_number] -= 1
+                        if not remaining[part_number]:
+                            completed.append(part_number)
+
+                for part_number in completed:
+                    yield ready(part_number)
+        finally:
+            # Потребитель мог прервать выдачу: незавершенные запросы отменяются
+            for task in tasks:
+                task.cancel()
+            for part_number, supplier, future in claimed:
+                self.cache.release(part_number, supplier, future)
+
+    async def search(self, part_numbers: List[str], suppliers: List[str],
+                     force_refresh: bool = False) -> Tuple[List[Dict[str, Any]], List[Set[str]]]:
+        """
+        Параллельный поиск по всем парам (запчасть, поставщик).
+
+        Возвращает два списка в порядке part_numbers:
+        - для каждой запчасти словарь {поставщик: {"part": ..., "quotes": [...]}}
+          только с ответившими поставщиками;
+        - множества поставщиков, чьи данные получены этим запросом (не из кэша).
+        """
+        found: Dict[str, Dict[str, Any]] = {}
+        fresh: Dict[str, Set[str]] = {}
+        async for part_number, answers, fresh_suppliers, _ in self.search_iter(
+                part_numbers, suppliers, force_refresh=force_refresh):
+            found[part_number] = answers
+            fresh[part_number] = fresh_suppliers
+
+        return [found[pn] for pn in part_numbers], [set(fresh[pn]) for pn in part_numbers]
+
+
+search_engine = ConcurrentSearchEngine(
+    registry=supplier_registry,
+    cache=price_cache,
+    max_concurrency=Config.SEARCH_MAX_CONCURRENCY,
+    supplier_concurrency=Config.SUPPLIER_CONCURRENCY,
+    lookup_timeout=Config.SEARCH_LOOKUP_TIMEOUT,
+    health=supplier_health
+)
@@ -0,0 +1,351 @@
+"""
+Локальная замена MySQL для бенчмарков: DatabaseManager на SQLite в памяти.
+
+Методы и форма результатов те же, что у database.DatabaseManager в части,
+которой пользуется бот (запись результатов поиска и запросов, история,
+загрузка индексов). Каждое обращение блокирует поток на latency секунд,
+как сетевой round trip mysql-connector.
+
+Настоящий модуль database подключается к MySQL при импорте, поэтому
+замена ставится в sys.modules до импорта бота:
+    from stubs.database import install
+    install(latency=0.005)
+    import bot
+"""
+import json
+import sqlite3
+import sys
+import threading
+import time
+import types
+from contextlib import contextmanager
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Any, Dict, List
+
+from async_database import AsyncDatabaseManager
+from models import SUPPLIER_NAMES
+
+SCHEMA = """
+CREATE TABLE parts (
+    part_number TEXT PRIMARY KEY,
+    name TEXT,
+    description TEXT,
+    brands TEXT,
+    analogs TEXT,
+    updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE part_analogs (
+    part_number TEXT NOT NULL,
+    analog_number TEXT NOT NULL,
+    PRIMARY KEY (part_number, analog_number)
+);
+CREATE TABLE price_history (
+    id INTEGER PRIMARY KEY,
+    part_number TEXT,
+    supplier_code TEXT,
+    brand TEXT,
+    price REAL,
+    delivery_days INTEGER,
+    found_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX idx_price_history_part ON price_history (part_number, found_at);
+CREATE TABLE price_daily_stats (
+    part_number TEXT NOT NULL,
+    supplier_code TEXT NOT NULL,
+    brand TEXT NOT NULL DEFAULT '',
+    stat_date TEXT NOT NULL,
+    min_price REAL,
+    max_price REAL,
+    price_sum REAL,
+    quote_count INTEGER,
+    last_delivery_days INTEGER,
+    PRIMARY KEY (part_number, stat_date, supplier_code, brand)
+);
+CREATE TABLE search_requests (
+    id INTEGER PRIMARY KEY,
+    telegram_user_id INTEGER,
+    telegram_username TEXT,
+    part_numbers TEXT,
+    suppliers TEXT,
+    results_count INTEGER,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE analysis_results (
+    id INTEGER PRIMARY KEY,
+    request_id INTEGER,
+    part_number TEXT,
+    min_price REAL,
+    min_price_supplier TEXT,
+    median_price REAL,
+    median_price_supplier TEXT,
+    ai_analysis TEXT,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE request_timings (
+    id INTEGER PRIMARY KEY,
+    telegram_user_id INTEGER,
+    kind TEXT,
+    outcome TEXT,
+    parts_count INTEGER,
+    results_count INTEGER,
+    report_bytes INTEGER,
+    queue_ms INTEGER,
+    parse_ms INTEGER,
+    download_ms INTEGER,
+    search_ms INTEGER,
+    analysis_ms INTEGER,
+    ai_ms INTEGER,
+    report_ms INTEGER,
+    upload_ms INTEGER,
+    db_ms INTEGER,
+    total_ms INTEGER,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+"""
+
+UPSERT_PART_QUERY = """
+INSERT INTO parts (part_number, name, description, brands, analogs)
+VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (part_number) DO UPDATE SET
+    name = excluded.name,
+    description = excluded.description,
+    brands = excluded.brands,
+    analogs = excluded.analogs,
+    updated_at = CURRENT_TIMESTAMP
+"""
+
+UPSERT_DAILY_STATS_QUERY = """
+INSERT INTO price_daily_stats
+(part_number, supplier_code, brand, stat_date,
+ min_price, max_price, price_sum, quote_count, last_delivery_days)
+VALUES (?, ?, ?, ?, ?, ?, ?, 1, ?)
+ON CONFLICT (part_number, stat_date, supplier_code, brand) DO UPDATE SET
+    min_price = MIN(min_price, excluded.min_price),
+    max_price = MAX(max_price, excluded.max_price),
+    price_sum = price_sum + excluded.price_sum,
+    quote_count = quote_count + 1,
+    last_delivery_days = excluded.last_delivery_days
+"""
+
+REQUEST_TIMING_COLUMNS = (
+    'kind', 'outcome', 'parts_count', 'results_count', 'report_bytes',
+    'queue_ms', 'parse_ms', 'download_ms', 'search_ms', 'analysis_ms',
+    'ai_ms', 'report_ms', 'upload_ms', 'db_ms', 'total_ms'
+)
+
+
+class SQLiteDatabaseManager:
+    def __init__(self, path: str = ':memory:', latency: float = 0.0):
+        self.latency = latency
+        self.supplier_names = dict(SUPPLIER_NAMES)
+        self.round_trips = 0
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _transaction(self):
+        # Задержка - вне блокировки: обращения к серверу из разных потоков перекрываются
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.round_trips += 1
+            cursor = self._conn.cursor()
+            try:
+                yield cursor
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+            finally:
+                cursor.close()
+
+    def save_search_results(self, parts):
+        started = time.perf_counter()
+        stats = {"ok": True, "parts": 0, "prices": 0, "elapsed_ms": 0.0}
+        if not parts:
+            return stats
+
+        today = date.today().isoformat()
+        price_rows = [
+            (part.part_number, quote.supplier, quote.brand or '', quote.price, quote.delivery)
+            for part in parts for quote in part.quotes()
+        ]
+        with self._transaction() as cursor:
+            cursor.executemany(UPSERT_PART_QUERY, [
+                (part.part_number, part.name, part.description,
+                 json.dumps(part.brands), json.dumps(part.analogs))
+                for part in parts
+            ])
+            cursor.executemany(
+                "INSERT OR IGNORE INTO part_analogs (part_number, analog_number) VALUES (?, ?)",
+                [(part.part_number, analog) for part in parts
+                 for analog in part.analogs if analog and analog != part.part_number]
+            )
+            cursor.executemany(
+                "INSERT INTO price_history (part_number, supplier_code, brand, price, delivery_days) "
+                "VALUES (?, ?, ?, ?, ?)",
+                price_rows
+            )
+            cursor.executemany(UPSERT_DAILY_STATS_QUERY, [
+                (pn, supplier, brand, today, price, price, price, delivery)
+                for pn, supplier, brand, price, delivery in price_rows
+            ])
+
+        stats.update(parts=len(parts), prices=len(price_rows))
+        stats["elapsed_ms"] = (time.perf_counter() - started) * 1000
+        return stats
+
+    def save_search_requests(self, requests):
+        started = time.perf_counter()
+        stats = {"ok": True, "requests": 0, "analyses": 0, "elapsed_ms": 0.0}
+        if not requests:
+            return stats
+
+        analysis_rows = []
+        with self._transaction() as cursor:
+            for request in requests:
+                cursor.execute(
+                    "INSERT INTO search_requests "
+                    "(telegram_user_id, telegram_username, part_numbers, suppliers, results_count) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (request['user_id'], request['username'], json.dumps(request['part_numbers']),
+                     json.dumps(request['suppliers']), request['results_count'])
+                )
+                analysis_rows.extend(
+                    (cursor.lastrowid, *row) for row in request.get('analyses', [])
+                )
+            cursor.executemany(
+                "INSERT INTO analysis_results (request_id, part_number, min_price, min_price_supplier, "
+                "median_price, median_price_supplier, ai_analysis) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                # SQLite не принимает Decimal
+                [tuple(float(v) if isinstance(v, Decimal) else v for v in row) for row in analysis_rows]
+            )
+
+        stats.update(requests=len(requests), analyses=len(analysis_rows))
+        stats["elapsed_ms"] = (time.perf_counter() - started) * 1000
+        return stats
+
+    def save_request_timings(self, timings):
+        started = time.perf_counter()
+        stats = {"ok": True, "timings": 0, "elapsed_ms": 0.0}
+        if not timings:
+            return stats
+
+        with self._transaction() as cursor:
+            cursor.executemany(
+                f"INSERT INTO request_timings (telegram_user_id, {', '.join(REQUEST_TIMING_COLUMNS)}) "
+                f"VALUES ({', '.join(['?'] * (len(REQUEST_TIMING_COLUMNS) + 1))})",
+                [(timing['user_id'], *(timing.get(c) for c in REQUEST_TIMING_COLUMNS)) for timing in timings]
+            )
+
+        stats["timings"] = len(timings)
+        stats["elapsed_ms"] = (time.perf_counter() - started) * 1000
+        return stats
+
+    def log_search_request(self, user_id, username, part_numbers, suppliers, results_count):
+        with self._transaction() as cursor:
+            cursor.execute(
+                "INSERT INTO search_requests "
+                "(telegram_user_id, telegram_username, part_numbers, suppliers, results_count) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (user_id, username, json.dumps(part_numbers), json.dumps(suppliers), results_count)
+            )
+            return cursor.lastrowid
+
+    def get_daily_stats(self, part_number, days=30, limit=None, offset=0):
+        query = """
+        SELECT part_number, supplier_code, brand, stat_date,
+            min_price, max_price, price_sum / quote_count AS avg_price,
+            quote_count, last_delivery_days
+        FROM price_daily_stats
+        WHERE part_number = ? AND stat_date >= ?
+        ORDER BY stat_date DESC, supplier_code, brand
+        """
+        params: List[Any] = [part_number, (date.today() - timedelta(days=days)).isoformat()]
+        if limit is not None:
+            query += " LIMIT ? OFFSET ?"
+            params += [limit, offset]
+
+        with self._transaction() as cursor:
+            cursor.execute(query, params)
+            columns = [column[0] for column in cursor.description]
+            results = [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+        for record in results:
+            record['supplier_name'] = self.supplier_names.get(
+                record['supplier_code'], record['supplier_code']
+            )
+        return results
+
+    def get_part_history(self, part_number, days=30, limit=None, offset=0):
+        query = """
+        SELECT part_number, supplier_code, brand, price, delivery_days, found_at
+        FROM price_history
+        WHERE part_number = ? AND found_at >= datetime('now', ?)
+        ORDER BY found_at DESC
+        """
+        params: List[Any] = [part_number, f'-{int(days)} days']
+        if limit is not None:
+            query += " LIMIT ? OFFSET ?"
+            params += [limit, offset]
+
+        with self._transaction() as cursor:
+            cursor.execute(query, params)
+            columns = [column[0] for column in cursor.description]
+            results = [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+        for record in results:
+            code = record.pop('supplier_code')
+            record['supplier_name'] = self.supplier_names.get(code, code)
+            record['date'] = record.pop('found_at')[:10]
+        return results
+
+    def load_part_numbers(self):
+        with self._transaction() as cursor:
+            cursor.execute("SELECT part_number FROM parts")
+            return [row[0] for row in cursor.fetchall()]
+
+    def load_analog_edges(self):
+        with self._transaction() as cursor:
+            cursor.execute("SELECT part_number, analog_number FROM part_analogs")
+            return cursor.fetchall()
+
+    def seed_daily_stats(self, part_numbers: List[str], days: int, brands=('SKF', 'FAG')) -> int:
+        """Синтетическая дневная статистика за days дней для бенчмарка /history"""
+        today = date.today()
+        rows = [
+            (pn, supplier, brand, (today - timedelta(days=day)).isoformat(),
+             1000 + i * 10 + day, 1200 + i * 10 + day, (1100 + i * 10 + day) * 3, 3, 5)
+            for i, pn in enumerate(part_numbers)
+            for day in range(days)
+            for supplier in self.supplier_names
+            for brand in brands
+        ]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO price_daily_stats VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows
+            )
+            self._conn.commit()
+        return len(rows)
+
+    def table_counts(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                table: self._conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                for table in ('parts', 'price_history', 'price_daily_stats',
+                              'search_requests', 'analysis_results', 'request_timings')
+            }
+
+
+def install(latency: float = 0.0, pool_size: int = 5, path: str = ':memory:') -> types.ModuleType:
+    """Подмена модуля database (db_manager, async_db) на SQLite; вызывать до импорта бота"""
+    manager = SQLiteDatabaseManager(path, latency)
+    module = types.ModuleType('database')
+    module.DatabaseManager = SQLiteDatabaseManager
+    module.db_manager = manager
+    module.async_db = AsyncDatabaseManager(manager, max_workers=pool_size)
+    sys.modules['database'] = module
+    return module
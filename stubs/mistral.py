@@ -0,0 +1,61 @@
+"""
+Локальная заглушка Mistral для тестов и бенчмарков.
+
+Повторяет форму ответа MistralAsyncClient.chat (response.choices[0].message.content),
+понимает пакетные промпты AIAnalyzer и отвечает разделами '### <номер>'.
+"""
+import asyncio
+import re
+from types import SimpleNamespace
+
+PART_RE = re.compile(r'Каталожный номер:\s*(\S+)')
+MIN_PRICE_RE = re.compile(r'Минимальная цена:\s*([\d.]+)')
+
+
+class FakeMistralClient:
+    def __init__(self, latency: float = 0.0, per_part_latency: float = 0.0,
+                 drop_every: int = 0):
+        """
+        latency - задержка каждого запроса, per_part_latency - добавка за запчасть
+        в промпте, drop_every - пропускать каждый N-й раздел пакетного ответа.
+        """
+        self.latency = latency
+        self.per_part_latency = per_part_latency
+        self.drop_every = drop_every
+        self.calls = 0
+        self.max_in_flight = 0
+        self._in_flight = 0
+
+    async def chat(self, model, messages, max_tokens=None, **kwargs):
+        prompt = messages[-1]["content"]
+        part_numbers = PART_RE.findall(prompt)
+        min_prices = MIN_PRICE_RE.findall(prompt)
+
+        self.calls += 1
+        self._in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self._in_flight)
+        try:
+            await asyncio.sleep(self.latency + self.per_part_latency * len(part_numbers))
+        finally:
+            self._in_flight -= 1
+
+        answers = [
+            f"Оптимальный вариант для {pn} - предложение с минимальной ценой {price} руб. "
+            f"при приемлемом сроке поставки. ({model})"
+            for pn, price in zip(part_numbers, min_prices)
+        ]
+
+        if len(part_numbers) == 1:
+            content = answers[0]
+        else:
+            content = "\n\n".join(
+                f"### {pn}\n{answer}"
+                for i, (pn, answer) in enumerate(zip(part_numbers, answers), 1)
+                if not (self.drop_every and i % self.drop_every == 0)
+            )
+
+        message = SimpleNamespace(role="assistant", content=content)
+        return SimpleNamespace(choices=[SimpleNamespace(index=0, message=message)])
+
+    async def close(self):
+        pass
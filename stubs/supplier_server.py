@@ -0,0 +1,196 @@
+"""
+Локальный стенд API поставщиков на данных встроенного каталога.
+
+Запуск:
+    python -m stubs.supplier_server --port 8081
+
+Затем в .env:
+    SUPPLIER_MODE=http
+    INDUSTRIALSUPPLY_API_URL=http://127.0.0.1:8081/industrialsupply/v1
+    MACHINEPARTS_API_URL=http://127.0.0.1:8081/machineparts/v1
+    FACTORYSTOCK_API_URL=http://127.0.0.1:8081/factorystock/v1
+
+Сбои для проверки адаптивных таймаутов и circuit breaker:
+    python -m stubs.supplier_server --error-rate 0.2 --slow-rate 0.05 --slow-latency 3
+    python -m stubs.supplier_server --down factorystock
+
+Во время работы профиль сбоев поставщика меняется запросом:
+    curl -X POST localhost:8081/_faults/machineparts -d '{"down": true}'
+"""
+import argparse
+import asyncio
+import logging
+import random
+from dataclasses import asdict, dataclass, fields
+
+from aiohttp import web
+
+from suppliers import mock_part_info, mock_quotes
+
+logger = logging.getLogger(__name__)
+
+
+def _industrialsupply_item(part_number):
+    info = mock_part_info(part_number)
+    return {
+        **info,
+        "offers": [
+            {"brand": q.brand, "price": q.price, "delivery_days": q.delivery}
+            for q in mock_quotes(part_number, 'industrialsupply')
+        ]
+    }
+
+
+def _machineparts_item(part_number):
+    info = mock_part_info(part_number)
+    return {
+        "sku": part_number,
+        "title": info["name"],
+        "manufacturers": info["brands"],
+        "cross_references": info["analogs"],
+        "prices": [
+            {"manufacturer": q.brand, "unit_price": q.price, "lead_time_days": q.delivery}
+            for q in mock_quotes(part_number, 'machineparts')
+        ]
+    }
+
+
+def _factorystock_item(part_number):
+    return {
+        "offers": [
+            {"brand": q.brand, "price": q.price, "delivery": q.delivery}
+            for q in mock_quotes(part_number, 'factorystock')
+        ]
+    }
+
+
+SUPPLIERS = ('industrialsupply', 'machineparts', 'factorystock')
+
+
+@dataclass
+class FaultProfile:
+    """Сбои одного поставщика: доля ответов 503, доля медленных ответов, полный отказ"""
+
+    error_rate: float = 0.0
+    slow_rate: float = 0.0
+    slow_latency: float = 0.0
+    down: bool = False
+
+
+@web.middleware
+async def disconnect_middleware(request, handler):
+    """Клиент закрыл соединение (например, отмененный дублирующий запрос) - это не ошибка стенда"""
+    try:
+        return await handler(request)
+    except ConnectionResetError:
+        logger.debug(f"Client disconnected: {request.method} {request.path}")
+        return web.Response(status=499)
+
+
+def fault_middleware(faults, rng: random.Random):
+    @web.middleware
+    async def middleware(request, handler):
+        supplier = request.path.strip('/').split('/', 1)[0]
+        profile = faults.get(supplier)
+        if profile is not None:
+            if profile.down:
+                return web.json_response({"error": "unavailable"}, status=503)
+            if profile.slow_rate and rng.random() < profile.slow_rate:
+                await asyncio.sleep(profile.slow_latency)
+            if profile.error_rate and rng.random() < profile.error_rate:
+                return web.json_response({"error": "injected failure"}, status=503)
+        return await handler(request)
+
+    return middleware
+
+
+def create_app(latency: float = 0.0, faults=None, seed=None) -> web.Application:
+    """
+    Приложение со всеми тремя API; latency - искусственная задержка ответа,
+    faults - {поставщик: FaultProfile} для имитации сбоев.
+    """
+    faults = {code: (faults or {}).get(code) or FaultProfile() for code in SUPPLIERS}
+
+    async def delay():
+        if latency:
+            await asyncio.sleep(latency)
+
+    async def industrialsupply_part(request):
+        await delay()
+        return web.json_response(_industrialsupply_item(request.match_info['part_number']))
+
+    async def industrialsupply_batch(request):
+        await delay()
+        body = await request.json()
+        return web.json_response({
+            "items": [_industrialsupply_item(pn) for pn in body.get("part_numbers", [])]
+        })
+
+    async def machineparts_prices(request):
+        await delay()
+        return web.json_response(_machineparts_item(request.match_info['part_number']))
+
+    async def factorystock_stock(request):
+        await delay()
+        part_numbers = [pn for pn in request.query.get('parts', '').split(',') if pn]
+        return web.json_response({
+            "results": {pn: _factorystock_item(pn) for pn in part_numbers}
+        })
+
+    async def get_faults(request):
+        return web.json_response({code: asdict(profile) for code, profile in faults.items()})
+
+    async def set_faults(request):
+        supplier = request.match_info['supplier']
+        if supplier not in faults:
+            raise web.HTTPNotFound()
+        body = await request.json()
+        names = {f.name for f in fields(FaultProfile)}
+        faults[supplier] = FaultProfile(**{**asdict(faults[supplier]),
+                                           **{k: v for k, v in body.items() if k in names}})
+        return web.json_response(asdict(faults[supplier]))
+
+    app = web.Application(middlewares=[
+        disconnect_middleware, fault_middleware(faults, random.Random(seed))
+    ])
+    app['faults'] = faults
+    app.router.add_get('/_faults', get_faults)
+    app.router.add_post('/_faults/{supplier}', set_faults)
+    app.router.add_get('/industrialsupply/v1/parts/{part_number}', industrialsupply_part)
+    app.router.add_post('/industrialsupply/v1/parts/batch', industrialsupply_batch)
+    app.router.add_get('/machineparts/v1/catalog/{part_number}/prices', machineparts_prices)
+    app.router.add_get('/factorystock/v1/stock', factorystock_stock)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Локальный стенд API поставщиков")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help="задержка ответа в секундах")
+    parser.add_argument('--error-rate', type=float, default=0.0,
+                        help="доля ответов 503")
+    parser.add_argument('--slow-rate', type=float, default=0.0,
+                        help="доля медленных ответов")
+    parser.add_argument('--slow-latency', type=float, default=5.0,
+                        help="дополнительная задержка медленного ответа, сек")
+    parser.add_argument('--down', action='append', default=[], choices=SUPPLIERS,
+                        help="поставщик, который всегда отвечает 503 (можно несколько)")
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    faults = {
+        code: FaultProfile(
+            error_rate=args.error_rate,
+            slow_rate=args.slow_rate,
+            slow_latency=args.slow_latency,
+            down=code in args.down
+        )
+        for code in SUPPLIERS
+    }
+    web.run_app(create_app(args.latency, faults, args.seed), host=args.host, port=args.port)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,256 @@
+"""
+Здоровье поставщиков: задержки, адаптивные таймауты и circuit breaker.
+
+Для каждого поставщика ведется скользящая гистограмма задержек
+успешных запросов. Из нее берутся:
+- таймаут запроса - перцентиль (p99) с запасом, в пределах [min, max];
+- задержка дублирующего (hedged) запроса - p95: если ответа нет дольше,
+  чем у 95% запросов, отправляется второй такой же, берется первый ответ.
+
+Circuit breaker после серии ошибок подряд на время перестает
+обращаться к поставщику, затем пропускает один пробный запрос.
+"""
+import bisect
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Границы корзин гистограммы, секунды: от 5 мс до ~60 с с шагом ~25%
+LATENCY_BUCKETS = [0.005 * 1.25 ** i for i in range(43)]
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class LatencyHistogram:
+    """
+    Скользящая гистограмма: окно делится на slices отрезков, у каждого
+    свои счетчики по корзинам; устаревшие отрезки обнуляются по мере
+    движения времени. Перцентиль - верхняя граница нужной корзины.
+    """
+
+    def __init__(self, window: float, slices: int = 10, buckets: List[float] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.slice_seconds = window / slices
+        self._counts = [[0] * (len(buckets) + 1) for _ in range(slices)]
+        self._slice_ids = [-1] * slices
+
+    def _slice(self, now: float) -> List[int]:
+        slice_id = int(now // self.slice_seconds)
+        idx = slice_id % len(self._counts)
+        if self._slice_ids[idx] != slice_id:
+            self._slice_ids[idx] = slice_id
+            self._counts[idx] = [0] * (len(self.buckets) + 1)
+        return self._counts[idx]
+
+    def observe(self, seconds: float, now: Optional[float] = None):
+        now = time.monotonic() if now is None else now
+        self._slice(now)[bisect.bisect_left(self.buckets, seconds)] += 1
+
+    def _merged(self, now: float) -> List[int]:
+        oldest = int(now // self.slice_seconds) - len(self._counts) + 1
+        merged = [0] * (len(self.buckets) + 1)
+        for slice_id, counts in zip(self._slice_ids, self._counts):
+            if slice_id >= oldest:
+                for i, value in enumerate(counts):
+                    merged[i] += value
+        return merged
+
+    def count(self, now: Optional[float] = None) -> int:
+        return sum(self._merged(time.monotonic() if now is None else now))
+
+    def percentile(self, q: float, now: Optional[float] = None) -> Optional[float]:
+        """q-й перцентиль (0-100) за окно; None, если наблюдений нет"""
+        merged = self._merged(time.monotonic() if now is None else now)
+        total = sum(merged)
+        if not total:
+            return None
+
+        rank = q / 100 * total
+        cumulative = 0
+        for i, value in enumerate(merged):
+            cumulative += value
+            if cumulative >= rank and value:
+                return self.buckets[i] if i < len(self.buckets) else self.buckets[-1]
+        return self.buckets[-1]
+
+
+class CircuitBreaker:
+    """
+    closed -> open после failure_threshold ошибок подряд -> half_open через open_seconds.
+    Пробный запрос без исхода дольше open_seconds считается потерянным:
+    разрешается следующий.
+    """
+
+    def __init__(self, failure_threshold: int, open_seconds: float):
+        self.failure_threshold = max(1, failure_threshold)
+        self.open_seconds = open_seconds
+
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+        self._probe_started = 0.0
+
+    def allow(self) -> bool:
+        """Можно ли обращаться к поставщику; в half_open - только один пробный запрос"""
+        if self.state == OPEN:
+            if time.monotonic() - self.opened_at < self.open_seconds:
+                return False
+            self.state = HALF_OPEN
+            self._probe_in_flight = False
+
+        if self.state == HALF_OPEN:
+            now = time.monotonic()
+            if self._probe_in_flight and now - self._probe_started < self.open_seconds:
+                return False
+            self._probe_in_flight = True
+            self._probe_started = now
+        return True
+
+    def record_success(self):
+        self.state = CLOSED
+        self.failures = 0
+        self._probe_in_flight = False
+
+    def record_cancelled(self):
+        """Запрос отменен до ответа: пробный запрос можно повторить"""
+        self._probe_in_flight = False
+
+    def record_failure(self) -> bool:
+        """Учет ошибки; True, если цепь только что разомкнулась"""
+        self.failures += 1
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            opened = self.state != OPEN
+            self.state = OPEN
+            self.opened_at = time.monotonic()
+            self._probe_in_flight = False
+            return opened
+        return False
+
+
+class SupplierHealth:
+    def __init__(self, code: str, max_timeout: float, window: float, min_samples: int,
+                 timeout_percentile: float, timeout_multiplier: float, min_timeout: float,
+                 hedge_enabled: bool, hedge_percentile: float, hedge_max_ratio: float,
+                 failure_threshold: int, open_seconds: float):
+        self.code = code
+        self.max_timeout = max_timeout
+        self.min_samples = min_samples
+        self.timeout_percentile = timeout_percentile
+        self.timeout_multiplier = timeout_multiplier
+        self.min_timeout = min(min_timeout, max_timeout)
+        self.hedge_enabled = hedge_enabled
+        self.hedge_percentile = hedge_percentile
+        self.hedge_max_ratio = hedge_max_ratio
+
+        self.latency = LatencyHistogram(window)
+        self.breaker = CircuitBreaker(failure_threshold, open_seconds)
+
+        self.requests = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.failures = 0
+        self.skipped = 0
+
+    def _warm(self) -> bool:
+        return self.latency.count() >= self.min_samples
+
+    def timeout(self) -> float:
+        """
+        Таймаут одного обращения: перцентиль задержки с запасом. Без статистики
+        и для пробного запроса после размыкания цепи - максимальный.
+        """
+        if self.breaker.state != CLOSED or not self._warm():
+            return self.max_timeout
+        p = self.latency.percentile(self.timeout_percentile)
+        return min(self.max_timeout, max(self.min_timeout, p * self.timeout_multiplier))
+
+    def hedge_delay(self) -> Optional[float]:
+        """Через сколько отправлять дублирующий запрос; None - не дублировать"""
+        if not self.hedge_enabled or self.breaker.state != CLOSED or not self._warm():
+            return None
+        # Дублируется не больше hedge_max_ratio запросов: иначе деградация поставщика удвоит нагрузку на него
+        if self.hedges >= self.hedge_max_ratio * self.requests:
+            return None
+        return self.latency.percentile(self.hedge_percentile)
+
+    def allow(self) -> bool:
+        if self.breaker.allow():
+            self.requests += 1
+            return True
+        self.skipped += 1
+        return False
+
+    def record_success(self, seconds: float):
+        self.latency.observe(seconds)
+        self.breaker.record_success()
+
+    def record_cancelled(self):
+        self.breaker.record_cancelled()
+
+    def record_timeout(self, seconds: float):
+        # Время до таймаута - тоже наблюдение (снизу): если поставщик замедлился,
+        # перцентиль и таймаут растут вслед за ним, а не режут все запросы
+        self.latency.observe(seconds)
+        self.record_failure(f"timeout {seconds:.2f}s")
+
+    def record_failure(self, reason: str):
+        self.failures += 1
+        if self.breaker.record_failure():
+            logger.warning(
+                f"Supplier {self.code}: circuit opened for {self.breaker.open_seconds:.0f}s "
+                f"after {self.breaker.failures} failures ({reason})"
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.breaker.state,
+            "p50": self.latency.percentile(50),
+            "p99": self.latency.percentile(99),
+            "timeout": self.timeout(),
+            "requests": self.requests,
+            "failures": self.failures,
+            "skipped": self.skipped,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins
+        }
+
+
+class SupplierHealthRegistry:
+    """Состояние здоровья по кодам поставщиков; создается при первом обращении"""
+
+    def __init__(self, max_timeout: float, **options):
+        self.max_timeout = max_timeout
+        self.options = options
+        self._health: Dict[str, SupplierHealth] = {}
+
+    def get(self, code: str) -> SupplierHealth:
+        health = self._health.get(code)
+        if health is None:
+            health = SupplierHealth(code, self.max_timeout, **self.options)
+            self._health[code] = health
+        return health
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {code: health.stats() for code, health in self._health.items()}
+
+
+supplier_health = SupplierHealthRegistry(
+    max_timeout=Config.SEARCH_LOOKUP_TIMEOUT,
+    window=Config.SUPPLIER_HEALTH_WINDOW,
+    min_samples=Config.SUPPLIER_HEALTH_MIN_SAMPLES,
+    timeout_percentile=Config.SUPPLIER_TIMEOUT_PERCENTILE,
+    timeout_multiplier=Config.SUPPLIER_TIMEOUT_MULTIPLIER,
+    min_timeout=Config.SUPPLIER_MIN_TIMEOUT,
+    hedge_enabled=Config.SUPPLIER_HEDGE_ENABLED,
+    hedge_percentile=Config.SUPPLIER_HEDGE_PERCENTILE,
+    hedge_max_ratio=Config.SUPPLIER_HEDGE_MAX_RATIO,
+    failure_threshold=Config.CIRCUIT_FAILURE_THRESHOLD,
+    open_seconds=Config.CIRCUIT_OPEN_SECONDS
+)
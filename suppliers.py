@@ -0,0 +1,348 @@
+import asyncio
+import hashlib
+import logging
+import random
+from typing import Any, Dict, List, Optional
+from urllib.parse import quote
+
+import aiohttp
+
+from config import Config
+from models import Quote
+
+logger = logging.getLogger(__name__)
+
+MOCK_CATALOGUE = {
+    "BP-12345-67890": {
+        "part_number": "BP-12345-67890",
+        "name": "Подшипник радиальный шариковый 6205",
+        "description": "Подшипник шариковый радиальный 6205, 25x52x15мм",
+        "brands": ["SKF", "FAG", "NSK"],
+        "analogs": ["BP-12345-67891", "BP-12345-67892", "BP-6205-2RS"]
+    },
+    "MC-54321-09876": {
+        "part_number": "MC-54321-09876",
+        "name": "Муфта упругая втулочно-пальцевая",
+        "description": "Муфта упругая втулочно-пальцевая МУВП-45",
+        "brands": ["Siemens", "Rexnord", "Dodge"],
+        "analogs": ["MC-54321-09877", "MC-54321-09878", "MC-MUVP-45"]
+    }
+}
+
+
+def default_part_info(part_number: str) -> Dict[str, Any]:
+    """Справочные данные для запчасти, о которой поставщики ничего не сообщили"""
+    return {
+        "part_number": part_number,
+        "name": f"Промышленная запчасть {part_number}",
+        "description": f"Запчасть для промышленного оборудования {part_number}",
+        "brands": ["Generic", "Standard"],
+        "analogs": [f"{part_number}-A", f"{part_number}-B"]
+    }
+
+
+def mock_part_info(part_number: str) -> Dict[str, Any]:
+    """Справочные данные из встроенного каталога"""
+    info = MOCK_CATALOGUE.get(part_number) or default_part_info(part_number)
+    return {**info, "brands": list(info["brands"]), "analogs": list(info["analogs"])}
+
+
+def mock_quotes(part_number: str, supplier: str) -> List[Quote]:
+    """Детерминированные цены поставщика по каталожному номеру"""
+    quotes = []
+
+    for i, brand in enumerate(mock_part_info(part_number)["brands"][:2]):  # Первые 2 бренда
+        hash_input = f"{part_number}{supplier}{brand}{i}".encode()
+        hash_val = int(hashlib.md5(hash_input).hexdigest(), 16)
+
+        price = 10000 + (hash_val % 40000)  # 10000-50000
+        delivery = 1 + (hash_val % 14)  # 1-14 дней
+
+        quotes.append(Quote(supplier, brand, price, delivery))
+
+    return quotes
+
+
+class SupplierError(Exception):
+    """Ошибка обращения к API поставщика"""
+
+
+class SupplierUnavailable(SupplierError):
+    """Временная ошибка поставщика, запрос можно повторить"""
+
+
+class SupplierTimeout(SupplierError):
+    """Поставщик не ответил за адаптивный таймаут одного обращения"""
+
+
+class SupplierAdapter:
+    """
+    Базовый адаптер поставщика.
+
+    fetch_quotes возвращает {"part": справочные данные или None, "quotes": [Quote, ...]}
+    либо None, если поставщик не знает такой запчасти.
+    """
+
+    supports_batch = False
+    batch_size = 1
+
+    def __init__(self, code: str):
+        self.code = code
+
+    async def fetch_quotes(self, part_number: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    async def fetch_batch(self, part_numbers: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Пакетный запрос; по умолчанию - по одной запчасти"""
+        results = {}
+        for part_number in part_numbers:
+            result = await self.fetch_quotes(part_number)
+            if result is not None:
+                results[part_number] = result
+        return results
+
+
+class MockSupplierAdapter(SupplierAdapter):
+    """Имитация поставщика на встроенном каталоге"""
+
+    async def fetch_quotes(self, part_number: str) -> Optional[Dict[str, Any]]:
+        return {
+            "part": mock_part_info(part_number),
+            "quotes": mock_quotes(part_number, self.code)
+        }
+
+
+class SupplierHttpPool:
+    """Общая aiohttp-сессия с пулом keep-alive соединений для всех адаптеров"""
+
+    def __init__(self, limit: int, limit_per_host: int, keepalive_timeout: float):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def get_session(self) -> aiohttp.ClientSession:
+        """Сессия создается лениво внутри работающего event loop"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+                ttl_dns_cache=300
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                headers={"Accept": "application/json"}
+            )
+        return self._session
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+
+class HttpSupplierAdapter(SupplierAdapter):
+    """Адаптер REST API поставщика с таймаутами и повторами"""
+
+    retry_statuses = {429, 500, 502, 503, 504}
+
+    def __init__(self, code: str, base_url: str, http_pool: SupplierHttpPool,
+                 timeout: float, max_retries: int, retry_backoff: float,
+                 api_key: Optional[str] = None):
+        super().__init__(code)
+        self.base_url = base_url.rstrip('/')
+        self.http_pool = http_pool
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.api_key = api_key
+
+    def _retry_delay(self, attempt: int) -> float:
+        """Экспоненциальная задержка с полным джиттером"""
+        return random.uniform(0, self.retry_backoff * (2 ** attempt))
+
+    async def _request(self, method: str, path: str, **kwargs) -> Optional[Any]:
+        """HTTP-запрос к поставщику; 404 означает, что запчасть не найдена"""
+        url = f"{self.base_url}{path}"
+        headers = {}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+
+        session = self.http_pool.get_session()
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with session.request(method, url, headers=headers,
+                                           timeout=self.timeout, **kwargs) as response:
+                    if response.status == 404:
+                        return None
+                    if response.status in self.retry_statuses:
+                        raise SupplierUnavailable(f"HTTP {response.status}")
+                    if response.status >= 400:
+                        raise SupplierError(f"HTTP {response.status}: {await response.text()}")
+                    return await response.json()
+
+            except (aiohttp.ClientError, asyncio.TimeoutError, SupplierUnavailable) as e:
+                if attempt >= self.max_retries:
+                    raise SupplierUnavailable(f"{self.code} {method} {path}: {e}") from e
+
+                delay = self._retry_delay(attempt)
+                logger.warning(
+                    f"{self.code} request failed ({e}), retry {attempt + 1} in {delay:.2f}s"
+                )
+                await asyncio.sleep(delay)
+
+        return None
+
+    def _part_info(self, payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        return None
+
+    def _parse_quotes(self, payload: Dict[str, Any]) -> List[Quote]:
+        raise NotImplementedError
+
+    def _parse_result(self, payload: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        if not payload:
+            return None
+        return {
+            "part": self._part_info(payload),
+            "quotes": self._parse_quotes(payload)
+        }
+
+
+class IndustrialSupplyAdapter(HttpSupplierAdapter):
+    """
+    IndustrialSupply.ru:
+    GET  /parts/{part_number}  - карточка запчасти с предложениями
+    POST /parts/batch          - {"part_numbers": [...]} -> {"items": [...]}
+    """
+
+    supports_batch = True
+    batch_size = 50
+
+    def _part_info(self, payload):
+        return {
+            "part_number": payload["part_number"],
+            "name": payload.get("name"),
+            "description": payload.get("description"),
+            "brands": payload.get("brands", []),
+            "analogs": payload.get("analogs", [])
+        }
+
+    def _parse_quotes(self, payload):
+        return [
+            Quote(self.code, offer["brand"], offer["price"], offer["delivery_days"])
+            for offer in payload.get("offers", [])
+        ]
+
+    async def fetch_quotes(self, part_number):
+        payload = await self._request("GET", f"/parts/{quote(part_number, safe='')}")
+        return self._parse_result(payload)
+
+    async def fetch_batch(self, part_numbers):
+        payload = await self._request("POST", "/parts/batch", json={"part_numbers": part_numbers})
+        results = {}
+        for item in (payload or {}).get("items", []):
+            results[item["part_number"]] = self._parse_result(item)
+        return results
+
+
+class MachinePartsAdapter(HttpSupplierAdapter):
+    """
+    MachineParts.com (без пакетного API):
+    GET /catalog/{part_number}/prices
+    """
+
+    def _part_info(self, payload):
+        return {
+            "part_number": payload["sku"],
+            "name": payload.get("title"),
+            "description": payload.get("title"),
+            "brands": payload.get("manufacturers", []),
+            "analogs": payload.get("cross_references", [])
+        }
+
+    def _parse_quotes(self, payload):
+        return [
+            Quote(self.code, item["manufacturer"], item["unit_price"], item["lead_time_days"])
+            for item in payload.get("prices", [])
+        ]
+
+    async def fetch_quotes(self, part_number):
+        payload = await self._request("GET", f"/catalog/{quote(part_number, safe='')}/prices")
+        return self._parse_result(payload)
+
+
+class FactoryStockAdapter(HttpSupplierAdapter):
+    """
+    FactoryStock.eu (только пакетный API):
+    GET /stock?parts=PN1,PN2 -> {"results": {"PN1": {"offers": [...]}}}
+    """
+
+    supports_batch = True
+    batch_size = 25
+
+    def _parse_quotes(self, payload):
+        return [
+            Quote(self.code, offer["brand"], offer["price"], offer["delivery"])
+            for offer in payload.get("offers", [])
+        ]
+
+    async def fetch_quotes(self, part_number):
+        results = await self.fetch_batch([part_number])
+        return results.get(part_number)
+
+    async def fetch_batch(self, part_numbers):
+        payload = await self._request("GET", "/stock", params={"parts": ",".join(part_numbers)})
+        results = {}
+        for part_number, item in (payload or {}).get("results", {}).items():
+            result = self._parse_result(item)
+            if result is not None:
+                results[part_number] = result
+        return results
+
+
+HTTP_ADAPTERS = {
+    'industrialsupply': IndustrialSupplyAdapter,
+    'machineparts': MachinePartsAdapter,
+    'factorystock': FactoryStockAdapter
+}
+
+
+class SupplierRegistry:
+    """Реестр адаптеров поставщиков согласно Config.SUPPLIER_ADAPTERS"""
+
+    def __init__(self):
+        self.http_pool = SupplierHttpPool(
+            limit=Config.SUPPLIER_POOL_SIZE,
+            limit_per_host=Config.SUPPLIER_POOL_SIZE_PER_HOST,
+            keepalive_timeout=Config.SUPPLIER_KEEPALIVE_TIMEOUT
+        )
+        self.adapters: Dict[str, SupplierAdapter] = {}
+
+        for code, mode in Config.SUPPLIER_ADAPTERS.items():
+            self.adapters[code] = self._create_adapter(code, mode)
+
+    def _create_adapter(self, code: str, mode: str) -> SupplierAdapter:
+        if mode == 'mock':
+            return MockSupplierAdapter(code)
+        if mode == 'http' and code in HTTP_ADAPTERS:
+            return HTTP_ADAPTERS[code](
+                code,
+                base_url=Config.SUPPLIER_APIS[code],
+                http_pool=self.http_pool,
+                timeout=Config.SUPPLIER_TIMEOUTS.get(code, 5),
+                max_retries=Config.SUPPLIER_MAX_RETRIES,
+                retry_backoff=Config.SUPPLIER_RETRY_BACKOFF,
+                api_key=Config.SUPPLIER_API_KEYS.get(code)
+            )
+        raise ValueError(f"Unknown adapter mode '{mode}' for supplier {code}")
+
+    def get(self, code: str) -> SupplierAdapter:
+        return self.adapters[code]
+
+    async def close(self):
+        await self.http_pool.close()
+
+
+supplier_registry = SupplierRegistry()
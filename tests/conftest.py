@@ -0,0 +1,170 @@
+import os
+import sys
+
+import pytest
+
+# Модули бота лежат в корне репозитория
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope='session')
+def database():
+    """
+    Модуль database без MySQL: он подключается при импорте, поэтому на время
+    импорта пул заменяется пулом без соединений. Тесты подставляют свои курсоры.
+    """
+    from mysql.connector import errors, pooling
+
+    class OfflinePool:
+        def __init__(self, **config):
+            pass
+
+        def get_connection(self):
+            raise errors.PoolError("no MySQL in tests")
+
+    original = pooling.MySQLConnectionPool
+    pooling.MySQLConnectionPool = OfflinePool
+    try:
+        import database as module
+    finally:
+        pooling.MySQLConnectionPool = original
+    return module
+
+
+class FakeCursor:
+    """Курсор, записывающий запросы; результаты SELECT задаются очередью ответов"""
+
+    def __init__(self, results=()):
+        self.results = list(results)
+        self.executed = []
+        self.description = None
+        self.rowcount = 0
+        self._last = []
+
+    def execute(self, query, params=None):
+        self.executed.append((query, params))
+        self._last = self.results.pop(0) if query.lstrip().startswith('SELECT') and self.results else []
+
+    def executemany(self, query, rows):
+        self.executed.append((query, list(rows)))
+
+    def fetchall(self):
+        return self._last
+
+    def fetchone(self):
+        return self._last[0] if self._last else None
+
+    def fetchmany(self, size=1):
+        rows, self._last = self._last[:size], self._last[size:]
+        return rows
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, cursor: FakeCursor):
+        self._cursor = cursor
+        self.commits = 0
+
+    def cursor(self, **options):
+        return self._cursor
+
+    def start_transaction(self):
+        pass
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def fake_cursor():
+    return FakeCursor
+
+
+@pytest.fixture
+def fake_connection():
+    return FakeConnection
+
+
+def make_part(part_number='BP-1', prices=None, analogs=()):
+    """Запчасть с предложениями {поставщик: [Quote, ...]}"""
+    from models import Part
+    return Part(part_number, part_number, '', [], list(analogs), prices or {}, {})
+
+
+@pytest.fixture
+def part_factory():
+    return make_part
+
+
+def make_analysis(*parts):
+    """Результаты analyze_batch без индекса аналогов: статистика цен, пустые аналоги"""
+    from price_stats import PriceStatsEngine
+    results = []
+    for part, result in zip(parts, PriceStatsEngine().analyze(list(parts))):
+        if result is not None:
+            result["analogs"] = []
+            result["supplier_status"] = dict(part.supplier_status)
+            results.append(result)
+    return results
+
+
+@pytest.fixture
+def analysis_factory():
+    return make_analysis
+
+
+def make_ai_analyzer(client, cache=None, batch_size=3, max_concurrency=4):
+    """AIAnalyzer без ограничения частоты; client - например, stubs.mistral.FakeMistralClient"""
+    from ai_analyzer import AIAnalyzer
+    return AIAnalyzer(client, model='test-model', cache=cache, max_concurrency=max_concurrency,
+                      rate_limit=1000, batch_size=batch_size)
+
+
+@pytest.fixture
+def ai_factory():
+    return make_ai_analyzer
+
+
+class Registry:
+    """Реестр поставщиков из заданных адаптеров"""
+
+    def __init__(self, *adapters):
+        self.adapters = {adapter.code: adapter for adapter in adapters}
+
+    def get(self, code):
+        return self.adapters[code]
+
+
+def make_engine(*adapters, cache=None, lookup_timeout=0.05, open_seconds=0.2, **options):
+    """ConcurrentSearchEngine без кэша (ttl=0) и с быстрыми таймаутами; options - для SupplierHealth"""
+    from price_cache import PriceCache
+    from search_engine import ConcurrentSearchEngine
+    from supplier_health import SupplierHealthRegistry
+
+    params = dict(
+        window=60, min_samples=5, timeout_percentile=99, timeout_multiplier=2.0,
+        min_timeout=0.01, hedge_enabled=False, hedge_percentile=95, hedge_max_ratio=1.0,
+        failure_threshold=3, open_seconds=open_seconds
+    )
+    params.update(options)
+    return ConcurrentSearchEngine(
+        registry=Registry(*adapters),
+        cache=cache if cache is not None else PriceCache(ttl=0, max_entries=100),
+        max_concurrency=10,
+        supplier_concurrency={},
+        lookup_timeout=lookup_timeout,
+        health=SupplierHealthRegistry(max_timeout=lookup_timeout, **params)
+    )
+
+
+@pytest.fixture
+def engine_factory():
+    return make_engine
@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+
+from ai_analyzer import split_batch_response
+from models import Quote
+from stubs.mistral import FakeMistralClient
+
+
+@pytest.fixture
+def results(part_factory, analysis_factory):
+    parts = [
+        part_factory(f'BP-{i}', {'machineparts': [Quote('machineparts', 'SKF', 100.0 + i, 3)]})
+        for i in range(7)
+    ]
+    return analysis_factory(*parts)
+
+
+def test_split_batch_response():
+    text = (
+        "Вступление без раздела\n"
+        "### BP-1\nАнализ первой\n\n"
+        "### **bp-2**:\nАнализ второй\n"
+        "### XX-9\nЧужой раздел\n"
+        "### BP-3\n"
+    )
+    assert split_batch_response(text, ['BP-1', 'BP-2', 'BP-3']) == {
+        'BP-1': 'Анализ первой',
+        'BP-2': 'Анализ второй',
+    }
+
+
+def test_batches_and_falls_back_for_missing_sections(results, ai_factory):
+    # В пакетном ответе пропадает каждый второй раздел
+    client = FakeMistralClient(drop_every=2)
+    analyzer = ai_factory(client, batch_size=3)
+
+    analyses = asyncio.run(analyzer.analyze(results))
+
+    assert [a['part_number'] for a in analyses] == [r['part_number'] for r in results]
+    for analysis in analyses:
+        assert analysis['part_number'] in analysis['analysis']
+    # Пачки 3 + 3 + 1 и по отдельному запросу на каждую пропавшую запчасть
+    assert client.calls == 3 + 2
+
+
+def test_concurrent_requests_are_bounded(results, ai_factory):
+    client = FakeMistralClient(latency=0.02)
+    analyzer = ai_factory(client, batch_size=1, max_concurrency=2)
+
+    asyncio.run(analyzer.analyze(results))
+
+    assert client.calls == len(results)
+    assert client.max_in_flight == 2
+
+
+def test_stream_analyses_parts_as_they_arrive(results, ai_factory):
+    client = FakeMistralClient(latency=0.02)
+    analyzer = ai_factory(client, batch_size=3)
+
+    async def arriving():
+        for result in results:
+            await asyncio.sleep(0.005)
+            yield result
+
+    async def scenario():
+        return [batch async for batch in analyzer.analyze_stream(arriving())]
+
+    batches = asyncio.run(scenario())
+    assert all(1 <= len(batch) <= 3 for batch in batches)
+    assert sorted(a['part_number'] for batch in batches for a in batch) == sorted(
+        r['part_number'] for r in results
+    )
+    # Первая пачка уходит, не дожидаясь остальных запчастей
+    assert len(batches[0]) == 1
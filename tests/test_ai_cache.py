@@ -0,0 +1,98 @@
+import asyncio
+
+import pytest
+
+from ai_analyzer import FALLBACK_ANALYSIS
+from ai_cache import AnalysisCache, analysis_cache_key
+from models import Quote
+from stubs.mistral import FakeMistralClient
+
+
+@pytest.fixture
+def result(part_factory, analysis_factory):
+    part = part_factory('BP-1', {
+        'machineparts': [Quote('machineparts', 'SKF', 100.0, 3), Quote('machineparts', 'FAG', 90.0, 5)],
+        'factorystock': [Quote('factorystock', 'NSK', 120.0, 1)],
+    })
+    return analysis_factory(part)[0]
+
+
+def test_key_depends_on_price_snapshot_not_order(result, part_factory, analysis_factory):
+    key = analysis_cache_key(result, 'model')
+    reordered = dict(result, all_prices=list(reversed(result['all_prices'])))
+    assert analysis_cache_key(reordered, 'model') == key
+    assert analysis_cache_key(result, 'other-model') != key
+
+    cheaper = part_factory('BP-1', {
+        'machineparts': [Quote('machineparts', 'SKF', 100.0, 3), Quote('machineparts', 'FAG', 80.0, 5)],
+        'factorystock': [Quote('factorystock', 'NSK', 120.0, 1)],
+    })
+    assert analysis_cache_key(analysis_factory(cheaper)[0], 'model') != key
+
+
+def test_entries_expire_and_purge_keeps_newest(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr('ai_cache.time.time', lambda: now[0])
+    cache = AnalysisCache(str(tmp_path / 'ai.sqlite'), ttl=60, max_entries=2)
+    try:
+        for i in range(3):
+            cache.put(f'k{i}', f'P{i}', f'text {i}')
+            now[0] += 1
+        assert cache.get('k0') == 'text 0'
+
+        # Сверх лимита удаляются самые старые записи
+        assert cache.purge() == 1
+        assert cache.get('k0') is None
+        assert cache.get('k2') == 'text 2'
+
+        now[0] += 60
+        assert cache.get('k2') is None
+        assert cache.purge() == 2
+        assert cache.stats()['hits'] == 2
+    finally:
+        cache.close()
+
+
+class FailingClient:
+    calls = 0
+
+    async def chat(self, **kwargs):
+        self.calls += 1
+        raise RuntimeError("Mistral unavailable")
+
+
+def test_analyzer_reuses_cached_analysis(tmp_path, result, ai_factory):
+    cache = AnalysisCache(str(tmp_path / 'ai.sqlite'), ttl=60, max_entries=10)
+    client = FakeMistralClient()
+    analyzer = ai_factory(client, cache=cache)
+
+    async def scenario():
+        first = await analyzer.analyze([result])
+        second = await analyzer.analyze([result])
+        return first, second
+
+    try:
+        first, second = asyncio.run(scenario())
+    finally:
+        cache.close()
+    assert first == second
+    assert 'BP-1' in first[0]['analysis']
+    assert client.calls == 1
+
+
+def test_fallback_analysis_is_not_cached(tmp_path, result, ai_factory):
+    cache = AnalysisCache(str(tmp_path / 'ai.sqlite'), ttl=60, max_entries=10)
+    client = FailingClient()
+    analyzer = ai_factory(client, cache=cache)
+
+    async def scenario():
+        for _ in range(2):
+            analyses = await analyzer.analyze([result])
+        return analyses
+
+    try:
+        analyses = asyncio.run(scenario())
+    finally:
+        cache.close()
+    assert analyses == [{'part_number': 'BP-1', 'analysis': FALLBACK_ANALYSIS}]
+    assert client.calls == 2
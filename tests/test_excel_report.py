@@ -0,0 +1,106 @@
+import io
+import os
+import time
+from datetime import datetime
+
+import pytest
+from openpyxl import load_workbook
+
+from config import Config
+from excel_generator import ExcelReportGenerator
+from models import Quote
+
+
+class FixedDatetime(datetime):
+    @classmethod
+    def now(cls, tz=None):
+        return cls(2026, 3, 1, 12, 30)
+
+
+@pytest.fixture
+def generator(monkeypatch, tmp_path):
+    # Дата в заголовке не должна меняться между двумя отчетами
+    monkeypatch.setattr('excel_generator.datetime', FixedDatetime)
+    generator = ExcelReportGenerator()
+    generator.reports_dir = str(tmp_path / 'reports')
+    return generator
+
+
+@pytest.fixture
+def results(part_factory, analysis_factory):
+    stale = part_factory('BP-1', {
+        'industrialsupply': [Quote('industrialsupply', 'SKF', 120.0, 2)],
+        'machineparts': [Quote('machineparts', 'FAG', 90.0, 5), Quote('machineparts', 'NSK', 100.0, 4)],
+        'factorystock': [Quote('factorystock', 'SKF', 150.0, 1)],
+    })
+    stale.supplier_status = {'factorystock': 'stale'}
+    single = part_factory('MC-2', {'factorystock': [Quote('factorystock', 'Generic', 70.0, 3)]})
+    single.supplier_status = {'industrialsupply': 'missing'}
+    results = analysis_factory(stale, single)
+    results[0]['analogs'] = [
+        {'part_number': 'BP-1A', 'estimated_price': 95.4, 'availability': 'В наличии', 'source': 'cache'},
+        {'part_number': 'BP-1B', 'estimated_price': 88.0, 'availability': 'Под заказ', 'source': 'estimate'},
+    ]
+    return results
+
+
+def cells(report: bytes):
+    """Непустые ячейки с оформлением, объединения и ширины колонок"""
+    ws = load_workbook(io.BytesIO(report)).active
+    values = {}
+    for row in ws.iter_rows():
+        for cell in row:
+            if cell.value is not None:
+                values[cell.coordinate] = (
+                    cell.value, cell.font.b, cell.font.color.rgb if cell.font.color else None,
+                    cell.fill.fgColor.rgb if cell.fill.fill_type else None
+                )
+    merged = sorted(str(r) for r in ws.merged_cells.ranges)
+    widths = {k: d.width for k, d in ws.column_dimensions.items() if d.width}
+    return values, merged, widths
+
+
+@pytest.mark.parametrize('user_info, count', [({'id': 7, 'username': 'buyer'}, 2), (None, 1)])
+def test_streaming_report_matches_classic(generator, results, user_info, count):
+    classic = generator.render_report(results[:count], user_info, streaming=False)
+    streaming = generator.render_report(results[:count], user_info, streaming=True)
+
+    classic_cells, classic_merged, classic_widths = cells(classic)
+    streaming_cells, streaming_merged, streaming_widths = cells(streaming)
+    assert streaming_cells == classic_cells
+    assert streaming_merged == classic_merged
+    assert streaming_widths == classic_widths
+    assert 'УСТАРЕВШАЯ ЦЕНА' in {value for value, *_ in classic_cells.values()}
+
+
+def test_report_is_rendered_in_memory(generator, results):
+    report = generator.render_report(results, {'id': 7})
+    assert report[:2] == b'PK'
+    assert not os.path.exists(generator.reports_dir)
+
+
+def test_archive_is_optional(generator, monkeypatch):
+    monkeypatch.setattr(Config, 'REPORTS_ARCHIVE_ENABLED', False)
+    assert generator.archive_report(b'report', 7) is None
+
+    monkeypatch.setattr(Config, 'REPORTS_ARCHIVE_ENABLED', True)
+    path = generator.archive_report(b'report', 7)
+    assert os.listdir(generator.reports_dir) == [os.path.basename(path)]
+    with open(path, 'rb') as f:
+        assert f.read() == b'report'
+
+
+def test_cleanup_removes_expired_and_oversized_reports(generator, monkeypatch):
+    monkeypatch.setattr(Config, 'REPORTS_RETENTION_DAYS', 7)
+    monkeypatch.setattr(Config, 'REPORTS_MAX_TOTAL_MB', 2 / 1024)
+    os.makedirs(generator.reports_dir)
+    now = time.time()
+    for name, age_days in (('expired', 10), ('old', 3), ('new', 1), ('newest', 0)):
+        path = os.path.join(generator.reports_dir, f'{name}.xlsx')
+        with open(path, 'wb') as f:
+            f.write(b'x' * 700)
+        os.utime(path, (now - age_days * 86400, now - age_days * 86400))
+
+    # expired - по сроку хранения, old - чтобы уложиться в 2 КБ
+    assert generator.cleanup_archive() == 2
+    assert sorted(os.listdir(generator.reports_dir)) == ['new.xlsx', 'newest.xlsx']
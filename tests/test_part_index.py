@@ -0,0 +1,96 @@
+import random
+
+import pytest
+
+from part_index import PartIndex, SortedStrings, edit_distance
+
+
+def reference_distance(a: str, b: str) -> int:
+    """Полная матрица Дамерау-Левенштейна (ограниченный вариант) для сверки"""
+    d = [[0] * (len(b) + 1) for _ in range(len(a) + 1)]
+    for i in range(len(a) + 1):
+        d[i][0] = i
+    for j in range(len(b) + 1):
+        d[0][j] = j
+    for i in range(1, len(a) + 1):
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            d[i][j] = min(d[i - 1][j] + 1, d[i][j - 1] + 1, d[i - 1][j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                d[i][j] = min(d[i][j], d[i - 2][j - 2] + 1)
+    return d[-1][-1]
+
+
+@pytest.mark.parametrize('a, b, expected', [
+    ('BP-12345', 'BP-12345', 0),
+    ('BP-12345', 'BP-12354', 1),
+    ('BP-12345', 'BP-1245', 1),
+    ('BP-12345', 'BP-123456', 1),
+    ('BP-12345', 'BX-12340', 2),
+    ('', 'ABC', 3),
+])
+def test_edit_distance(a, b, expected):
+    assert edit_distance(a, b, limit=5) == expected
+
+
+def test_edit_distance_matches_reference_within_limit():
+    rng = random.Random(7)
+    alphabet = 'AB12-'
+    for _ in range(500):
+        a = ''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 8)))
+        b = ''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 8)))
+        expected = reference_distance(a, b)
+        assert edit_distance(a, b, limit=2) == (expected if expected <= 2 else 3)
+
+
+@pytest.fixture
+def index():
+    index = PartIndex(max_distance=2, window=8)
+    index.add_many(['BP-12345-67890', 'BP-12345-67891', 'MC-54321-09876', 'FS-11111-22222'])
+    return index
+
+
+def test_exact_and_prefix(index):
+    assert 'MC-54321-09876' in index
+    assert index.suggest('MC-54321-09876') == []
+    assert index.prefix('BP-12345') == ['BP-12345-67890', 'BP-12345-67891']
+    assert index.prefix('ZZ') == []
+
+
+def test_add_keeps_sorted_lookups(index):
+    assert index.add('BP-12345-67889')
+    assert not index.add('BP-12345-67889')
+    assert len(index) == 5
+    assert index.prefix('BP-12345-678') == ['BP-12345-67889', 'BP-12345-67890', 'BP-12345-67891']
+
+
+def test_suggest_single_typo(index):
+    # Перестановка, замена, пропуск и лишний символ
+    assert index.suggest('MC-54321-09867') == ['MC-54321-09876']
+    assert index.suggest('MC-54321-O9876') == ['MC-54321-09876']
+    assert index.suggest('MC-5431-09876') == ['MC-54321-09876']
+    assert index.suggest('FS-111111-22222') == ['FS-11111-22222']
+    assert index.suggest('BP-12345-6789') == ['BP-12345-67890', 'BP-12345-67891']
+
+
+def test_suggest_two_edits_and_unknown(index):
+    assert index.suggest('MC-54312-09867') == ['MC-54321-09876']
+    # Опечатки в начале номера находятся через перевернутые номера
+    assert index.suggest('NC-64321-09876') == ['MC-54321-09876']
+    assert index.suggest('XX-00000-00000') == []
+
+
+def test_sorted_strings_buffer_matches_sorted_list():
+    rng = random.Random(3)
+    values = SortedStrings(merge_size=8, merge_ratio=4)
+    values.reset(f"P{rng.randrange(10 ** 6):06d}" for _ in range(50))
+    reference = sorted(values.after('', 100))
+    for _ in range(300):
+        value = f"P{rng.randrange(10 ** 6):06d}"
+        values.add(value)
+        reference.append(value)
+        reference.sort()
+        key = f"P{rng.randrange(10 ** 6):06d}"
+        # Ответы одинаковые и пока номер в буфере, и после слияния
+        assert values.after(key, 5) == [v for v in reference if v >= key][:5]
+        assert values.before(key, 5) == [v for v in reference if v < key][-5:]
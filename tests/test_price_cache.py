@@ -0,0 +1,93 @@
+import asyncio
+
+from price_cache import LOOKUP_FAILED, PriceCache
+from suppliers import SupplierAdapter
+
+
+class CountingAdapter(SupplierAdapter):
+    """Поставщик, отвечающий через delay секунд; считает обращения"""
+
+    def __init__(self, code: str, delay: float = 0.05):
+        super().__init__(code)
+        self.delay = delay
+        self.calls = 0
+
+    async def fetch_quotes(self, part_number):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return {"part": part_number, "quotes": []}
+
+
+def test_ttl_and_lru(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr('price_cache.time.monotonic', lambda: now[0])
+    cache = PriceCache(ttl=10, max_entries=2, stale_ttl=5)
+
+    cache.put('P1', 's', 1)
+    cache.put('P2', 's', 2)
+    assert cache.get('P1', 's') == 1
+    # P2 давно не использовался - вытесняется первым
+    cache.put('P3', 's', 3)
+    assert cache.get('P2', 's') is None
+    assert cache.evictions == 1
+
+    now[0] += 12
+    assert cache.get('P1', 's') is None
+    assert cache.get_stale('P1', 's') == 1
+    now[0] += 5
+    assert cache.get_stale('P3', 's') is None
+
+
+def test_concurrent_searches_share_one_request(engine_factory):
+    adapter = CountingAdapter('s')
+    cache = PriceCache(ttl=60, max_entries=100)
+    engine = engine_factory(adapter, cache=cache, lookup_timeout=1.0)
+
+    async def scenario():
+        return await asyncio.gather(*(engine.search(['P1', 'P2'], ['s']) for _ in range(3)))
+
+    results = asyncio.run(scenario())
+    assert adapter.calls == 2
+    assert cache.coalesced == 4
+    for found, _ in results:
+        assert [answers['s']['part'] for answers in found] == ['P1', 'P2']
+    # Свежими данные считаются только у запроса, который ходил к поставщику
+    assert sum(bool(fresh[0]) for _, fresh in results) == 1
+
+
+def test_release_wakes_waiter_with_failure(engine_factory):
+    cache = PriceCache(ttl=60, max_entries=100)
+    engine = engine_factory(CountingAdapter('s'), cache=cache, lookup_timeout=1.0)
+
+    async def scenario():
+        future = cache.claim('P1', 's')
+        waiter = asyncio.create_task(engine._await_inflight('P1', future))
+        await asyncio.sleep(0)
+        cache.release('P1', 's', future)
+        return future.result(), await waiter
+
+    value, result = asyncio.run(scenario())
+    assert value is LOOKUP_FAILED
+    assert result == ({}, False)
+    assert cache.get('P1', 's') is None
+
+
+def test_cancelled_owner_does_not_hang_waiter(engine_factory):
+    adapter = CountingAdapter('s', delay=3600)
+    cache = PriceCache(ttl=60, max_entries=100)
+    engine = engine_factory(adapter, cache=cache, lookup_timeout=5.0)
+
+    async def scenario():
+        owner = asyncio.create_task(engine.search(['P1'], ['s']))
+        await asyncio.sleep(0.01)
+        waiter = asyncio.create_task(anext(engine.search_iter(['P1'], ['s'])))
+        await asyncio.sleep(0.01)
+        owner.cancel()
+        return await asyncio.wait_for(waiter, timeout=1)
+
+    part_number, answers, fresh, status = asyncio.run(scenario())
+    assert part_number == 'P1'
+    assert answers == {} and fresh == set()
+    # Ожидающий не ждет таймаута и не принимает отмену за «нет данных»
+    assert status == {'s': 'missing'}
+    assert adapter.calls == 1
@@ -0,0 +1,104 @@
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from config import Config
+from models import Quote
+
+
+@pytest.fixture
+def make_part(part_factory):
+    return lambda *quotes: part_factory('BP-1', {'machineparts': list(quotes)})
+
+
+def queries(cursor, marker):
+    return [params for query, params in cursor.executed if marker in query]
+
+
+@pytest.fixture
+def manager(database, monkeypatch):
+    monkeypatch.setattr(Config, 'PRICE_HISTORY_DEDUP', True)
+    return database.db_manager
+
+
+def test_dedup_writes_only_changed_prices(manager, make_part, monkeypatch, fake_cursor,
+                                          fake_connection):
+    # В price_latest: SKF с той же ценой, FAG с другой, NSK еще нет
+    cursor = fake_cursor([[
+        ('BP-1', 'machineparts', 'SKF', Decimal('10.00'), 3),
+        ('BP-1', 'machineparts', 'FAG', Decimal('12.00'), 5),
+    ]])
+    monkeypatch.setattr(manager, 'get_connection', lambda: fake_connection(cursor))
+
+    stats = manager.save_search_results([make_part(
+        Quote('machineparts', 'SKF', 10.0, 3),
+        Quote('machineparts', 'FAG', 11.5, 5),
+        Quote('machineparts', 'NSK', 9.0, 7),
+    )])
+
+    assert stats['ok'] and stats['prices'] == 2
+    history, = queries(cursor, 'INSERT INTO price_history')
+    assert [row[2] for row in history] == ['FAG', 'NSK']
+    # price_latest и дневная статистика получают все цены, включая неизменившиеся
+    latest, = queries(cursor, 'INSERT INTO price_latest')
+    assert sorted(row[2] for row in latest) == ['FAG', 'NSK', 'SKF']
+    daily, = queries(cursor, 'INSERT INTO price_daily_stats')
+    assert len(daily) == 3
+
+
+def test_dedup_skips_history_when_nothing_changed(manager, make_part, monkeypatch, fake_cursor,
+                                                  fake_connection):
+    cursor = fake_cursor([[('BP-1', 'machineparts', 'SKF', Decimal('10.00'), 3)]])
+    monkeypatch.setattr(manager, 'get_connection', lambda: fake_connection(cursor))
+
+    stats = manager.save_search_results([make_part(Quote('machineparts', 'SKF', 10.001, 3))])
+
+    assert stats['prices'] == 0
+    assert not queries(cursor, 'INSERT INTO price_history')
+    assert queries(cursor, 'INSERT INTO price_daily_stats')
+
+
+def test_repeated_key_in_one_batch_is_compared_to_previous_row(manager, make_part, monkeypatch,
+                                                              fake_cursor, fake_connection):
+    cursor = fake_cursor([[]])
+    monkeypatch.setattr(manager, 'get_connection', lambda: fake_connection(cursor))
+
+    manager.save_search_results([
+        make_part(Quote('machineparts', 'SKF', 10.0, 3)),
+        make_part(Quote('machineparts', 'SKF', 10.0, 3)),
+    ])
+
+    history, = queries(cursor, 'INSERT INTO price_history')
+    assert len(history) == 1
+
+
+def test_null_price_change_is_detected(manager, make_part, monkeypatch, fake_cursor,
+                                       fake_connection):
+    # Цена без значения: обычное сравнение с NULL в MySQL дает NULL, а не «изменилась»
+    cursor = fake_cursor([[('BP-1', 'machineparts', 'SKF', None, 3)]])
+    monkeypatch.setattr(manager, 'get_connection', lambda: fake_connection(cursor))
+
+    stats = manager.save_search_results([make_part(Quote('machineparts', 'SKF', 10.0, 3))])
+
+    assert stats['prices'] == 1
+    upsert = next(query for query, _ in cursor.executed if 'INSERT INTO price_latest' in query)
+    assert 'NOT (price <=> VALUES(price))' in upsert
+    assert 'NOT (delivery_days <=> VALUES(delivery_days))' in upsert
+
+
+@pytest.mark.parametrize('dedup', [True, False])
+def test_backfill_keeps_rollups_in_dedup_mode(manager, monkeypatch, fake_cursor, fake_connection, dedup):
+    monkeypatch.setattr(Config, 'PRICE_HISTORY_DEDUP', dedup)
+    today = date(2026, 1, 10)
+    cursor = fake_cursor([[(date(2026, 1, 9),)], [(today,)]])
+    monkeypatch.setattr(manager, 'get_connection', lambda: fake_connection(cursor))
+
+    assert manager.backfill_daily_stats() == 2
+
+    inserts = [query for query, _ in cursor.executed if 'price_daily_stats' in query]
+    assert len(inserts) == 2
+    for query in inserts:
+        # Свертка изменений цен занизила бы quote_count и исказила min/max/avg
+        assert ('INSERT IGNORE' in query) == dedup
+        assert ('ON DUPLICATE KEY UPDATE' in query) != dedup
@@ -0,0 +1,104 @@
+import random
+import statistics
+
+import pytest
+
+from models import Part, Quote
+from price_stats import PriceStatsEngine
+
+SUPPLIERS = ['industrialsupply', 'machineparts', 'factorystock']
+
+
+def normalized(values):
+    low, high = min(values), max(values)
+    return [(v - low) / (high - low) if high > low else 0.0 for v in values]
+
+
+def reference(part: Part, price_weight=0.7):
+    """Статистика одной запчасти на чистом Python"""
+    quotes = part.quotes()
+    by_price = sorted(quotes, key=lambda q: q.price)
+    prices = [q.price for q in by_price]
+    scores = [
+        price_weight * p + (1 - price_weight) * d
+        for p, d in zip(normalized([q.price for q in quotes]),
+                        normalized([q.delivery for q in quotes]))
+    ]
+    return {
+        "min": by_price[0],
+        "median_price": by_price[len(by_price) // 2],
+        "median": statistics.median(prices),
+        "max": prices[-1],
+        "count": len(quotes),
+        "suppliers": len([s for s, q in part.prices.items() if q]),
+        "scores": scores,
+    }
+
+
+def random_parts(part_factory, rng, count):
+    parts = []
+    for i in range(count):
+        prices = {}
+        for supplier in SUPPLIERS:
+            n = rng.randint(0, 4)
+            if n:
+                prices[supplier] = [
+                    Quote(supplier, f'B{rng.randint(0, 3)}',
+                          float(rng.randint(100, 1000)), rng.randint(1, 30))
+                    for _ in range(n)
+                ]
+        parts.append(part_factory(f'P-{i}', prices))
+    return parts
+
+
+def test_matches_reference_on_random_parts(part_factory):
+    rng = random.Random(3)
+    parts = random_parts(part_factory, rng, 200)
+    results = PriceStatsEngine().analyze(parts)
+
+    assert len(results) == len(parts)
+    for part, result in zip(parts, results):
+        if not part.quotes():
+            assert result is None
+            continue
+        expected = reference(part)
+        assert result["part_number"] == part.part_number
+        assert result["min_price"].price == expected["min"].price
+        assert result["median_price"].price == expected["median_price"].price
+        assert result["stats"]["median"] == pytest.approx(expected["median"])
+        assert result["stats"]["max"] == expected["max"]
+        assert result["stats"]["count"] == expected["count"]
+        assert result["stats"]["suppliers"] == expected["suppliers"]
+        assert result["all_prices"] == part.quotes()
+        # Оценки округлены до трех знаков
+        assert result["scores"] == pytest.approx(expected["scores"], abs=6e-4)
+        # Лучшее предложение - с минимальной оценкой
+        best_score = result["scores"][result["all_prices"].index(result["best_value"])]
+        assert best_score == pytest.approx(min(expected["scores"]), abs=6e-4)
+
+
+def test_percentiles_interpolate(part_factory):
+    part = part_factory('P', {'machineparts': [
+        Quote('machineparts', 'A', price, 1) for price in (10.0, 20.0, 30.0, 40.0)
+    ]})
+    stats = PriceStatsEngine(percentiles=(25, 75)).analyze([part])[0]["stats"]
+    assert stats["p25"] == pytest.approx(17.5)
+    assert stats["p75"] == pytest.approx(32.5)
+    assert stats["median"] == pytest.approx(25.0)
+
+
+def test_equal_prices_and_single_quote(part_factory):
+    same = part_factory('S', {'machineparts': [
+        Quote('machineparts', 'A', 50.0, 5), Quote('machineparts', 'B', 50.0, 2)
+    ]})
+    single = part_factory('O', {'factorystock': [Quote('factorystock', 'A', 70.0, 3)]})
+    empty = part_factory('E', {})
+
+    same_result, single_result, empty_result = PriceStatsEngine().analyze([same, single, empty])
+
+    # Цены равны - выбор по сроку; нулевой разброс не дает деления на ноль
+    assert same_result["best_value"].delivery == 2
+    assert single_result["min_price"] is single_result["best_value"]
+    assert single_result["scores"] == [0.0]
+    assert empty_result is None
+    assert PriceStatsEngine().analyze([]) == []
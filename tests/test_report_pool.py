@@ -0,0 +1,70 @@
+import asyncio
+import os
+import subprocess
+import sys
+import threading
+
+import pytest
+
+import report_worker
+from report_pool import ReportQueueFull, ReportRenderPool
+
+
+def test_timed_out_render_keeps_its_slot(monkeypatch):
+    release = threading.Event()
+
+    def slow_render(analysis_results, user_info, streaming):
+        release.wait(5)
+        return b'xlsx'
+
+    monkeypatch.setattr(report_worker, 'render_report', slow_render)
+    pool = ReportRenderPool(max_workers=0, max_pending=1, timeout=0.05)
+
+    async def scenario():
+        with pytest.raises(asyncio.TimeoutError):
+            await pool.render([])
+        # Генерация еще идет: место не освобождено
+        assert pool.pending == 1
+        with pytest.raises(ReportQueueFull):
+            await pool.render([])
+
+        release.set()
+        for _ in range(100):
+            if not pool.pending:
+                break
+            await asyncio.sleep(0.01)
+        assert pool.pending == 0
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        release.set()
+        pool.shutdown()
+
+
+def test_process_pool_renders_report():
+    pool = ReportRenderPool(max_workers=1, max_pending=2, timeout=60)
+
+    async def scenario():
+        return await pool.render([], None)
+
+    try:
+        report = asyncio.run(scenario())
+    finally:
+        pool.shutdown()
+    assert report[:2] == b'PK'
+    assert pool.pending == 0
+
+
+def test_main_is_safe_to_import_in_workers():
+    # Процессы spawn выполняют main.py родителя как __mp_main__
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    code = (
+        "import runpy, sys; "
+        "runpy.run_path('main.py', run_name='__mp_main__'); "
+        "print(sorted({'bot', 'database', 'ai_analyzer'} & set(sys.modules)))"
+    )
+    result = subprocess.run(
+        [sys.executable, '-c', code], cwd=root, capture_output=True, text=True, check=True
+    )
+    assert result.stdout.strip() == '[]'
@@ -0,0 +1,88 @@
+import csv
+import gzip
+import os
+from datetime import datetime
+
+import pytest
+
+JAN_END = 1706745600   # 2024-02-01 00:00 UTC
+FEB_END = 1709251200   # 2024-03-01 00:00 UTC
+
+
+@pytest.fixture
+def make_manager(database, tmp_path, fake_connection):
+    # retention импортирует database: модуль загружается без MySQL
+    from retention import RetentionManager
+
+    class Db:
+        def __init__(self, cursor):
+            self.cursor = cursor
+
+        def get_connection(self):
+            return fake_connection(self.cursor)
+
+    def make(cursor, **options):
+        params = dict(retention_days={'price_history': 30}, archive_dir=str(tmp_path),
+                      export=True, months_ahead=0, delete_batch=1000)
+        params.update(options)
+        return RetentionManager(Db(cursor), None, **params)
+
+    return make
+
+
+def statements(cursor):
+    return [' '.join(query.split()) for query, _ in cursor.executed]
+
+
+def test_expired_partition_is_compacted_exported_and_dropped(make_manager, fake_cursor, tmp_path):
+    partitions = [('p202401', str(JAN_END)), ('p202402', str(FEB_END)), ('pmax', 'MAXVALUE')]
+    cursor = fake_cursor([
+        [(3,)],                                         # is_partitioned
+        partitions,                                     # add_future_partitions
+        [(FEB_END - 1,)],                               # граница хранения
+        partitions,
+        [(1, 'BP-1', 10.5), (2, 'BP-2', b'\xd0\xb0')],  # выгрузка p202401
+    ])
+    cursor.description = [('id',), ('part_number',), ('price',)]
+
+    report = make_manager(cursor).run()
+
+    assert report == {'price_history': {'partitions': ['p202401'], 'rows': 2}}
+    executed = statements(cursor)
+    compact = next(
+        i for i, q in enumerate(executed) if q.startswith('INSERT IGNORE INTO price_daily_stats')
+    )
+    export = executed.index('SELECT * FROM price_history PARTITION (p202401)')
+    drop = executed.index('ALTER TABLE price_history DROP PARTITION p202401')
+    # Статистика сворачивается до выгрузки и удаления секции
+    assert 'FROM price_history PARTITION (p202401)' in executed[compact]
+    assert compact < export < drop
+    assert not any('p202402' in q and 'DROP' in q for q in executed)
+
+    with gzip.open(tmp_path / 'price_history' / 'price_history_p202401.csv.gz', 'rt') as f:
+        assert list(csv.reader(f)) == [
+            ['id', 'part_number', 'price'], ['1', 'BP-1', '10.5'], ['2', 'BP-2', 'а']
+        ]
+    assert not os.path.exists(tmp_path / 'price_history' / 'price_history_p202401.csv.gz.tmp')
+
+
+def test_unpartitioned_table_is_deleted_in_batches(make_manager, fake_cursor):
+    class DeletingCursor(fake_cursor):
+        """DELETE ... LIMIT удаляет до batch строк из remaining"""
+        remaining = 5
+
+        def execute(self, query, params=None):
+            super().execute(query, params)
+            if query.startswith('DELETE'):
+                self.rowcount = min(self.remaining, params[-1])
+                self.remaining -= self.rowcount
+
+    cutoff = datetime(2024, 1, 15, 3, 0, 0)
+    cursor = DeletingCursor([[(0,)], [(cutoff,)], [(1,)]])
+
+    report = make_manager(cursor, export=False, delete_batch=2).run({'search_requests': 90})
+
+    assert report == {'search_requests': {'partitions': [], 'rows': 5}}
+    assert not any('price_daily_stats' in q for q in statements(cursor))
+    deletes = [params for query, params in cursor.executed if query.startswith('DELETE')]
+    assert deletes == [(cutoff, 2)] * 3
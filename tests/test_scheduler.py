@@ -0,0 +1,129 @@
+import asyncio
+
+import pytest
+
+import scheduler as scheduler_module
+from rate_limit import RateLimiter
+from scheduler import FairScheduler, SchedulerFull, UserRateLimited
+
+
+def make_scheduler(**options) -> FairScheduler:
+    params = dict(
+        max_running=1, max_queued=100, user_concurrency=1, user_max_queued=10,
+        quantum=10, user_rate=0, user_burst=100
+    )
+    params.update(options)
+    return FairScheduler(**params)
+
+
+def test_drr_light_jobs_are_not_stuck_behind_heavy_ones():
+    order = []
+
+    async def scenario():
+        scheduler = make_scheduler(user_concurrency=10)
+        gate = asyncio.Event()
+
+        async def job(name):
+            if name == 'busy':
+                await gate.wait()
+            order.append(name)
+
+        # Первая заявка занимает единственный слот, остальные встают в очередь
+        scheduler.submit(0, 1, lambda: job('busy'))
+        for i in range(3):
+            scheduler.submit(1, 30, lambda i=i: job(f'heavy{i}'))
+        for i in range(3):
+            scheduler.submit(2, 5, lambda i=i: job(f'light{i}'))
+
+        gate.set()
+        while scheduler.running or scheduler.queued:
+            await asyncio.sleep(0.001)
+
+    asyncio.run(scenario())
+    assert order[0] == 'busy'
+    # Легкие заявки второго пользователя проходят раньше, чем вся очередь первого
+    assert order.index('light2') < order.index('heavy2')
+    assert sorted(order) == sorted(['busy', 'heavy0', 'heavy1', 'heavy2', 'light0', 'light1', 'light2'])
+
+
+def test_light_job_is_placed_ahead_of_heavy_one():
+    async def scenario():
+        scheduler = make_scheduler()
+        gate = asyncio.Event()
+        scheduler.submit(0, 1, gate.wait)
+        first = scheduler.submit(1, 30, gate.wait)
+        second = scheduler.submit(2, 5, gate.wait)
+        gate.set()
+        await scheduler.shutdown()
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    # Тяжелая заявка была первой в очереди, легкая другого пользователя встает перед ней
+    assert (first, second) == (1, 1)
+
+
+def test_user_concurrency_and_queue_limits():
+    async def scenario():
+        scheduler = make_scheduler(max_running=4, user_concurrency=1, user_max_queued=1)
+        gate = asyncio.Event()
+        assert scheduler.submit(1, 1, gate.wait) == 0
+        # Вторая заявка того же пользователя ждет, хотя слоты свободны
+        assert scheduler.submit(1, 1, gate.wait) == 1
+        with pytest.raises(SchedulerFull):
+            scheduler.submit(1, 1, gate.wait)
+        assert scheduler.submit(2, 1, gate.wait) == 0
+        await scheduler.shutdown()
+
+    asyncio.run(scenario())
+
+
+def test_token_bucket_limits_parts_per_user():
+    async def scenario():
+        scheduler = make_scheduler(max_running=10, user_concurrency=10, user_rate=1, user_burst=10)
+
+        async def job():
+            pass
+
+        scheduler.submit(1, 6, job)
+        with pytest.raises(UserRateLimited) as error:
+            scheduler.submit(1, 6, job)
+        assert 0 < error.value.retry_after <= 2
+        # Лимит у каждого пользователя свой
+        scheduler.submit(2, 6, job)
+        # Заявка дороже запаса забирает его целиком, а не отклоняется навсегда
+        scheduler.submit(3, 50, job)
+        await scheduler.shutdown()
+
+    asyncio.run(scenario())
+
+
+def test_idle_limiters_are_pruned(monkeypatch):
+    monkeypatch.setattr(scheduler_module, 'LIMITER_PRUNE_INTERVAL', 0)
+
+    async def scenario():
+        scheduler = make_scheduler(max_running=10, user_concurrency=10, user_rate=1000, user_burst=10)
+        gate = asyncio.Event()
+
+        async def job():
+            pass
+
+        for user_id in range(100):
+            scheduler.submit(user_id, 1, job)
+        scheduler.submit(1000, 1, gate.wait)
+        await asyncio.sleep(0.05)
+
+        # Запас неактивных пользователей восстановился: их ограничители удаляются
+        scheduler.submit(2000, 1, job)
+        assert set(scheduler._limiters) == {1000, 2000}
+        gate.set()
+        await scheduler.shutdown()
+
+    asyncio.run(scenario())
+
+
+def test_rate_limiter_is_full():
+    limiter = RateLimiter(rate=1000, burst=5)
+    assert limiter.is_full()
+    assert limiter.try_acquire(5)
+    assert not limiter.is_full()
+    assert RateLimiter(rate=0).is_full()
@@ -0,0 +1,94 @@
+import asyncio
+
+from supplier_health import CLOSED, OPEN
+from suppliers import SupplierAdapter
+
+
+class HungAdapter(SupplierAdapter):
+    """Поставщик, который принимает запрос и не отвечает"""
+
+    def __init__(self, code: str):
+        super().__init__(code)
+        self.calls = 0
+        self.hung = True
+
+    async def fetch_quotes(self, part_number):
+        self.calls += 1
+        if self.hung:
+            await asyncio.sleep(3600)
+        return {"part": None, "quotes": []}
+
+
+class SlowFirstAdapter(SupplierAdapter):
+    """Первое обращение к каждой запчасти зависает, повторное отвечает сразу"""
+
+    def __init__(self, code: str):
+        super().__init__(code)
+        self.calls = 0
+        self.slow = False
+
+    async def fetch_quotes(self, part_number):
+        self.calls += 1
+        if self.slow and self.calls % 2:
+            await asyncio.sleep(3600)
+        await asyncio.sleep(0.05)
+        return {"part": None, "quotes": []}
+
+
+def test_hung_supplier_opens_circuit(engine_factory):
+    adapter = HungAdapter('hung')
+    engine = engine_factory(adapter)
+
+    async def scenario():
+        for i in range(5):
+            await engine.search([f"P{i}"], ['hung'], force_refresh=True)
+
+    asyncio.run(scenario())
+    health = engine.health.get('hung')
+    assert health.failures >= 3
+    assert health.breaker.state == OPEN
+    # После размыкания цепи поставщик пропускается
+    assert adapter.calls == 3
+    assert health.skipped == 2
+
+
+def test_circuit_recovers_after_hung_probe(engine_factory):
+    adapter = HungAdapter('hung')
+    engine = engine_factory(adapter, open_seconds=0.1)
+
+    async def scenario():
+        for i in range(3):
+            await engine.search([f"P{i}"], ['hung'], force_refresh=True)
+        await asyncio.sleep(0.15)
+        # Пробный запрос тоже зависает: цепь снова размыкается, а не остается half_open
+        await engine.search(['probe'], ['hung'], force_refresh=True)
+        assert engine.health.get('hung').breaker.state == OPEN
+
+        adapter.hung = False
+        await asyncio.sleep(0.15)
+        results, _ = await engine.search(['after'], ['hung'], force_refresh=True)
+        return results
+
+    results = asyncio.run(scenario())
+    assert results == [{'hung': {"part": None, "quotes": []}}]
+    assert engine.health.get('hung').breaker.state == CLOSED
+
+
+def test_hedged_request_wins_over_slow_attempt(engine_factory):
+    adapter = SlowFirstAdapter('slow')
+    engine = engine_factory(adapter, lookup_timeout=2.0, hedge_enabled=True, timeout_multiplier=5)
+
+    async def scenario():
+        # Статистика задержек для адаптивной задержки дублирования
+        for i in range(10):
+            await engine.search([f"W{i}"], ['slow'], force_refresh=True)
+        adapter.slow = True
+        adapter.calls = 0
+        return await engine.search(['H'], ['slow'], force_refresh=True)
+
+    results, _ = asyncio.run(scenario())
+    health = engine.health.get('slow')
+    assert results == [{'slow': {"part": None, "quotes": []}}]
+    assert health.hedges == 1
+    assert health.hedge_wins == 1
+    assert health.breaker.state == CLOSED
@@ -0,0 +1,84 @@
+import time
+
+from supplier_health import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, LatencyHistogram, SupplierHealth
+
+
+def make_health(**options) -> SupplierHealth:
+    params = dict(
+        max_timeout=2.0, window=60, min_samples=5, timeout_percentile=99,
+        timeout_multiplier=2.0, min_timeout=0.05, hedge_enabled=True,
+        hedge_percentile=95, hedge_max_ratio=0.5, failure_threshold=3, open_seconds=0.05
+    )
+    params.update(options)
+    return SupplierHealth('test', **params)
+
+
+def test_histogram_percentiles():
+    histogram = LatencyHistogram(window=60, buckets=[0.1, 0.2, 0.5, 1.0])
+    for seconds in [0.05] * 90 + [0.4] * 10:
+        histogram.observe(seconds, now=100)
+    assert histogram.count(now=100) == 100
+    assert histogram.percentile(50, now=100) == 0.1
+    assert histogram.percentile(99, now=100) == 0.5
+    # Окно сдвинулось целиком: старые наблюдения не учитываются
+    assert histogram.percentile(50, now=200) is None
+
+
+def test_breaker_opens_after_threshold_and_probes():
+    breaker = CircuitBreaker(failure_threshold=3, open_seconds=0.05)
+    assert not breaker.record_failure()
+    assert not breaker.record_failure()
+    assert breaker.record_failure()
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+
+    time.sleep(0.06)
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    # Пока пробный запрос в работе, остальные не пропускаются
+    assert not breaker.allow()
+
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert breaker.allow()
+
+
+def test_breaker_failed_probe_reopens():
+    breaker = CircuitBreaker(failure_threshold=1, open_seconds=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+    assert breaker.allow()
+    assert breaker.record_failure()
+    assert breaker.state == OPEN
+
+
+def test_breaker_lost_probe_expires():
+    breaker = CircuitBreaker(failure_threshold=1, open_seconds=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+    assert breaker.allow()
+    assert not breaker.allow()
+    # Исход пробного запроса так и не записан: через open_seconds - новая проба
+    time.sleep(0.06)
+    assert breaker.allow()
+
+
+def test_timeout_adapts_to_latency():
+    health = make_health()
+    assert health.timeout() == 2.0
+    assert health.hedge_delay() is None
+
+    for _ in range(20):
+        health.record_success(0.1)
+    health.requests = 20
+    assert 0.1 < health.timeout() < 0.5
+    assert health.hedge_delay() is not None
+
+
+def test_hedges_limited_by_ratio():
+    health = make_health(hedge_max_ratio=0.5)
+    for _ in range(20):
+        health.record_success(0.1)
+    health.requests = 10
+    health.hedges = 5
+    assert health.hedge_delay() is None
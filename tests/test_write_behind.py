@@ -0,0 +1,129 @@
+import asyncio
+
+import pytest
+
+
+
+class FakeDb:
+    """AsyncDatabaseManager для очереди: запоминает пачки, ответ - как у DatabaseManager"""
+
+    def __init__(self, fail=False, delay=0.0, fail_tables=()):
+        self.fail = fail
+        self.delay = delay
+        self.fail_tables = set(fail_tables)
+        self.batches = []
+
+    async def _save(self, table, rows, **counts):
+        await asyncio.sleep(self.delay)
+        self.batches.append((table, list(rows)))
+        return {"ok": not self.fail and table not in self.fail_tables, **counts}
+
+    async def save_search_results(self, parts):
+        return await self._save('parts', parts, parts=len(parts), prices=0)
+
+    async def save_search_requests(self, requests):
+        return await self._save('search_requests', requests, requests=len(requests), analyses=0)
+
+    async def save_request_timings(self, timings):
+        return await self._save('request_timings', timings, timings=len(timings))
+
+
+@pytest.fixture
+def queue_class(database):
+    # write_behind импортирует database: модуль загружается без MySQL
+    from write_behind import WriteBehindQueue
+    return WriteBehindQueue
+
+
+@pytest.fixture
+def make_parts(part_factory):
+    return lambda count: [part_factory(f'P-{i}') for i in range(count)]
+
+
+def test_batches_by_size_and_one_call_per_table(queue_class, make_parts):
+    db = FakeDb()
+
+    async def scenario():
+        queue = queue_class(db, max_items=100, batch_size=10, flush_interval=0.2)
+        await queue.start()
+        await queue.enqueue_parts(make_parts(25))
+        await queue.enqueue_request_timing({'total_ms': 1})
+        await queue.enqueue_search_request(1, 'user', ['P-0'], ['machineparts'], 1)
+        await queue.stop()
+        return queue
+
+    queue = asyncio.run(scenario())
+    sizes = [(table, len(rows)) for table, rows in db.batches]
+    # Полные пачки уходят сразу, остаток - при остановке; таблицы пачки пишутся отдельно
+    assert sizes[:2] == [('parts', 10), ('parts', 10)]
+    assert sorted(sizes[2:]) == [('parts', 5), ('request_timings', 1), ('search_requests', 1)]
+    assert queue.flushed == 27
+    assert queue.dropped == 0
+
+
+def test_flushes_partial_batch_after_interval(queue_class, make_parts):
+    db = FakeDb()
+
+    async def scenario():
+        queue = queue_class(db, max_items=100, batch_size=100, flush_interval=0.05)
+        await queue.start()
+        await queue.enqueue_parts(make_parts(3))
+        await asyncio.sleep(0.2)
+        flushed = queue.flushed
+        await queue.stop()
+        return flushed
+
+    assert asyncio.run(scenario()) == 3
+    assert [len(rows) for _, rows in db.batches] == [3]
+
+
+def test_backpressure_when_queue_is_full(queue_class, make_parts):
+    db = FakeDb(delay=0.05)
+
+    async def scenario():
+        queue = queue_class(db, max_items=2, batch_size=1, flush_interval=0)
+        await queue.start()
+        put = asyncio.ensure_future(queue.enqueue_parts(make_parts(5)))
+        await asyncio.sleep(0.01)
+        # Очередь полна, пока база не разберет записи: обработчик ждет
+        assert not put.done()
+        assert queue.qsize() == 2
+        await put
+        await queue.stop()
+        return queue
+
+    queue = asyncio.run(scenario())
+    assert queue.flushed == 5
+
+
+def test_failed_flush_counts_dropped_and_rejects_after_stop(queue_class, make_parts):
+    db = FakeDb(fail=True)
+
+    async def scenario():
+        queue = queue_class(db, max_items=10, batch_size=10, flush_interval=0.01)
+        await queue.start()
+        await queue.enqueue_parts(make_parts(4))
+        await queue.stop()
+        with pytest.raises(RuntimeError):
+            await queue.enqueue_parts(make_parts(1))
+        return queue
+
+    queue = asyncio.run(scenario())
+    assert queue.dropped == 4
+    assert queue.flushed == 0
+
+
+def test_flushed_counts_only_saved_tables(queue_class, make_parts):
+    db = FakeDb(fail_tables={'parts'})
+
+    async def scenario():
+        queue = queue_class(db, max_items=10, batch_size=10, flush_interval=0.01)
+        await queue.start()
+        await queue.enqueue_parts(make_parts(3))
+        await queue.enqueue_request_timing({'user_id': 1})
+        await queue.stop()
+        return queue
+
+    queue = asyncio.run(scenario())
+    assert queue.dropped == 3
+    assert queue.flushed == 1
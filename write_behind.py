@@ -0,0 +1,159 @@
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+from config import Config
+from database import async_db
+from metrics import metrics
+from models import Part
+
+logger = logging.getLogger(__name__)
+
+PART = 'part'
+SEARCH_REQUEST = 'search_request'
+REQUEST_TIMING = 'request_timing'
+
+
+class WriteBehindQueue:
+    """
+    Отложенная пакетная запись в БД.
+
+    Обработчики кладут записи в ограниченную очередь и не ждут базу;
+    фоновый воркер сбрасывает их пачками по размеру или по времени.
+    Переполненная очередь заставляет обработчик подождать (backpressure).
+    """
+
+    def __init__(self, db, max_items: int, batch_size: int, flush_interval: float):
+        self.db = db
+        self.max_items = max_items
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_items)
+        self._worker: Optional[asyncio.Task] = None
+        self._stopping = False
+
+        self.flushed = 0
+        self.dropped = 0
+
+    async def start(self):
+        """Запуск фонового воркера"""
+        if self._worker is None or self._worker.done():
+            self._stopping = False
+            self._worker = asyncio.create_task(self._run(), name="write-behind")
+            logger.info("Write-behind worker started")
+
+    async def put(self, kind: str, payload: Any):
+        """Постановка записи в очередь; ждет, если очередь заполнена"""
+        if self._stopping:
+            raise RuntimeError("Write-behind queue is stopping")
+        await self._queue.put((kind, payload))
+
+    async def enqueue_parts(self, parts: List[Part]):
+        """Запчасти с ценами поставщиков (parts + price_history)"""
+        for part in parts:
+            await self.put(PART, part)
+
+    async def enqueue_search_request(self, user_id, username, part_numbers, suppliers,
+                                     results_count, analyses=None):
+        """Поисковый запрос (search_requests) и строки analysis_results к нему"""
+        await self.put(SEARCH_REQUEST, {
+            'user_id': user_id,
+            'username': username,
+            'part_numbers': part_numbers,
+            'suppliers': suppliers,
+            'results_count': results_count,
+            'analyses': analyses or []
+        })
+
+    async def enqueue_request_timing(self, timing: Dict[str, Any]):
+        """Строка выборки времени обработки запроса (request_timings)"""
+        await self.put(REQUEST_TIMING, timing)
+
+    def qsize(self) -> int:
+        return self._queue.qsize()
+
+    async def _next_batch(self) -> List[tuple]:
+        """Ожидание первой записи, затем добор до batch_size или до истечения интервала"""
+        batch = [await self._queue.get()]
+        deadline = time.monotonic() + self.flush_interval
+
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _save(self, table: str, save, rows: List[Any], *counted: str) -> Dict[str, Any]:
+        """Запись одной таблицы с учетом времени, обращений к БД и записанных строк"""
+        with metrics.timer('db_flush_seconds', table=table):
+            stats = await save(rows)
+        metrics.inc('db_round_trips_total', table=table)
+        if stats["ok"]:
+            self.flushed += len(rows)
+            metrics.inc('db_rows_written_total', sum(stats[key] for key in counted), table=table)
+        else:
+            self.dropped += len(rows)
+        return stats
+
+    async def _flush(self, batch: List[tuple]):
+        """Запись пачки: каждая таблица - одной транзакцией"""
+        parts = [payload for kind, payload in batch if kind == PART]
+        requests = [payload for kind, payload in batch if kind == SEARCH_REQUEST]
+        timings = [payload for kind, payload in batch if kind == REQUEST_TIMING]
+
+        if parts:
+            await self._save('parts', self.db.save_search_results, parts, 'parts', 'prices')
+        if requests:
+            await self._save('search_requests', self.db.save_search_requests, requests,
+                             'requests', 'analyses')
+        if timings:
+            await self._save('request_timings', self.db.save_request_timings, timings, 'timings')
+
+    async def _run(self):
+        while True:
+            batch = await self._next_batch()
+            accounted = self.flushed + self.dropped
+            try:
+                await self._flush(batch)
+            except Exception as e:
+                # Таблицы, записанные до ошибки, уже учтены в flushed/dropped
+                lost = len(batch) - (self.flushed + self.dropped - accounted)
+                self.dropped += lost
+                logger.error(f"Write-behind flush failed, {lost} records dropped: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def stop(self, timeout: float = 30.0):
+        """Прием новых записей прекращается, очередь дописывается в БД"""
+        self._stopping = True
+        if self._worker is None:
+            return
+
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.error(f"Write-behind drain timed out, {self.qsize()} records lost")
+
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+        logger.info(f"Write-behind worker stopped: {self.flushed} flushed, {self.dropped} dropped")
+
+
+write_behind = WriteBehindQueue(
+    async_db,
+    max_items=Config.WRITE_BEHIND_MAX_ITEMS,
+    batch_size=Config.WRITE_BEHIND_BATCH_SIZE,
+    flush_interval=Config.WRITE_BEHIND_FLUSH_INTERVAL
+)